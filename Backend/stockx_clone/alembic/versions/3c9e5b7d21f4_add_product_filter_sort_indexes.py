@@ -0,0 +1,54 @@
+"""add composite and partial indexes for product filters and sorts
+
+Revision ID: 3c9e5b7d21f4
+Revises: fa632068a3ae
+Create Date: 2026-10-17 11:02:15.774120
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e5b7d21f4'
+down_revision: Union[str, None] = 'fa632068a3ae'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (name, columns, partial index predicate)
+INDEXES = [
+    ('ix_products_sales_count_id', [sa.text('sales_count DESC'), sa.text('id DESC')], 'sales_count IS NOT NULL'),
+    ('ix_products_created_at_id', [sa.text('created_at DESC'), sa.text('id DESC')], None),
+    ('ix_products_last_sale_price_id', ['last_sale_price', 'id'], 'last_sale_price IS NOT NULL'),
+    ('ix_products_brand_id', ['brand', 'id'], None),
+    ('ix_products_category_gender_id', ['category', 'gender', 'id'], None),
+    (
+        'ix_products_recommendation',
+        ['category', 'brand', 'gender', sa.text('sales_count DESC')],
+        'retail_price IS NOT NULL AND last_sale_price IS NOT NULL'
+    ),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY so the products table stays writable while the indexes build
+    with op.get_context().autocommit_block():
+        for name, columns, where in INDEXES:
+            op.create_index(
+                name,
+                'products',
+                columns,
+                postgresql_where=sa.text(where) if where else None,
+                postgresql_concurrently=True,
+                if_not_exists=True
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='products', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,54 @@
+"""add brand_stats materialized view and per-brand best seller index
+
+Revision ID: 4f7c2e9a1b65
+Revises: e81f4b2a6d39
+Create Date: 2026-10-17 18:40:12.318907
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f7c2e9a1b65'
+down_revision: Union[str, None] = 'e81f4b2a6d39'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        CREATE MATERIALIZED VIEW brand_stats AS
+        SELECT
+            brand,
+            count(*)::integer AS product_count,
+            coalesce(sum(sales_count), 0)::bigint AS total_sales,
+            coalesce(sum(sales_total), 0)::numeric(16, 2) AS total_turnover,
+            round((percentile_cont(0.5) WITHIN GROUP (ORDER BY last_sale_price))::numeric, 2) AS median_last_sale_price,
+            now() AS refreshed_at
+        FROM products
+        WHERE brand IS NOT NULL
+        GROUP BY brand
+    """)
+    # REFRESH ... CONCURRENTLY needs a unique index on the view
+    op.create_index('ux_brand_stats_brand', 'brand_stats', ['brand'], unique=True)
+    op.create_index('ix_brand_stats_popularity', 'brand_stats', [sa.text('total_sales DESC'), 'brand'])
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_products_brand_sales_count',
+            'products',
+            ['brand', sa.text('sales_count DESC NULLS LAST'), 'id'],
+            postgresql_concurrently=True,
+            if_not_exists=True
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_products_brand_sales_count', table_name='products', postgresql_concurrently=True, if_exists=True)
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS brand_stats")
@@ -0,0 +1,34 @@
+"""add product_key and content_hash for idempotent imports
+
+Revision ID: 8d4f2a6c90b1
+Revises: 3c9e5b7d21f4
+Create Date: 2026-10-17 13:40:51.208337
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4f2a6c90b1'
+down_revision: Union[str, None] = '3c9e5b7d21f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('product_key', sa.String(length=255), nullable=True))
+    op.add_column('products', sa.Column('content_hash', sa.String(length=32), nullable=True))
+    # Rows imported before this revision stay keyless (NULLs never conflict), so the first keyed import
+    # adds its own copies; delete the keyless imported rows or reload the catalog after upgrading
+    op.create_unique_constraint('uq_products_product_key', 'products', ['product_key'])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_products_product_key', 'products', type_='unique')
+    op.drop_column('products', 'content_hash')
+    op.drop_column('products', 'product_key')
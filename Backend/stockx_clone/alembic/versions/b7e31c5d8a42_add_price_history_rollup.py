@@ -0,0 +1,43 @@
+"""add price_history rollup table
+
+Revision ID: b7e31c5d8a42
+Revises: 8d4f2a6c90b1
+Create Date: 2026-10-17 15:12:03.519204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e31c5d8a42'
+down_revision: Union[str, None] = '8d4f2a6c90b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'price_history',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.String(length=8), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('open', sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column('high', sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column('low', sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column('close', sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column('volume', sa.Integer(), nullable=False),
+        sa.Column('turnover', sa.DECIMAL(precision=14, scale=2), nullable=False),
+        sa.Column('first_sale_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('last_sale_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('product_id', 'bucket', 'bucket_start')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('price_history')
@@ -0,0 +1,30 @@
+"""add products.sales_total running aggregate
+
+Revision ID: c4a9d6e2f713
+Revises: b7e31c5d8a42
+Create Date: 2026-10-17 16:05:44.902118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a9d6e2f713'
+down_revision: Union[str, None] = 'b7e31c5d8a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('products', sa.Column('sales_total', sa.DECIMAL(precision=14, scale=2), nullable=True, server_default='0'))
+    # Seed the running sum from the imported statistics so the average carries on from them
+    op.execute("UPDATE products SET sales_total = coalesce(average_price, 0) * coalesce(sales_count, 0)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('products', 'sales_total')
@@ -0,0 +1,90 @@
+"""add product_variants, asks and bids for the order book
+
+Revision ID: e81f4b2a6d39
+Revises: c4a9d6e2f713
+Create Date: 2026-10-17 17:21:37.640215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e81f4b2a6d39'
+down_revision: Union[str, None] = 'c4a9d6e2f713'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'product_variants',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('size', sa.String(length=20), nullable=True),
+        sa.Column('color', sa.String(length=50), nullable=True),
+        sa.Column('sku', sa.String(length=100), nullable=True),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('product_id', 'size', 'color', name='uq_product_variants_product_size_color')
+    )
+    op.create_table(
+        'asks',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('variant_id', sa.Integer(), nullable=False),
+        sa.Column('seller_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('price', sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column('condition', sa.String(length=50), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('is_instant', sa.Boolean(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['variant_id'], ['product_variants.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['seller_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_asks_active_variant', 'asks', ['variant_id', 'created_at', 'id'], postgresql_where=sa.text("status = 'active'"))
+    op.create_table(
+        'bids',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('variant_id', sa.Integer(), nullable=False),
+        sa.Column('buyer_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('price', sa.DECIMAL(precision=10, scale=2), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['variant_id'], ['product_variants.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['buyer_id'], ['users.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_bids_active_variant', 'bids', ['variant_id', 'created_at', 'id'], postgresql_where=sa.text("status = 'active'"))
+
+    op.add_column('sales', sa.Column('variant_id', sa.Integer(), nullable=True))
+    op.add_column('sales', sa.Column('ask_id', sa.Integer(), nullable=True))
+    op.add_column('sales', sa.Column('bid_id', sa.Integer(), nullable=True))
+    op.add_column('sales', sa.Column('seller_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.create_foreign_key('sales_variant_id_fkey', 'sales', 'product_variants', ['variant_id'], ['id'], ondelete='SET NULL')
+    op.create_foreign_key('sales_ask_id_fkey', 'sales', 'asks', ['ask_id'], ['id'], ondelete='SET NULL')
+    op.create_foreign_key('sales_bid_id_fkey', 'sales', 'bids', ['bid_id'], ['id'], ondelete='SET NULL')
+    op.create_foreign_key('sales_seller_id_fkey', 'sales', 'users', ['seller_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('sales_seller_id_fkey', 'sales', type_='foreignkey')
+    op.drop_constraint('sales_bid_id_fkey', 'sales', type_='foreignkey')
+    op.drop_constraint('sales_ask_id_fkey', 'sales', type_='foreignkey')
+    op.drop_constraint('sales_variant_id_fkey', 'sales', type_='foreignkey')
+    op.drop_column('sales', 'seller_id')
+    op.drop_column('sales', 'bid_id')
+    op.drop_column('sales', 'ask_id')
+    op.drop_column('sales', 'variant_id')
+    op.drop_index('ix_bids_active_variant', table_name='bids', postgresql_where=sa.text("status = 'active'"))
+    op.drop_table('bids')
+    op.drop_index('ix_asks_active_variant', table_name='asks', postgresql_where=sa.text("status = 'active'"))
+    op.drop_table('asks')
+    op.drop_table('product_variants')
@@ -0,0 +1,43 @@
+"""add full-text search vector to products
+
+Revision ID: fa632068a3ae
+Revises: ee43fde7cb43
+Create Date: 2026-10-17 10:12:41.318206
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'fa632068a3ae'
+down_revision: Union[str, None] = 'ee43fde7cb43'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute("""
+        ALTER TABLE products ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(brand, '')), 'A') ||
+            setweight(to_tsvector('simple', coalesce(model, '')), 'B') ||
+            setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+        ) STORED
+    """)
+    op.create_index(
+        'ix_products_search_vector',
+        'products',
+        ['search_vector'],
+        postgresql_using='gin'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_products_search_vector', table_name='products')
+    op.drop_column('products', 'search_vector')
@@ -2,16 +2,60 @@ from fastapi import Depends
 import os
 import redis
 from sqlalchemy.orm import Session
-from typing import Generator
+from typing import Generator, Optional
 
-from app.database import get_db
+from app.database import engine, get_db
+from app.service.brand_stats_service import BrandStatsRefresher
 from app.service.clerk_service import ClerkService
 from app.service.cache_service import CacheService
+from app.service.email_outbox import EmailOutbox
+from app.service.email_service import EmailService
+from app.service.local_cache import CacheInvalidationBus, LocalCache
+from app.service.market_data import MarketDataHub, MarketDataSync
+from app.service.order_book import OrderBookEngine
+from app.service.order_service import OrderService
+from app.service.password_hasher import PasswordHasher
+from app.service.principal_cache import PrincipalCache
+from app.service.recommendation_service import RecommendationService
+from app.service.search_index import ProductSearchIndex, SearchIndexSync
+from app.service.trending_service import TrendingService
 
 # Environment variables
 CLERK_API_KEY = os.getenv("CLERK_API_KEY", "")
 CLERK_WEBHOOK_SECRET = os.getenv("CLERK_WEBHOOK_SECRET", "")
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+LISTING_CACHE_TTL = int(os.getenv("LISTING_CACHE_TTL", "300"))  # 5 minutes
+PRINCIPAL_CACHE_TTL = int(os.getenv("PRINCIPAL_CACHE_TTL", "300"))  # user id/active/roles for auth
+
+# In-process L1 cache tier (disabled unless CACHE_L1_ENABLED=true)
+CACHE_L1_ENABLED = os.getenv("CACHE_L1_ENABLED", "false").lower() == "true"
+CACHE_L1_MAX_ENTRIES = int(os.getenv("CACHE_L1_MAX_ENTRIES", "10000"))
+CACHE_L1_MAX_BYTES = int(os.getenv("CACHE_L1_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_L1_TTL = float(os.getenv("CACHE_L1_TTL", "30"))
+
+# Product search backend: "postgres" (full-text index) or "memory" (in-process inverted index)
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "postgres").lower()
+
+# Seconds between brand_stats materialized view refreshes; 0 leaves it to Scripts/refresh_brand_stats
+BRAND_STATS_REFRESH_SECONDS = float(os.getenv("BRAND_STATS_REFRESH_SECONDS", "300"))
+
+# Market data streaming, per worker
+MARKET_DATA_MAX_SUBSCRIBERS = int(os.getenv("MARKET_DATA_MAX_SUBSCRIBERS", "20000"))
+MARKET_DATA_MAX_PRODUCTS = int(os.getenv("MARKET_DATA_MAX_PRODUCTS", "100"))  # per connection
+MARKET_DATA_SEND_TIMEOUT = float(os.getenv("MARKET_DATA_SEND_TIMEOUT", "10"))  # seconds before a stalled client is dropped
+
+# bcrypt thread pool, per worker: hashes run in parallel up to WORKERS, then up to MAX_QUEUE wait
+# before logins/registrations get a 503
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "64"))
+
+# Outbound email: queued in Redis and sent by background workers over pooled SMTP connections;
+# with the outbox disabled, emails are sent inside the request
+EMAIL_OUTBOX_ENABLED = os.getenv("EMAIL_OUTBOX_ENABLED", "true").lower() == "true"
+EMAIL_OUTBOX_WORKERS = int(os.getenv("EMAIL_OUTBOX_WORKERS", "1"))  # per process
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv("EMAIL_OUTBOX_BATCH_SIZE", "20"))  # messages per claim, sent over one connection
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", "6"))
+EMAIL_OUTBOX_BACKOFF_SECONDS = float(os.getenv("EMAIL_OUTBOX_BACKOFF_SECONDS", "30"))  # doubles per attempt
 
 # Redis client
 redis_client = redis.from_url(REDIS_URL)
@@ -20,7 +64,69 @@ redis_client = redis.from_url(REDIS_URL)
 clerk_service = ClerkService(CLERK_API_KEY)
 clerk_service.webhook_secret = CLERK_WEBHOOK_SECRET
 
-cache_service = CacheService(redis_client)
+local_cache = None
+cache_invalidation_bus = None
+if CACHE_L1_ENABLED:
+    local_cache = LocalCache(max_entries=CACHE_L1_MAX_ENTRIES, max_bytes=CACHE_L1_MAX_BYTES, default_ttl=CACHE_L1_TTL)
+    cache_invalidation_bus = CacheInvalidationBus(redis_client, local_cache)
+
+cache_service = CacheService(redis_client, local_cache=local_cache, invalidation_bus=cache_invalidation_bus)
+listing_cache_service = CacheService(
+    redis_client,
+    prefix="products:listing:",
+    default_ttl=LISTING_CACHE_TTL,
+    local_cache=local_cache,
+    invalidation_bus=cache_invalidation_bus
+)
+principal_cache_service = CacheService(
+    redis_client,
+    prefix="auth:principal:",
+    default_ttl=PRINCIPAL_CACHE_TTL,
+    local_cache=local_cache,
+    invalidation_bus=cache_invalidation_bus
+)
+principal_cache = PrincipalCache(principal_cache_service)
+
+product_search_index = None
+search_index_sync = None
+if SEARCH_BACKEND == "memory":
+    product_search_index = ProductSearchIndex()
+    search_index_sync = SearchIndexSync(redis_client, product_search_index)
+
+# Bid/ask matching; each worker keeps the books in memory and reloads a variant's book
+# when another worker has placed or cancelled an order on it (versions kept in Redis)
+order_book_engine = OrderBookEngine()
+order_service = OrderService(order_book_engine, redis_client)
+
+market_data_hub = MarketDataHub(
+    max_subscribers=MARKET_DATA_MAX_SUBSCRIBERS,
+    max_products=MARKET_DATA_MAX_PRODUCTS,
+    send_timeout=MARKET_DATA_SEND_TIMEOUT
+)
+market_data_sync = MarketDataSync(redis_client, market_data_hub)
+
+brand_stats_refresher = BrandStatsRefresher(engine, interval=BRAND_STATS_REFRESH_SECONDS)
+
+email_service = EmailService()
+email_outbox = None
+if EMAIL_OUTBOX_ENABLED:
+    email_outbox = EmailOutbox(
+        redis_client,
+        email_service.pool,
+        workers=EMAIL_OUTBOX_WORKERS,
+        batch_size=EMAIL_OUTBOX_BATCH_SIZE,
+        max_attempts=EMAIL_OUTBOX_MAX_ATTEMPTS,
+        backoff_base=EMAIL_OUTBOX_BACKOFF_SECONDS
+    )
+    email_service.outbox = email_outbox
+
+password_hasher = PasswordHasher(workers=PASSWORD_HASH_WORKERS, max_queue=PASSWORD_HASH_MAX_QUEUE)
+
+# Decayed trending scores, fed from committed sales by a background thread
+trending_service = TrendingService(redis_client)
+
+# Precomputed recommendation candidates, written by Scripts/build_recommendations.py
+recommendation_service = RecommendationService(redis_client)
 
 def get_clerk_service() -> ClerkService:
     return clerk_service
@@ -28,6 +134,33 @@ def get_clerk_service() -> ClerkService:
 def get_cache_service() -> CacheService:
     return cache_service
 
+def get_listing_cache_service() -> CacheService:
+    return listing_cache_service
+
+def get_email_service() -> EmailService:
+    return email_service
+
+def get_password_hasher() -> PasswordHasher:
+    return password_hasher
+
+def get_principal_cache() -> PrincipalCache:
+    return principal_cache
+
+def get_search_index_sync() -> Optional[SearchIndexSync]:
+    return search_index_sync
+
+def get_order_service() -> OrderService:
+    return order_service
+
+def get_market_data_sync() -> MarketDataSync:
+    return market_data_sync
+
+def get_trending_service() -> TrendingService:
+    return trending_service
+
+def get_recommendation_service() -> RecommendationService:
+    return recommendation_service
+
 def get_current_user(clerk_id: str, db: Session = Depends(get_db)):
     """Get the current user from the database"""
     from app.models.user import User
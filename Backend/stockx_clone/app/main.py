@@ -1,8 +1,13 @@
-from fastapi import FastAPI
+import asyncio
+from fastapi import FastAPI, Query, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from app.database import engine
+from app.database import SessionLocal, engine, pool_stats
 from app.models import product, users  # Import both models
-from app.routers import products, clerk_webhook, auth, custom_auth
+from app.routers import products, price_history, sales, orders, clerk_webhook, auth, custom_auth
+from app.dependencies import brand_stats_refresher, cache_invalidation_bus, email_outbox, email_service, listing_cache_service, local_cache, market_data_hub, market_data_sync, order_book_engine, password_hasher, principal_cache_service, product_search_index, search_index_sync, trending_service
+from app.middleware.auth import app_token_verifier, clerk_token_verifier
+from app.service.order_service import load_resting_orders
+from app.service.search_index import load_products
 
 # Create database tables
 product.Base.metadata.create_all(bind=engine)
@@ -25,11 +30,93 @@ app.add_middleware(
 
 # Include routers
 app.include_router(products.router)
+app.include_router(price_history.router)
+app.include_router(sales.router)
+app.include_router(orders.router)
 app.include_router(clerk_webhook.router)
 app.include_router(auth.router, prefix="", tags=["Clerk Auth"])
 app.include_router(custom_auth.router, prefix="", tags=["Custom Auth"])
 
 
+@app.on_event("startup")
+def start_cache_invalidation():
+    # Keep this worker's L1 cache coherent with writes made by other workers
+    if cache_invalidation_bus is not None:
+        cache_invalidation_bus.start()
+
+@app.on_event("shutdown")
+def stop_cache_invalidation():
+    if cache_invalidation_bus is not None:
+        cache_invalidation_bus.stop()
+
+@app.on_event("startup")
+def build_search_index():
+    # Only when SEARCH_BACKEND=memory; changes that arrive during the build are replayed after it
+    if product_search_index is None:
+        return
+    search_index_sync.start()
+    db = SessionLocal()
+    try:
+        search_index_sync.rebuild(lambda: load_products(db))
+    finally:
+        db.close()
+
+@app.on_event("shutdown")
+def stop_search_index_sync():
+    if search_index_sync is not None:
+        search_index_sync.stop()
+
+@app.on_event("startup")
+def load_order_books():
+    # The books only live in memory; rebuild them from the active orders in Postgres
+    db = SessionLocal()
+    try:
+        order_book_engine.load(load_resting_orders(db))
+    finally:
+        db.close()
+
+@app.on_event("startup")
+async def start_market_data_sync():
+    # Updates from the Redis listener thread are dispatched on this worker's event loop
+    market_data_sync.bind(asyncio.get_running_loop())
+    market_data_sync.start()
+
+@app.on_event("shutdown")
+def stop_market_data_sync():
+    market_data_sync.stop()
+
+@app.on_event("startup")
+def start_brand_stats_refresher():
+    brand_stats_refresher.start()
+
+@app.on_event("shutdown")
+def stop_brand_stats_refresher():
+    brand_stats_refresher.stop()
+
+@app.on_event("startup")
+def start_trending_recorder():
+    trending_service.start()
+
+@app.on_event("shutdown")
+def stop_trending_recorder():
+    trending_service.stop()
+
+@app.on_event("startup")
+def start_email_outbox():
+    if email_outbox is not None:
+        email_outbox.start()
+
+@app.on_event("shutdown")
+def stop_email_outbox():
+    if email_outbox is not None:
+        email_outbox.stop()
+    email_service.shutdown()
+
+@app.on_event("shutdown")
+def stop_password_hasher():
+    password_hasher.shutdown()
+
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -38,4 +125,41 @@ async def root():
 # Health check endpoint
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+# Live market data: last sales and lowest ask / highest bid changes for the given products
+@app.websocket("/ws/market")
+async def market_data(websocket: WebSocket, products: str = Query("", description="Comma-separated product IDs to follow")):
+    """
+    Stream market updates instead of polling the product endpoints.
+
+    Each frame is a JSON array of updates ({"type": "sale" | "book", "product_id", ...}).
+    Updates that pile up while a client is not reading are coalesced to the latest per
+    product and variant. Send {"subscribe": [ids]} or {"unsubscribe": [ids]} to change
+    the followed products.
+    """
+    product_ids = [int(part) for part in products.split(",") if part.strip().isdigit()]
+    await market_data_hub.serve(websocket, product_ids)
+
+# Runtime metrics for this worker
+@app.get("/metrics")
+async def metrics():
+    return {
+        "db_pool": pool_stats(),
+        "cache": {
+            "listing": listing_cache_service.stats(),
+            "principal": principal_cache_service.stats(),
+            "local": local_cache.stats() if local_cache is not None else None
+        },
+        "search_index": product_search_index.stats() if product_search_index is not None else None,
+        "order_book": order_book_engine.stats(),
+        "market_data": market_data_hub.stats(),
+        "trending": trending_service.stats(),
+        "brand_stats": brand_stats_refresher.stats(),
+        "password_hasher": password_hasher.stats(),
+        "email_outbox": email_outbox.stats() if email_outbox is not None else None,
+        "auth_tokens": {
+            "clerk": clerk_token_verifier.stats(),
+            "custom": app_token_verifier.stats()
+        }
+    }
@@ -1,48 +1,228 @@
 from fastapi import Depends, HTTPException, Request, status
-from typing import Optional
+from fastapi.security import OAuth2PasswordBearer
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import hashlib
+import json
 import jwt
-from datetime import datetime
+import logging
 import os
+import time
+import uuid
 
 from app.dependencies import get_clerk_service
+from app.service.local_cache import LocalCache
+from app.utils.auth import decode_token
 
-# Get Clerk public key from environment
+logger = logging.getLogger(__name__)
+
+# Clerk signing keys: the instance's JWKS endpoint (https://<frontend-api>/.well-known/jwks.json),
+# or a single static PEM public key when no JWKS URL is configured
+CLERK_JWKS_URL = os.getenv("CLERK_JWKS_URL", "")
 CLERK_JWT_KEY = os.getenv("CLERK_JWT_KEY", "")
+CLERK_JWT_AUDIENCE = os.getenv("CLERK_JWT_AUDIENCE", "fastapi-app")
+CLERK_ISSUER = os.getenv("CLERK_ISSUER", "")  # e.g. https://<frontend-api>; checked when set
+CLERK_JWKS_CACHE_SECONDS = int(os.getenv("CLERK_JWKS_CACHE_SECONDS", "3600"))
 
-async def get_clerk_user_id(request: Request) -> Optional[str]:
-    """Extract and validate the Clerk user ID from the request"""
-    # Try session cookie first
-    session_token = request.cookies.get("__session")
-    
-    # If no cookie, try Authorization header
-    if not session_token:
-        auth_header = request.headers.get("Authorization", "")
-        if auth_header.startswith("Bearer "):
-            session_token = auth_header[7:]
-    
-    if not session_token:
+# Verified-token caches (Clerk and custom tokens each), per worker; 0 entries disables them
+CLERK_TOKEN_CACHE_SIZE = int(os.getenv("CLERK_TOKEN_CACHE_SIZE", "10000"))
+CLERK_TOKEN_CACHE_TTL = float(os.getenv("CLERK_TOKEN_CACHE_TTL", "300"))  # upper bound; never past the token's exp
+
+
+@dataclass(frozen=True)
+class Principal:
+    """Who a request is authenticated as: a Clerk user id or one of our users.id values"""
+    provider: str  # "clerk" or "custom"
+    subject: str
+    claims: Dict[str, Any] = field(compare=False, repr=False)
+
+    @property
+    def user_id(self) -> Optional[uuid.UUID]:
+        """users.id for custom-auth principals; Clerk principals need a lookup by clerk_id"""
+        return uuid.UUID(self.subject) if self.provider == "custom" else None
+
+
+class CachedTokenVerifier:
+    """
+    Verifies tokens and remembers the claims of tokens it has verified.
+
+    Entries are keyed by a SHA-256 digest of the token, so raw tokens are never held, and
+    expire at the token's `exp` or after `cache_ttl` seconds, whichever comes first. Invalid
+    tokens are never cached. Subclasses implement `_decode`.
+    """
+
+    def __init__(self, cache_size: int = 10000, cache_ttl: float = 300):
+        self.cache = LocalCache(max_entries=cache_size, max_bytes=cache_size * 1024, default_ttl=cache_ttl) if cache_size > 0 else None
+        self._stats = {"verified": 0, "rejected": 0}
+
+    def cached_claims(self, token: str) -> Optional[Dict[str, Any]]:
+        """Claims of a token verified earlier and not yet expired, without touching the signature"""
+        if self.cache is None:
+            return None
+        claims = self.cache.get(self._digest(token))
+        # The cache TTL runs on the monotonic clock; re-check exp against wall time
+        if claims is not None and claims.get("exp", 0) > time.time():
+            return claims
         return None
-    
-    try:
-        # Verify the JWT token
-        decoded = jwt.decode(
-            session_token,
-            CLERK_JWT_KEY,
+
+    def verify(self, token: str) -> Optional[Dict[str, Any]]:
+        """Full verification; returns the claims, or None if the token is invalid"""
+        claims = self.cached_claims(token)
+        if claims is not None:
+            return claims
+        try:
+            claims = self._decode(token)
+        except Exception as e:
+            logger.info(f"Token validation error: {str(e)}")
+            claims = None
+        if claims is None:
+            self._stats["rejected"] += 1
+            return None
+
+        self._stats["verified"] += 1
+        ttl = claims["exp"] - time.time()
+        if self.cache is not None and ttl > 0:
+            self.cache.set(self._digest(token), claims, ttl=ttl, size=len(token))
+        return claims
+
+    @property
+    def may_block(self) -> bool:
+        """Whether verifying a new token can wait on the network"""
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "cache": self.cache.stats() if self.cache is not None else None}
+
+    def _decode(self, token: str) -> Optional[Dict[str, Any]]:
+        raise NotImplementedError
+
+    @staticmethod
+    def _digest(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+
+class ClerkTokenVerifier(CachedTokenVerifier):
+    """
+    Clerk session tokens (RS256).
+
+    The JWKS is cached for `jwks_cache_seconds`, so keys Clerk retires drop out; a token signed
+    with an unknown `kid` forces an early refetch (at most every 30s), which picks up rotated keys.
+    """
+
+    def __init__(self, jwks_url: str = "", static_key: str = "", audience: Optional[str] = None, issuer: Optional[str] = None, cache_size: int = 10000, cache_ttl: float = 300, jwks_cache_seconds: int = 3600):
+        super().__init__(cache_size, cache_ttl)
+        self.audience = audience
+        self.issuer = issuer
+        self.static_key = static_key
+        self.jwks_client = jwt.PyJWKClient(jwks_url, lifespan=jwks_cache_seconds) if jwks_url else None
+
+    @property
+    def may_block(self) -> bool:
+        return self.jwks_client is not None
+
+    def _decode(self, token: str) -> Optional[Dict[str, Any]]:
+        key = self.jwks_client.get_signing_key_from_jwt(token).key if self.jwks_client else self.static_key
+        return jwt.decode(
+            token,
+            key,
             algorithms=["RS256"],
-            audience="fastapi-app",  # Set your app name here
-            options={"verify_exp": True}
+            audience=self.audience,
+            issuer=self.issuer,
+            options={"verify_exp": True, "require": ["exp", "sub"]}
         )
-        
-        # Extract user ID
-        user_id = decoded.get("sub")
-        if not user_id:
+
+
+class AppTokenVerifier(CachedTokenVerifier):
+    """Access tokens issued by /api/auth/token (HS256); password reset tokens are rejected"""
+
+    def _decode(self, token: str) -> Optional[Dict[str, Any]]:
+        claims = decode_token(token)
+        if not claims or claims.get("type") == "reset" or "exp" not in claims:
             return None
-        
-        return user_id
-    
-    except Exception as e:
-        print(f"Token validation error: {str(e)}")
+        uuid.UUID(claims["sub"])
+        return claims
+
+
+clerk_token_verifier = ClerkTokenVerifier(
+    jwks_url=CLERK_JWKS_URL,
+    static_key=CLERK_JWT_KEY,
+    audience=CLERK_JWT_AUDIENCE or None,
+    issuer=CLERK_ISSUER or None,
+    cache_size=CLERK_TOKEN_CACHE_SIZE,
+    cache_ttl=CLERK_TOKEN_CACHE_TTL,
+    jwks_cache_seconds=CLERK_JWKS_CACHE_SECONDS
+)
+app_token_verifier = AppTokenVerifier(cache_size=CLERK_TOKEN_CACHE_SIZE, cache_ttl=CLERK_TOKEN_CACHE_TTL)
+
+# Optional so a missing header reaches get_principal instead of failing here; it also puts
+# the "Authorize" button on the OpenAPI docs
+bearer_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token", auto_error=False)
+
+def token_from_request(request: Request) -> Optional[str]:
+    """Bearer token from the Authorization header, else Clerk's __session cookie"""
+    auth_header = request.headers.get("Authorization", "")
+    if auth_header.startswith("Bearer "):
+        return auth_header[7:]
+    return request.cookies.get("__session")
+
+def verifier_for(token: str) -> Tuple[Optional[str], Optional[CachedTokenVerifier]]:
+    """
+    Pick the verifier from the unverified header: RS256 is a Clerk session token, HS256 one
+    of our access tokens. Anything else (or garbage) has no verifier.
+    """
+    try:
+        # Only the header segment; jwt.get_unverified_header scans the whole token first
+        alg = json.loads(jwt.utils.base64url_decode(token.split(".", 1)[0])).get("alg")
+    except (AttributeError, ValueError):
+        return None, None
+    if alg == "RS256":
+        return "clerk", clerk_token_verifier
+    if alg == "HS256":
+        return "custom", app_token_verifier
+    return None, None
+
+async def get_principal(request: Request, bearer: Optional[str] = Depends(bearer_scheme)) -> Optional[Principal]:
+    """
+    The request's principal, or None when it carries no valid token.
+
+    The token is verified once per request (the result is kept on request.state for other
+    dependencies) and, through the verifiers' caches, once per token across requests.
+    """
+    if hasattr(request.state, "principal"):
+        return request.state.principal
+
+    token = bearer or token_from_request(request)
+    principal = None
+    if token:
+        provider, verifier = verifier_for(token)
+        if verifier is not None:
+            claims = verifier.cached_claims(token)
+            if claims is None and verifier.may_block:
+                # A miss may need the JWKS endpoint, so it runs off the event loop
+                claims = await asyncio.to_thread(verifier.verify, token)
+            elif claims is None:
+                claims = verifier.verify(token)
+            principal = Principal(provider, claims["sub"], claims) if claims else None
+    request.state.principal = principal
+    return principal
+
+async def require_principal(principal: Optional[Principal] = Depends(get_principal)) -> Principal:
+    """Identity only: any valid Clerk or custom token, without loading the user row"""
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Authentication required",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+async def get_clerk_user_id(request: Request) -> Optional[str]:
+    """Extract and validate the Clerk user ID from the request"""
+    principal = await get_principal(request, bearer=None)
+    if principal is None or principal.provider != "clerk":
         return None
+    return principal.subject
 
 async def require_clerk_auth(request: Request):
     """Middleware that requires Clerk authentication"""
@@ -52,4 +232,4 @@ async def require_clerk_auth(request: Request):
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Authentication required"
         )
-    return user_id
\ No newline at end of file
+    return user_id
@@ -1,4 +1,7 @@
 from .users import User, UserRole, RoleEnum
 from .product import Product
+from .sales import Sale
+from .orders import ProductVariant, Ask, Bid
+from .price_history import PriceHistory
 from app.database import Base
 
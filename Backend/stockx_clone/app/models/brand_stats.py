@@ -0,0 +1,28 @@
+from sqlalchemy import Column, DateTime, DECIMAL, BigInteger, Integer, MetaData, String, Table
+
+# Definition of the view as created by migration 4f7c2e9a1b65
+BRAND_STATS_SQL = """
+SELECT
+    brand,
+    count(*)::integer AS product_count,
+    coalesce(sum(sales_count), 0)::bigint AS total_sales,
+    coalesce(sum(sales_total), 0)::numeric(16, 2) AS total_turnover,
+    round((percentile_cont(0.5) WITHIN GROUP (ORDER BY last_sale_price))::numeric, 2) AS median_last_sale_price,
+    now() AS refreshed_at
+FROM products
+WHERE brand IS NOT NULL
+GROUP BY brand
+"""
+
+# A materialized view, not a table: kept off Base.metadata so create_all never creates it.
+# Refreshed by app/service/brand_stats_service.py.
+brand_stats = Table(
+    "brand_stats",
+    MetaData(),
+    Column("brand", String(100), primary_key=True),
+    Column("product_count", Integer, nullable=False),
+    Column("total_sales", BigInteger, nullable=False),
+    Column("total_turnover", DECIMAL(16, 2), nullable=False),
+    Column("median_last_sale_price", DECIMAL(10, 2)),
+    Column("refreshed_at", DateTime(timezone=True), nullable=False),
+)
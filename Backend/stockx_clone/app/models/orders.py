@@ -0,0 +1,51 @@
+from sqlalchemy import Boolean, Column, DateTime, DECIMAL, ForeignKey, Index, Integer, String, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+from app.database import Base
+
+class ProductVariant(Base):
+    """A tradable size/color of a product; asks and bids are placed against variants"""
+    __tablename__ = "product_variants"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    size = Column(String(20))
+    color = Column(String(50))
+    sku = Column(String(100))
+
+    __table_args__ = (
+        UniqueConstraint("product_id", "size", "color", name="uq_product_variants_product_size_color"),
+    )
+
+class Ask(Base):
+    __tablename__ = "asks"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    variant_id = Column(Integer, ForeignKey("product_variants.id", ondelete="CASCADE"), nullable=False)
+    seller_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
+    price = Column(DECIMAL(10, 2), nullable=False)
+    condition = Column(String(50), nullable=False, default="new")
+    status = Column(String(20), nullable=False, default="active")  # active, matched, cancelled, expired
+    expires_at = Column(DateTime(timezone=True))
+    is_instant = Column(Boolean, default=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        # Rebuilding the in-memory books at startup reads only the live orders, in time priority
+        Index("ix_asks_active_variant", "variant_id", "created_at", "id", postgresql_where=text("status = 'active'")),
+    )
+
+class Bid(Base):
+    __tablename__ = "bids"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    variant_id = Column(Integer, ForeignKey("product_variants.id", ondelete="CASCADE"), nullable=False)
+    buyer_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"))
+    price = Column(DECIMAL(10, 2), nullable=False)
+    status = Column(String(20), nullable=False, default="active")  # active, matched, cancelled, expired
+    expires_at = Column(DateTime(timezone=True))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_bids_active_variant", "variant_id", "created_at", "id", postgresql_where=text("status = 'active'")),
+    )
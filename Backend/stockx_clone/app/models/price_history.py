@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, DECIMAL
+from app.database import Base
+
+class PriceHistory(Base):
+    """OHLC/volume rollup of completed sales per product per time bucket (hour, day, week)"""
+    __tablename__ = "price_history"
+
+    # The primary key doubles as the chart index: one range scan per (product, bucket) series
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), primary_key=True)
+    bucket = Column(String(8), primary_key=True)
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    open = Column(DECIMAL(10, 2), nullable=False)
+    high = Column(DECIMAL(10, 2), nullable=False)
+    low = Column(DECIMAL(10, 2), nullable=False)
+    close = Column(DECIMAL(10, 2), nullable=False)
+    volume = Column(Integer, nullable=False, default=0)
+    turnover = Column(DECIMAL(14, 2), nullable=False, default=0)
+    # Times of the sales behind open/close, so late-arriving sales land in the right place
+    first_sale_at = Column(DateTime(timezone=True), nullable=False)
+    last_sale_at = Column(DateTime(timezone=True), nullable=False)
@@ -1,7 +1,18 @@
-from sqlalchemy import Column, Integer, String, Text, DECIMAL, DateTime
+from sqlalchemy import Column, Computed, Index, Integer, String, Text, DECIMAL, DateTime, UniqueConstraint
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app.database import Base
 
+# Weighted full-text document: name/brand rank above model, model above description.
+# 'simple' config so brand and model names are not stemmed.
+SEARCH_VECTOR_SQL = (
+    "setweight(to_tsvector('simple', coalesce(name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(brand, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(model, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
 class Product(Base):
     __tablename__ = "products"
 
@@ -20,5 +31,36 @@ class Product(Base):
     last_sale_date = Column(DateTime(timezone=True))
     average_price = Column(DECIMAL(10, 2))
     sales_count = Column(Integer, default=0)
+    # Running sum of sale prices; average_price = sales_total / sales_count, kept current per sale
+    sales_total = Column(DECIMAL(14, 2), default=0)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
\ No newline at end of file
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    # Natural key and content fingerprint written by the importer; NULL for products created through the API
+    product_key = Column(String(255))
+    content_hash = Column(String(32))
+    # Maintained by Postgres; deferred so listings don't load it
+    search_vector = deferred(Column(TSVECTOR, Computed(SEARCH_VECTOR_SQL, persisted=True)))
+
+    __table_args__ = (
+        # Upsert target for productsInjection re-imports
+        UniqueConstraint("product_key", name="uq_products_product_key"),
+        Index("ix_products_search_vector", "search_vector", postgresql_using="gin"),
+        # /trending, /three-day-shipping and the trending keyset ordering
+        Index("ix_products_sales_count_id", sales_count.desc(), id.desc(), postgresql_where=sales_count.isnot(None)),
+        # /new-arrivals and the new_arrivals keyset ordering
+        Index("ix_products_created_at_id", created_at.desc(), id.desc()),
+        # Price range filters and the price keyset orderings
+        Index("ix_products_last_sale_price_id", last_sale_price, id, postgresql_where=last_sale_price.isnot(None)),
+        # Brand filter (ordered by id)
+        Index("ix_products_brand_id", brand, id),
+        # /popular-brands: best sellers of each top brand
+        Index("ix_products_brand_sales_count", brand, sales_count.desc().nulls_last(), id),
+        # Category/gender filters on GET /api/products/
+        Index("ix_products_category_gender_id", category, gender, id),
+        # /recommended-for-you: segment filters on rows that have both prices, best sellers first
+        Index(
+            "ix_products_recommendation",
+            category, brand, gender, sales_count.desc(),
+            postgresql_where=retail_price.isnot(None) & last_sale_price.isnot(None)
+        ),
+    )
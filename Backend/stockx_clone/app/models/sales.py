@@ -8,6 +8,10 @@ class Sale(Base):
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"))
+    variant_id = Column(Integer, ForeignKey("product_variants.id", ondelete="SET NULL"))
+    ask_id = Column(Integer, ForeignKey("asks.id", ondelete="SET NULL"))
+    bid_id = Column(Integer, ForeignKey("bids.id", ondelete="SET NULL"))
+    seller_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"))
     buyer_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="SET NULL"))
     sale_price = Column(DECIMAL(10, 2), nullable=False)
     sale_date = Column(DateTime(timezone=True), server_default=func.now())
@@ -17,9 +17,10 @@ from app.models.users import User, RoleEnum, UserRole
 from app.schemas.user_schema import UserResponse, ClerkUserStatusResponse, SendMagicLinkRequest
 from app.service.clerk_service import ClerkService
 from app.service.cache_service import CacheService
+from app.service.principal_cache import PrincipalCache
 
 # Initialize services
-from app.dependencies import get_clerk_service, get_cache_service
+from app.dependencies import get_clerk_service, get_cache_service, get_principal_cache
 
 router = APIRouter(
     prefix="/api/webhooks",
@@ -135,7 +136,7 @@ def handle_user_created(db: Session, data: Dict[Any, Any], cache_service: CacheS
         db.rollback()
         raise
 
-def handle_user_updated(db: Session, data: Dict[Any, Any], cache_service: CacheService):
+def handle_user_updated(db: Session, data: Dict[Any, Any], cache_service: CacheService, principal_cache: PrincipalCache):
     """Handle user.updated event from Clerk"""
     clerk_id = data.get("id")
     logger.info(f"Handling clerk User update for ID: {clerk_id}")
@@ -188,6 +189,7 @@ def handle_user_updated(db: Session, data: Dict[Any, Any], cache_service: CacheS
             "roles": [role.role for role in user.roles]
         }
         cache_service.user_cache(clerk_id, user_data)
+        principal_cache.invalidate(user.id, clerk_id)
         
         logger.info(f"User updated successfully: {user.id}")
     
@@ -196,7 +198,7 @@ def handle_user_updated(db: Session, data: Dict[Any, Any], cache_service: CacheS
         db.rollback()
         raise
 
-def handle_user_deleted(db: Session, data: Dict[Any, Any], cache_service: CacheService):
+def handle_user_deleted(db: Session, data: Dict[Any, Any], cache_service: CacheService, principal_cache: PrincipalCache):
     """Handle user.deleted event from Clerk"""
     clerk_id = data.get("id")
     logger.info(f"Handling user deletion for ID: {clerk_id}")
@@ -210,11 +212,13 @@ def handle_user_deleted(db: Session, data: Dict[Any, Any], cache_service: CacheS
                 db.delete(role)
             
             # Delete the user
+            user_id = user.id
             db.delete(user)
             db.commit()
             
             # Remove from cache
             cache_service.invalidate_user_cache(clerk_id)
+            principal_cache.invalidate(user_id, clerk_id)
             logger.info(f"User deleted successfully: {clerk_id}")
             return True
         else:
@@ -248,7 +252,7 @@ def handle_session_ended(db: Session, data: Dict[Any, Any], cache_service: Cache
 
 
 @router.post("/clerk")
-async def handle_clerk_webhook(request: Request,db: Session = Depends(get_db),clerk_service: ClerkService = Depends(get_clerk_service),cache_service: CacheService = Depends(get_cache_service)):
+async def handle_clerk_webhook(request: Request,db: Session = Depends(get_db),clerk_service: ClerkService = Depends(get_clerk_service),cache_service: CacheService = Depends(get_cache_service),principal_cache: PrincipalCache = Depends(get_principal_cache)):
     """Handle Clerk webhook events using Svix verification"""
     
     # Get raw payload as bytes (important for signature verification)
@@ -279,11 +283,11 @@ async def handle_clerk_webhook(request: Request,db: Session = Depends(get_db),cl
             logger.info(f"User created successfully: {result}")
             
         elif event_type == "user.updated":
-            result = handle_user_updated(db, event_data, cache_service)
+            result = handle_user_updated(db, event_data, cache_service, principal_cache)
             logger.info(f"User updated successfully: {result}")
             
         elif event_type == "user.deleted":
-            result = handle_user_deleted(db, event_data, cache_service)
+            result = handle_user_deleted(db, event_data, cache_service, principal_cache)
             logger.info(f"User deleted successfully: {result}")
             
         elif event_type == "session.created":
@@ -1,62 +1,95 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session, joinedload
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Awaitable, Optional, TypeVar
 import uuid
 
 from app.database import get_db
+from app.dependencies import get_email_service, get_password_hasher, get_principal_cache
+from app.middleware.auth import Principal, get_principal, require_principal
 from app.models.users import User, UserRole, RoleEnum
 from app.schemas.auth_schema import UserRegister, PasswordReset, PasswordUpdate, Token
 from app.schemas.user_schema import UserResponse
 from app.utils.auth import (
-    get_password_hash, 
-    verify_password,
     create_access_token, 
-    decode_token,
     create_reset_token,
     verify_reset_token
 )
 from app.service.email_service import EmailService
+from app.service.password_hasher import HasherOverloaded, PasswordHasher
+from app.service.principal_cache import AuthenticatedUser, PrincipalCache
 
 router = APIRouter(
     prefix="/api/auth",
     tags=["Custom Auth"]
 )
 
-# OAuth2 password flow
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token")
-
-# Initialize email service
-email_service = EmailService()
+T = TypeVar("T")
 
 # Dependency to get current user from token
-async def get_current_user(token: str = Depends(oauth2_scheme),db: Session = Depends(get_db)) -> User:
-    """Get the current user from the JWT token"""
+async def get_current_user(principal: Principal = Depends(require_principal),db: Session = Depends(get_db),principal_cache: PrincipalCache = Depends(get_principal_cache)) -> AuthenticatedUser:
+    """
+    Get the current user's id, active flag and roles for a custom or Clerk token.
+
+    Served from the principal cache; users is only queried on a miss. Use
+    require_principal when identity is enough (reads), require_active_principal
+    for writes, and load the User row where its other columns are needed.
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    # Decode token
-    payload = decode_token(token)
-    if payload is None:
-        raise credentials_exception
-    
-    user_id: str = payload.get("sub")
-    if user_id is None:
-        raise credentials_exception
-    
-    # Find user in database
-    user = db.query(User).filter(User.id == uuid.UUID(user_id)).first()
+    if principal.provider == "custom":
+        user = await principal_cache.get(db, user_id=principal.user_id)
+    else:
+        user = await principal_cache.get(db, clerk_id=principal.subject)
     if user is None or not user.is_active:
         raise credentials_exception
     
     return user
 
+async def require_active_principal(principal: Principal = Depends(require_principal),db: Session = Depends(get_db),principal_cache: PrincipalCache = Depends(get_principal_cache)) -> Principal:
+    """
+    A valid token whose user may still write: a deactivated or deleted user's token stops
+    working as soon as the principal cache is invalidated, not when the token expires.
+
+    Custom tokens need an active users row. Clerk sessions need no row (as before), but an
+    existing one must be active. Served from the principal cache like get_current_user.
+    """
+    if principal.provider == "custom":
+        user = await principal_cache.get(db, user_id=principal.user_id)
+        allowed = user is not None and user.is_active
+    else:
+        user = await principal_cache.get(db, clerk_id=principal.subject)
+        allowed = user is None or user.is_active
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+async def get_optional_user_id(principal: Optional[Principal] = Depends(get_principal)) -> Optional[uuid.UUID]:
+    """User id from a valid custom token, or None for anonymous requests; the user row is not loaded"""
+    return principal.user_id if principal is not None else None
+
+async def hashed(operation: Awaitable[T]) -> T:
+    """Await a password hasher operation; a saturated hasher pool becomes a 503"""
+    try:
+        return await operation
+    except HasherOverloaded:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many sign-in requests right now, please retry",
+            headers={"Retry-After": "1"},
+        )
+
 @router.post("/register", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
-async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
+async def register_user(user_data: UserRegister, db: Session = Depends(get_db), hasher: PasswordHasher = Depends(get_password_hasher), email_service: EmailService = Depends(get_email_service)):
     """Register a new user with custom authentication"""
     # Check if email already exists
     existing_user = db.query(User).filter(User.email == user_data.email).first()
@@ -67,7 +100,7 @@ async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await hashed(hasher.hash(user_data.password))
     user = User(
         email=user_data.email,
         name=user_data.name,
@@ -88,7 +121,7 @@ async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
     db.commit()
     db.refresh(user)  # Refresh to load the new role relationship
     
-    # Send welcome email (handle gracefully)
+    # Queue the welcome email (handle gracefully); the outbox worker sends it
     try:
         email_service.send_welcome_email(user.email, user.name)
     except Exception as e:
@@ -107,11 +140,11 @@ async def register_user(user_data: UserRegister, db: Session = Depends(get_db)):
     return response_data
 
 @router.post("/token", response_model=Token)
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(),db: Session = Depends(get_db)):
+async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(),db: Session = Depends(get_db),hasher: PasswordHasher = Depends(get_password_hasher)):
     """Get an access token using username/password"""
     user = db.query(User).filter(User.email == form_data.username).first()
     
-    if not user or not verify_password(form_data.password, user.password_hash):
+    if not user or not await hashed(hasher.verify(form_data.password, user.password_hash)):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -132,8 +165,16 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-async def read_users_me(current_user: User = Depends(get_current_user)):
+async def read_users_me(current_user: AuthenticatedUser = Depends(get_current_user),db: Session = Depends(get_db)):
     """Get the current authenticated user"""
+    # The principal only carries id/active/roles; the profile columns come from the row
+    current_user = db.query(User).options(joinedload(User.roles)).filter(User.id == current_user.id).first()
+    if current_user is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+    
     # Create a dictionary with the correct structure
     user_data = {
         "id": current_user.id,
@@ -145,7 +186,7 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
     return user_data
 
 @router.post("/reset-password")
-async def request_password_reset(reset_data: PasswordReset,request: Request,db: Session = Depends(get_db)):
+async def request_password_reset(reset_data: PasswordReset,request: Request,db: Session = Depends(get_db),email_service: EmailService = Depends(get_email_service)):
     """Request a password reset email"""
     user = db.query(User).filter(User.email == reset_data.email).first()
     
@@ -160,13 +201,13 @@ async def request_password_reset(reset_data: PasswordReset,request: Request,db:
     base_url = str(request.base_url)
     reset_link = f"{base_url}reset-password?token={reset_token}"
     
-    # Send email
+    # Queue the email
     email_service.send_password_reset(user.email, reset_link)
     
     return {"message": "If your email is registered, you will receive a password reset link"}
 
 @router.post("/update-password")
-async def update_password(password_data: PasswordUpdate,db: Session = Depends(get_db)):
+async def update_password(password_data: PasswordUpdate,db: Session = Depends(get_db),principal_cache: PrincipalCache = Depends(get_principal_cache),hasher: PasswordHasher = Depends(get_password_hasher)):
     """Update a user's password using a reset token"""
     user_id = verify_reset_token(password_data.token)
     if not user_id:
@@ -184,8 +225,9 @@ async def update_password(password_data: PasswordUpdate,db: Session = Depends(ge
         )
     
     # Update password
-    user.password_hash = get_password_hash(password_data.new_password)
+    user.password_hash = await hashed(hasher.hash(password_data.new_password))
     db.commit()
+    principal_cache.invalidate(user.id, user.clerk_id)
     
     return {"message": "Password updated successfully"}
 
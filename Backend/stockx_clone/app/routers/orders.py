@@ -0,0 +1,93 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.dependencies import get_market_data_sync, get_order_service
+from app.routers.custom_auth import get_current_user
+from app.schemas.order_schema import AskCreate, BidCreate, OrderBookSnapshot, OrderPlacement, PriceLevel
+from app.service.market_data import MarketDataSync, book_update, sale_update
+from app.service.order_book import ASK, BID
+from app.service.order_service import OrderNotFound, OrderService, VariantNotFound
+from app.service.principal_cache import AuthenticatedUser
+
+router = APIRouter(
+    prefix="/api/orders",
+    tags=["Orders"]
+)
+
+async def publish_book(market: MarketDataSync, service: OrderService, db: AsyncSession, product_id: int, variant_id: int):
+    """Stream the variant's new lowest ask / highest bid to market data subscribers"""
+    top = await service.top(db, variant_id, levels=0)
+    await asyncio.to_thread(market.publish, book_update(product_id, variant_id, top["lowest_ask"], top["highest_bid"]))
+
+async def place_order(service: OrderService, market: MarketDataSync, db: AsyncSession, side: str, order, owner: AuthenticatedUser, **columns) -> OrderPlacement:
+    try:
+        placement = await service.place(db, side, order.variant_id, owner.id, order.price, order.expires_at, **columns)
+    except VariantNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Variant with ID {order.variant_id} not found"
+        )
+    sale = placement.sale
+    if sale is not None:
+        await asyncio.to_thread(market.publish, sale_update(placement.product_id, sale.variant_id, sale.sale_price, sale.sale_date))
+    await publish_book(market, service, db, placement.product_id, order.variant_id)
+    return OrderPlacement(order=placement.order, sale=sale)
+
+async def cancel_order(service: OrderService, market: MarketDataSync, db: AsyncSession, side: str, order_id: int, owner: AuthenticatedUser):
+    try:
+        variant_id = await service.cancel(db, side, order_id, owner.id)
+    except OrderNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No active {side} with ID {order_id}"
+        )
+    await publish_book(market, service, db, await service.product_id(db, variant_id), variant_id)
+
+@router.post("/asks", response_model=OrderPlacement, status_code=status.HTTP_201_CREATED)
+async def place_ask(ask: AskCreate, db: AsyncSession = Depends(get_async_db), user: AuthenticatedUser = Depends(get_current_user), service: OrderService = Depends(get_order_service), market: MarketDataSync = Depends(get_market_data_sync)):
+    """
+    Place an ask (offer to sell one item of a variant).
+
+    If the highest bid is at or above the ask price it fills immediately at the bid's
+    price and the sale is returned; otherwise the ask rests on the book.
+    """
+    return await place_order(service, market, db, ASK, ask, user, condition=ask.condition)
+
+@router.post("/bids", response_model=OrderPlacement, status_code=status.HTTP_201_CREATED)
+async def place_bid(bid: BidCreate, db: AsyncSession = Depends(get_async_db), user: AuthenticatedUser = Depends(get_current_user), service: OrderService = Depends(get_order_service), market: MarketDataSync = Depends(get_market_data_sync)):
+    """
+    Place a bid (offer to buy one item of a variant).
+
+    If the lowest ask is at or below the bid price it fills immediately at the ask's
+    price and the sale is returned; otherwise the bid rests on the book.
+    """
+    return await place_order(service, market, db, BID, bid, user)
+
+@router.delete("/asks/{ask_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_ask(ask_id: int, db: AsyncSession = Depends(get_async_db), user: AuthenticatedUser = Depends(get_current_user), service: OrderService = Depends(get_order_service), market: MarketDataSync = Depends(get_market_data_sync)):
+    """Cancel one of your active asks."""
+    await cancel_order(service, market, db, ASK, ask_id, user)
+
+@router.delete("/bids/{bid_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def cancel_bid(bid_id: int, db: AsyncSession = Depends(get_async_db), user: AuthenticatedUser = Depends(get_current_user), service: OrderService = Depends(get_order_service), market: MarketDataSync = Depends(get_market_data_sync)):
+    """Cancel one of your active bids."""
+    await cancel_order(service, market, db, BID, bid_id, user)
+
+@router.get("/variants/{variant_id}/book", response_model=OrderBookSnapshot)
+async def get_order_book(variant_id: int, levels: int = Query(10, ge=1, le=100, description="Number of price levels per side"), db: AsyncSession = Depends(get_async_db), service: OrderService = Depends(get_order_service)):
+    """
+    Get a variant's order book.
+
+    Served from the in-memory book, reloaded first if another worker changed it:
+    lowest ask, highest bid and the number of orders at each of the best price levels.
+    """
+    top = await service.top(db, variant_id, levels)
+    return OrderBookSnapshot(
+        variant_id=variant_id,
+        lowest_ask=top["lowest_ask"],
+        highest_bid=top["highest_bid"],
+        asks=[PriceLevel(price=price, orders=count) for price, count in top["asks"]],
+        bids=[PriceLevel(price=price, orders=count) for price, count in top["bids"]],
+    )
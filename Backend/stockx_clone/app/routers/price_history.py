@@ -0,0 +1,36 @@
+from datetime import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+
+from app.database import get_async_db
+from app.models.product import Product
+from app.schemas.price_history_schema import PriceSeries
+from app.service.price_history_service import BUCKETS, get_series
+
+router = APIRouter(
+    prefix="/api/products",
+    tags=["Price History"]
+)
+
+@router.get("/{product_id}/price-history", response_model=PriceSeries)
+async def get_price_history(product_id: int, bucket: str = Query("day", description=f"Bucket size: {', '.join(BUCKETS)}"), start: Optional[datetime] = Query(None, description="Only buckets from this time on"), end: Optional[datetime] = Query(None, description="Only buckets starting before this time"), limit: int = Query(365, ge=1, le=2000, description="Maximum number of buckets (the most recent ones)"), db: AsyncSession = Depends(get_async_db)):
+    """
+    Get a product's price chart series.
+
+    Returns OHLC, volume and turnover per bucket, oldest first, read from the
+    price_history rollup that is updated as sales are recorded.
+    """
+    if bucket not in BUCKETS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported bucket '{bucket}'"
+        )
+
+    points = await get_series(db, product_id, bucket, start, end, limit)
+    if not points and await db.get(Product, product_id) is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product with ID {product_id} not found"
+        )
+    return {"product_id": product_id, "bucket": bucket, "points": points}
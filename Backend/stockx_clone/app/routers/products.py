@@ -1,74 +1,107 @@
-from fastapi import APIRouter, Depends, HTTPException, Query, status
-from sqlalchemy.orm import Session
-from sqlalchemy import func
-from app.database import get_db
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, select, true
+from sqlalchemy.orm import aliased
+from app.database import get_async_db
+from app.dependencies import get_listing_cache_service, get_recommendation_service, get_search_index_sync, get_trending_service
+from app.service.cache_service import CacheService
+from app.service.recommendation_service import RecommendationService, merge_candidates
+from app.service.search_index import SearchIndexSync
+from app.service.trending_service import DEFAULT_TRENDING_WINDOW, TRENDING_WINDOWS, TrendingService
+from app.models.brand_stats import brand_stats
 from app.models.product import Product
-from app.schemas.product_schema import ProductResponse, ProductCreate, ProductUpdate
-from app.middleware.auth import require_clerk_auth
-from typing import List, Optional
-from app.routers.custom_auth import get_current_user
-from app.models.users import User, RoleEnum
+from app.schemas.product_schema import ProductResponse, ProductCreate, ProductUpdate, ProductPage
+from app.middleware.auth import require_principal
+from app.utils.search import SEARCH_COUNT_CAP, build_tsquery, format_hit_count
+from app.utils.pagination import SORT_KEYS, InvalidCursor, decode_cursor, encode_cursor, keyset_clauses
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Union
+from uuid import UUID
+from app.routers.custom_auth import get_optional_user_id, require_active_principal
 
 router = APIRouter(
     prefix="/api/products",
     tags=["Products"]
 )
 
-def require_auth():
-    """Middleware to check authentication using either Clerk or custom auth"""
-    async def wrapper(
-        clerk_user_id: str = Depends(require_clerk_auth, use_cache=False),
-        custom_user: User = Depends(get_current_user, use_cache=False)
-    ):
-        # If either auth method succeeds, return the user
-        if clerk_user_id or custom_user:
-            return True
+# Every listing key embeds this tag's version, so bumping it invalidates all listings at once
+PRODUCTS_CACHE_TAG = "products"
+
+async def cached_listing(cache: CacheService, endpoint: str, params: Dict[str, Any], loader: Callable[[], Awaitable[List[Product]]]):
+    """Serve a listing from the cache, running `loader` only on a miss"""
+    version = await asyncio.to_thread(cache.get_version, PRODUCTS_CACHE_TAG)
+    normalized = "&".join(f"{name}={value}" for name, value in sorted(params.items()) if value is not None)
+    key = f"{endpoint}:v{version}:{normalized}"
+
+    async def load():
+        return jsonable_encoder([ProductResponse.model_validate(p) for p in await loader()])
+
+    return await cache.aget_or_set(key, load)
+
+async def invalidate_listings(cache: CacheService):
+    """Drop every cached listing after a product write"""
+    await asyncio.to_thread(cache.bump_version, PRODUCTS_CACHE_TAG)
+
+def backfill(ranked: List[Dict[str, Any]], fallback: List[Dict[str, Any]], limit: int) -> List[Dict[str, Any]]:
+    """Top up a short listing with fallback products it doesn't already hold"""
+    seen = {product["id"] for product in ranked}
+    return ranked + [product for product in fallback if product["id"] not in seen][:limit - len(ranked)]
+
+async def fetch_all(db: AsyncSession, statement) -> List[Product]:
+    """Run a select and return the ORM rows"""
+    result = await db.execute(statement)
+    return list(result.scalars().all())
+
+def index_product(search_index: Optional[SearchIndexSync], product: Product):
+    """Push a created/updated product into the in-memory search index, if enabled"""
+    if search_index is not None:
+        search_index.upsert(jsonable_encoder(ProductResponse.model_validate(product)))
+
+async def get_product_or_404(db: AsyncSession, product_id: int) -> Product:
+    product = await db.get(Product, product_id)
+    if not product:
         raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Authentication required"
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product with ID {product_id} not found"
         )
-    return wrapper
+    return product
 
-# Existing Routes with minor improvements
+# Query builders, kept separate from the handlers so tests can EXPLAIN the exact statements
 
-@router.get("/trending", response_model=List[ProductResponse])
-def get_trending_products(limit: int = Query(20, description="Number of products to return"), db: Session = Depends(get_db)):
-    
-    """Get trending products based on sales count."""
-    products = db.query(Product).filter(Product.sales_count.isnot(None))\
+def trending_statement(limit: int):
+    return select(Product).filter(Product.sales_count.isnot(None))\
                 .order_by(Product.sales_count.desc())\
-                .limit(limit).all()
-    return products
+                .limit(limit)
 
-@router.get("/popular-brands", response_model=List[ProductResponse])
-def get_popular_brands(limit: int = Query(20, description="Number of products to return"),db: Session = Depends(get_db)):
-    """Get products from the most popular brands."""
-    products = db.query(Product)\
-                .filter(Product.brand.isnot(None))\
-                .order_by(Product.brand.asc())\
-                .limit(limit).all()
-    return products
+def products_by_ids_statement(product_ids: List[int]):
+    return select(Product).filter(Product.id.in_(product_ids))
 
-@router.get("/new-arrivals", response_model=List[ProductResponse])
-def get_new_arrivals(limit: int = Query(20, description="Number of products to return"),db: Session = Depends(get_db)):
-    """Get the most recently added products."""
-    products = db.query(Product)\
-                .order_by(Product.created_at.desc())\
-                .limit(limit).all()
-    return products
+def popular_brands_statement(limit: int, per_brand: int = 1):
+    # Brands ranked by total sales from the brand_stats view, then each brand's best sellers
+    top_brands = select(brand_stats.c.brand, brand_stats.c.total_sales)\
+                .order_by(brand_stats.c.total_sales.desc(), brand_stats.c.brand)\
+                .limit(limit)\
+                .subquery("top_brands")
+    columns = [column for column in Product.__table__.columns if column.name != "search_vector"]
+    best_sellers = select(*columns)\
+                .filter(Product.brand == top_brands.c.brand)\
+                .order_by(Product.sales_count.desc().nulls_last(), Product.id)\
+                .limit(per_brand)\
+                .lateral("best_sellers")
+    return select(aliased(Product, best_sellers))\
+                .select_from(top_brands)\
+                .join(best_sellers, true())\
+                .order_by(top_brands.c.total_sales.desc(), top_brands.c.brand, best_sellers.c.sales_count.desc().nulls_last(), best_sellers.c.id)\
+                .limit(limit)
 
-# New Routes
+def new_arrivals_statement(limit: int):
+    return select(Product)\
+                .order_by(Product.created_at.desc())\
+                .limit(limit)
 
-#TODO - not responding back with data, empty object array
-@router.get("/recommended-for-you", response_model=List[ProductResponse])
-def get_recommended_products(category: Optional[str] = Query(None, description="Filter by product category"),brand: Optional[str] = Query(None, description="Filter by brand"),gender: Optional[str] = Query(None, description="Filter by gender (men, women, unisex)"),limit: int = Query(20, description="Number of products to return"),db: Session = Depends(get_db)):
-    """
-    Get personalized product recommendations.
-    
-    This endpoint returns products based on category, brand, and gender preferences.
-    It prioritizes products with higher sales and good pricing relative to retail.
-    """
-    query = db.query(Product)
+def recommended_statement(category: Optional[str], brand: Optional[str], gender: Optional[str], limit: int):
+    query = select(Product)
     
     # Apply filters if provided
     if category:
@@ -83,123 +116,241 @@ def get_recommended_products(category: Optional[str] = Query(None, description="
     query = query.filter(Product.retail_price.isnot(None), Product.last_sale_price.isnot(None))
     
     # Order by a combination of factors: sales count and value
-    products = query.order_by(
+    return query.order_by(
         Product.sales_count.desc(),
         (Product.retail_price - Product.last_sale_price).desc()
-    ).limit(limit).all()
+    ).limit(limit)
+
+def three_day_shipping_statement(limit: int):
+    # For this example, we'll use products with higher sales as a proxy
+    # for items that might be in stock for quick shipping
+    return select(Product)\
+                .filter(Product.sales_count > 10)\
+                .order_by(Product.sales_count.desc())\
+                .limit(limit)
+
+def filtered_products_statement(brand: Optional[str] = None, category: Optional[str] = None, gender: Optional[str] = None, min_price: Optional[float] = None, max_price: Optional[float] = None):
+    query = select(Product)
     
-    return products
+    # Apply filters if provided
+    if brand:
+        query = query.filter(Product.brand == brand)
+    if category:
+        query = query.filter(Product.category == category)
+    if gender:
+        query = query.filter(Product.gender == gender)
+    if min_price is not None:
+        query = query.filter(Product.last_sale_price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.last_sale_price <= max_price)
+    return query
+
+# Existing Routes with minor improvements
+
+@router.get("/trending", response_model=List[ProductResponse])
+async def get_trending_products(limit: int = Query(20, ge=1, le=100, description="Number of products to return"), window: str = Query(DEFAULT_TRENDING_WINDOW, description=f"Decay window for recent sales: {', '.join(TRENDING_WINDOWS)}"), db: AsyncSession = Depends(get_async_db), cache: CacheService = Depends(get_listing_cache_service), trending: TrendingService = Depends(get_trending_service)):
+    """
+    Get trending products.
+
+    Ranked by a time-decayed sales score (each sale's weight falls by a factor of e
+    per window), read from the precomputed per-window ranking. When that ranking can't
+    fill the page (few recent sales, or products deleted since), the rest comes from
+    lifetime sales count.
+    """
+    if window not in TRENDING_WINDOWS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported window '{window}'"
+        )
+
+    ranked = []
+    product_ids = await asyncio.to_thread(trending.top, window, limit)
+    if product_ids:
+        products = {p.id: p for p in await fetch_all(db, products_by_ids_statement(product_ids))}
+        ranked = [jsonable_encoder(ProductResponse.model_validate(products[product_id])) for product_id in product_ids if product_id in products]
+        if len(ranked) == limit:
+            return ranked
+
+    async def load():
+        return await fetch_all(db, trending_statement(limit))
+    return backfill(ranked, await cached_listing(cache, "trending", {"limit": limit}, load), limit)
+
+@router.get("/popular-brands", response_model=List[ProductResponse])
+async def get_popular_brands(limit: int = Query(20, ge=1, le=100, description="Number of products to return"), per_brand: int = Query(1, ge=1, le=20, description="Best sellers to include per brand"), db: AsyncSession = Depends(get_async_db), cache: CacheService = Depends(get_listing_cache_service)):
+    """
+    Get products from the most popular brands.
+
+    Brands are ranked by total sales from the brand_stats materialized view (refreshed
+    every BRAND_STATS_REFRESH_SECONDS); each contributes its best-selling products.
+    """
+    async def load():
+        return await fetch_all(db, popular_brands_statement(limit, per_brand))
+    return await cached_listing(cache, "popular-brands", {"limit": limit, "per_brand": per_brand}, load)
+
+@router.get("/new-arrivals", response_model=List[ProductResponse])
+async def get_new_arrivals(limit: int = Query(20, description="Number of products to return"),db: AsyncSession = Depends(get_async_db), cache: CacheService = Depends(get_listing_cache_service)):
+    """Get the most recently added products."""
+    async def load():
+        return await fetch_all(db, new_arrivals_statement(limit))
+    return await cached_listing(cache, "new-arrivals", {"limit": limit}, load)
+
+# New Routes
+
+@router.get("/recommended-for-you", response_model=List[ProductResponse])
+async def get_recommended_products(category: Optional[str] = Query(None, description="Filter by product category"),brand: Optional[str] = Query(None, description="Filter by brand"),gender: Optional[str] = Query(None, description="Filter by gender (men, women, unisex)"),limit: int = Query(20, ge=1, le=100, description="Number of products to return"),db: AsyncSession = Depends(get_async_db), cache: CacheService = Depends(get_listing_cache_service), recommender: RecommendationService = Depends(get_recommendation_service), user_id: Optional[UUID] = Depends(get_optional_user_id)):
+    """
+    Get personalized product recommendations.
+    
+    This endpoint returns products based on category, brand, and gender preferences.
+    It prioritizes products with higher sales and good pricing relative to retail.
+    Candidates are precomputed per segment and, for signed-in users, from their
+    purchase history; serving merges the two lists. Until a build exists the
+    ranking is queried directly.
+    """
+    segment_ids, personal_ids = await asyncio.to_thread(recommender.candidates, category, brand, gender, user_id)
+    if segment_ids is not None:
+        # Personal candidates span every segment, so over-fetch and keep those matching the filters
+        wanted = set(segment_ids[:limit]) | set(personal_ids[:limit * 3])
+        products = {p.id: p for p in await fetch_all(db, products_by_ids_statement(list(wanted)))} if wanted else {}
+        filters = {"category": category, "brand": brand, "gender": gender}
+        personal = [
+            product_id for product_id in personal_ids if product_id in products
+            and all(value is None or getattr(products[product_id], name) == value for name, value in filters.items())
+        ]
+        ranked = merge_candidates(personal, [product_id for product_id in segment_ids if product_id in products], limit)
+        return [products[product_id] for product_id in ranked]
+
+    async def load():
+        return await fetch_all(db, recommended_statement(category, brand, gender, limit))
+    
+    params = {"category": category, "brand": brand, "gender": gender, "limit": limit}
+    return await cached_listing(cache, "recommended-for-you", params, load)
 
 @router.get("/three-day-shipping", response_model=List[ProductResponse])
-def get_three_day_shipping(limit: int = Query(20, description="Number of products to return"),db: Session = Depends(get_db)):
+async def get_three_day_shipping(limit: int = Query(20, description="Number of products to return"),db: AsyncSession = Depends(get_async_db), cache: CacheService = Depends(get_listing_cache_service)):
     """
     Get products eligible for three-day shipping.
     
     This endpoint returns products that are available for quick shipping,
     prioritizing popular items with high sales counts.
     """
-    # For this example, we'll use products with higher sales as a proxy
-    # for items that might be in stock for quick shipping
-    products = db.query(Product)\
-                .filter(Product.sales_count > 10)\
-                .order_by(Product.sales_count.desc())\
-                .limit(limit).all()
+    async def load():
+        return await fetch_all(db, three_day_shipping_statement(limit))
     
-    return products
+    return await cached_listing(cache, "three-day-shipping", {"limit": limit}, load)
 
 # CRUD Operations
 
-@router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_auth())])
-def create_product(product: ProductCreate, db: Session = Depends(get_db)):
+@router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_active_principal)])
+async def create_product(product: ProductCreate, db: AsyncSession = Depends(get_async_db), cache: CacheService = Depends(get_listing_cache_service), search_index: Optional[SearchIndexSync] = Depends(get_search_index_sync)):
     """Create a new product."""
     db_product = Product(**product.dict())
     db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    await db.commit()
+    await db.refresh(db_product)
+    await invalidate_listings(cache)
+    index_product(search_index, db_product)
     return db_product
 
-@router.get("/{product_id}", response_model=ProductResponse,dependencies=[Depends(require_auth())])
-def get_product(product_id: int, db: Session = Depends(get_db)):
+@router.get("/{product_id}", response_model=ProductResponse,dependencies=[Depends(require_principal)])
+async def get_product(product_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a product by ID."""
-    product = db.query(Product).filter(Product.id == product_id).first()
-    if not product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Product with ID {product_id} not found"
-        )
-    return product
+    return await get_product_or_404(db, product_id)
 
-@router.get("/", response_model=List[ProductResponse])
-def get_products(skip: int = Query(0, description="Number of records to skip"),limit: int = Query(100, description="Number of records to return"), brand: Optional[str] = Query(None, description="Filter by brand"),category: Optional[str] = Query(None, description="Filter by category"),gender: Optional[str] = Query(None, description="Filter by gender"), min_price: Optional[float] = Query(None, description="Minimum price"),max_price: Optional[float] = Query(None, description="Maximum price"),db: Session = Depends(get_db)):
+@router.get("/", response_model=Union[ProductPage, List[ProductResponse]])
+async def get_products(skip: int = Query(0, description="Number of records to skip"),limit: int = Query(100, description="Number of records to return"), brand: Optional[str] = Query(None, description="Filter by brand"),category: Optional[str] = Query(None, description="Filter by category"),gender: Optional[str] = Query(None, description="Filter by gender"), min_price: Optional[float] = Query(None, description="Minimum price"),max_price: Optional[float] = Query(None, description="Maximum price"),cursor: Optional[str] = Query(None, description="Opaque keyset cursor; pass an empty value for the first page"),sort: str = Query("id", description=f"Keyset ordering: {', '.join(SORT_KEYS)}"),db: AsyncSession = Depends(get_async_db)):
     """
     Get products with optional filtering.
     
     This endpoint allows filtering by various product attributes.
+    Passing `cursor` switches to keyset pagination: the response becomes
+    `{"items": [...], "next_cursor": ...}` and `skip` is ignored. Without it the
+    legacy `skip`/`limit` list is returned.
     """
-    query = db.query(Product)
+    query = filtered_products_statement(brand, category, gender, min_price, max_price)
     
-    # Apply filters if provided
-    if brand:
-        query = query.filter(Product.brand == brand)
-    if category:
-        query = query.filter(Product.category == category)
-    if gender:
-        query = query.filter(Product.gender == gender)
-    if min_price is not None:
-        query = query.filter(Product.last_sale_price >= min_price)
-    if max_price is not None:
-        query = query.filter(Product.last_sale_price <= max_price)
-    
-    # Apply pagination
-    products = query.order_by(Product.id).offset(skip).limit(limit).all()
-    return products
+    if cursor is None:
+        # Legacy offset pagination
+        products = await fetch_all(db, query.order_by(Product.id).offset(skip).limit(limit))
+        return products
 
-@router.put("/{product_id}", response_model=ProductResponse, dependencies=[Depends(require_auth())])
-def update_product(product_id: int,product: ProductUpdate,db: Session = Depends(get_db)):
-    """Update a product by ID."""
-    db_product = db.query(Product).filter(Product.id == product_id).first()
-    if not db_product:
+    if sort not in SORT_KEYS:
         raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Product with ID {product_id} not found"
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unsupported sort '{sort}'"
         )
+    try:
+        key = decode_cursor(sort, cursor)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    filters, order_by = keyset_clauses(sort, key)
+    # Fetch one extra row to know whether another page exists
+    rows = await fetch_all(db, query.filter(*filters).order_by(*order_by).limit(limit + 1))
+    products = rows[:limit]
+    next_cursor = encode_cursor(sort, products[-1]) if products and len(rows) > limit else None
+    return {"items": products, "next_cursor": next_cursor}
+
+@router.put("/{product_id}", response_model=ProductResponse, dependencies=[Depends(require_active_principal)])
+async def update_product(product_id: int,product: ProductUpdate,db: AsyncSession = Depends(get_async_db), cache: CacheService = Depends(get_listing_cache_service), search_index: Optional[SearchIndexSync] = Depends(get_search_index_sync)):
+    """Update a product by ID."""
+    db_product = await get_product_or_404(db, product_id)
     
     # Update model with provided values, skipping None values
     update_data = product.dict(exclude_unset=True)
     for key, value in update_data.items():
         setattr(db_product, key, value)
     
-    db.commit()
-    db.refresh(db_product)
+    await db.commit()
+    await db.refresh(db_product)
+    await invalidate_listings(cache)
+    index_product(search_index, db_product)
     return db_product
 
-@router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_auth())])
-def delete_product(product_id: int, db: Session = Depends(get_db)):
+@router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT, dependencies=[Depends(require_active_principal)])
+async def delete_product(product_id: int, db: AsyncSession = Depends(get_async_db), cache: CacheService = Depends(get_listing_cache_service), search_index: Optional[SearchIndexSync] = Depends(get_search_index_sync)):
     """Delete a product by ID."""
-    db_product = db.query(Product).filter(Product.id == product_id).first()
-    if not db_product:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"Product with ID {product_id} not found"
-        )
+    db_product = await get_product_or_404(db, product_id)
     
-    db.delete(db_product)
-    db.commit()
+    await db.delete(db_product)
+    await db.commit()
+    await invalidate_listings(cache)
+    if search_index is not None:
+        search_index.remove(product_id)
     return None
 
 @router.get("/search/{query}", response_model=List[ProductResponse])
-def search_products(query: str,limit: int = Query(20, description="Number of products to return"),db: Session = Depends(get_db)):
+async def search_products(query: str,response: Response,limit: int = Query(20, description="Number of products to return"),db: AsyncSession = Depends(get_async_db), search_index: Optional[SearchIndexSync] = Depends(get_search_index_sync)):
     """
-    Search products by name, brand, or description.
+    Search products by name, brand, model, or description.
     
-    This endpoint performs a case-insensitive search across multiple product fields.
+    Uses the `search_vector` full-text index: every word must match, the last word
+    is matched as a prefix for typeahead, and results are ranked by relevance
+    (name/brand matches rank above model, model above description).
+    The `X-Total-Hits` header carries the number of matches, capped at 10000.
+    
+    With SEARCH_BACKEND=memory the query is answered by the in-process BM25 index
+    instead, which also tolerates small typos, without touching Postgres.
     """
-    search_term = f"%{query}%"
-    products = db.query(Product).filter(
-        (Product.name.ilike(search_term)) |
-        (Product.brand.ilike(search_term)) |
-        (Product.description.ilike(search_term)) |
-        (Product.model.ilike(search_term))
-    ).limit(limit).all()
-    
-    return products
\ No newline at end of file
+    if search_index is not None:
+        products, total = search_index.index.search(query, limit)
+        response.headers["X-Total-Hits"] = format_hit_count(total)
+        return products
+    
+    tsquery_text = build_tsquery(query)
+    if tsquery_text is None:
+        response.headers["X-Total-Hits"] = "0"
+        return []
+    
+    tsquery = func.to_tsquery("simple", tsquery_text)
+    matches = Product.search_vector.op("@@")(tsquery)
+    rank = func.ts_rank_cd(Product.search_vector, tsquery)
+    
+    products = await fetch_all(db, select(Product).filter(matches).order_by(rank.desc(), Product.id).limit(limit))
+    
+    # Count at most SEARCH_COUNT_CAP matches so broad terms stay cheap
+    capped = select(Product.id).filter(matches).limit(SEARCH_COUNT_CAP).subquery()
+    total = (await db.execute(select(func.count()).select_from(capped))).scalar_one()
+    response.headers["X-Total-Hits"] = format_hit_count(total)
+    
+    return products
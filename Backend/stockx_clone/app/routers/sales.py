@@ -0,0 +1,33 @@
+import asyncio
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database import get_async_db
+from app.dependencies import get_market_data_sync
+from app.routers.custom_auth import require_active_principal
+from app.schemas.sales_schema import SaleRecord, SaleResponse
+from app.service.market_data import MarketDataSync, sale_update
+from app.service.sales_service import ProductNotFound, record_sale
+
+router = APIRouter(
+    prefix="/api/sales",
+    tags=["Sales"]
+)
+
+@router.post("/", response_model=SaleResponse, status_code=status.HTTP_201_CREATED, dependencies=[Depends(require_active_principal)])
+async def create_sale(sale: SaleRecord, db: AsyncSession = Depends(get_async_db), market: MarketDataSync = Depends(get_market_data_sync)):
+    """
+    Record a completed sale.
+
+    The product's sales_count, average_price and last sale are updated in the same
+    transaction, as are its price history buckets.
+    """
+    try:
+        recorded = await record_sale(db, sale.product_id, sale.sale_price, sale.buyer_id, sale.sale_date)
+    except ProductNotFound:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Product with ID {sale.product_id} not found"
+        )
+    await asyncio.to_thread(market.publish, sale_update(recorded.product_id, None, recorded.sale_price, recorded.sale_date))
+    return recorded
@@ -1,2 +1,2 @@
 # This can be empty or include:
-from .product_schema import ProductBase, ProductCreate, ProductUpdate, ProductResponse
\ No newline at end of file
+from .product_schema import ProductBase, ProductCreate, ProductUpdate, ProductResponse, ProductPage
\ No newline at end of file
@@ -0,0 +1,52 @@
+from pydantic import BaseModel, Field, validator
+from typing import List, Optional
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from app.schemas.sales_schema import SaleResponse
+
+class OrderCreate(BaseModel):
+    variant_id: int
+    price: Decimal = Field(..., gt=0, max_digits=10, decimal_places=2)
+    expires_at: Optional[datetime] = None  # good until cancelled
+
+    @validator("expires_at")
+    def expires_in_future(cls, value):
+        if value is not None:
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            if value <= datetime.now(timezone.utc):
+                raise ValueError("expires_at must be in the future")
+        return value
+
+class AskCreate(OrderCreate):
+    condition: str = Field("new", max_length=50)
+
+class BidCreate(OrderCreate):
+    pass
+
+class OrderResponse(BaseModel):
+    id: int
+    variant_id: int
+    price: Decimal
+    status: str
+    expires_at: Optional[datetime] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class OrderPlacement(BaseModel):
+    order: OrderResponse
+    sale: Optional[SaleResponse] = None  # set when the order filled immediately
+
+class PriceLevel(BaseModel):
+    price: Decimal
+    orders: int
+
+class OrderBookSnapshot(BaseModel):
+    variant_id: int
+    lowest_ask: Optional[Decimal] = None
+    highest_bid: Optional[Decimal] = None
+    asks: List[PriceLevel]
+    bids: List[PriceLevel]
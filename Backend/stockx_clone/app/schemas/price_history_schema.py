@@ -0,0 +1,26 @@
+from pydantic import BaseModel, computed_field
+from typing import List, Optional
+from datetime import datetime
+from decimal import Decimal
+
+class PricePoint(BaseModel):
+    bucket_start: datetime
+    open: Decimal
+    high: Decimal
+    low: Decimal
+    close: Decimal
+    volume: int
+    turnover: Decimal
+
+    @computed_field
+    @property
+    def average_price(self) -> Optional[Decimal]:
+        return (self.turnover / self.volume).quantize(Decimal("0.01")) if self.volume else None
+
+    class Config:
+        from_attributes = True
+
+class PriceSeries(BaseModel):
+    product_id: int
+    bucket: str
+    points: List[PricePoint]
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from decimal import Decimal
 
@@ -47,4 +47,8 @@ class ProductResponse(ProductBase):
     updated_at: datetime
     
     class Config:
-        from_attributes = True  # Using from_attributes instead of orm_mode
\ No newline at end of file
+        from_attributes = True  # Using from_attributes instead of orm_mode
+
+class ProductPage(BaseModel):
+    items: List[ProductResponse]
+    next_cursor: Optional[str] = None
@@ -1,7 +1,8 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, validator
 from typing import Optional
 from uuid import UUID
-from datetime import datetime
+from datetime import datetime, timezone
+from decimal import Decimal
 
 class SaleBase(BaseModel):
     variant_id: Optional[int]
@@ -22,3 +23,34 @@ class SaleOut(SaleBase):
 
     class Config:
         orm_mode = True
+
+class SaleRecord(BaseModel):
+    product_id: int
+    sale_price: Decimal = Field(..., gt=0, max_digits=10, decimal_places=2)
+    buyer_id: Optional[UUID] = None
+    sale_date: Optional[datetime] = None  # defaults to now
+
+    @validator("sale_date")
+    def not_in_future(cls, value):
+        # A future sale would hold last_sale_price and its price history buckets until that date
+        if value is not None:
+            if value.tzinfo is None:
+                value = value.replace(tzinfo=timezone.utc)
+            if value > datetime.now(timezone.utc):
+                raise ValueError("sale_date must not be in the future")
+        return value
+
+class SaleResponse(BaseModel):
+    id: int
+    product_id: int
+    variant_id: Optional[int] = None
+    ask_id: Optional[int] = None
+    bid_id: Optional[int] = None
+    seller_id: Optional[UUID] = None
+    buyer_id: Optional[UUID] = None
+    sale_price: Decimal
+    sale_date: datetime
+    status: str
+
+    class Config:
+        from_attributes = True
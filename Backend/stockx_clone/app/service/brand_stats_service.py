@@ -0,0 +1,73 @@
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from sqlalchemy import func, select, text
+from sqlalchemy.engine import Engine
+
+from app.models.brand_stats import brand_stats
+
+logger = logging.getLogger(__name__)
+
+# pg advisory lock key, so concurrent workers (and the cron script) never refresh at once
+REFRESH_LOCK_ID = 0x62726e64  # "brnd"
+
+# CONCURRENTLY keeps /popular-brands readable during the refresh; it needs the unique index on brand
+REFRESH_SQL = "REFRESH MATERIALIZED VIEW CONCURRENTLY brand_stats"
+
+
+def refresh_brand_stats(engine: Engine, min_age_seconds: float = 0) -> bool:
+    """
+    Refresh the brand_stats view unless another refresh is running or it is fresher than
+    min_age_seconds. Returns whether it refreshed.
+    """
+    with engine.begin() as conn:
+        if not conn.execute(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK_ID))).scalar():
+            return False
+        if min_age_seconds:
+            refreshed_at = conn.execute(select(func.max(brand_stats.c.refreshed_at))).scalar()
+            if refreshed_at is not None and (datetime.now(timezone.utc) - refreshed_at).total_seconds() < min_age_seconds:
+                return False
+        conn.execute(text(REFRESH_SQL))
+    return True
+
+
+class BrandStatsRefresher:
+    """
+    Background thread refreshing brand_stats every `interval` seconds.
+
+    Every worker runs one; the view's refreshed_at and the advisory lock make the whole
+    deployment refresh about once per interval rather than once per worker.
+    """
+
+    def __init__(self, engine: Engine, interval: float = 300):
+        self.engine = engine
+        self.interval = interval
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._stats = {"refreshes": 0, "skipped": 0, "errors": 0}
+
+    def start(self) -> None:
+        """Start the refresh thread (idempotent); an interval of 0 disables it"""
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="brand-stats-refresh", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def stats(self) -> Dict[str, int]:
+        return dict(self._stats)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                # A little slack so workers started at slightly different times don't all skip
+                refreshed = refresh_brand_stats(self.engine, min_age_seconds=self.interval * 0.9)
+                self._stats["refreshes" if refreshed else "skipped"] += 1
+            except Exception as e:
+                self._stats["errors"] += 1
+                logger.error(f"Error refreshing brand_stats: {e}")
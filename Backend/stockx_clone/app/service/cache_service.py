@@ -1,13 +1,40 @@
+import asyncio
 import json
-from typing import Any, Optional
+import threading
+import time
+import uuid
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
 from redis import Redis
 from pydantic import BaseModel
+from app.service.local_cache import CacheInvalidationBus, LocalCache
+
+# Deletes the lock only if we still own it, so a slow loader can't release someone else's lock
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
 
 class CacheService:
-    def __init__(self, redis_client: Redis):
+    def __init__(self, redis_client: Redis, prefix: str = "clerk:user:", default_ttl: int = 3600,
+                 local_cache: Optional[LocalCache] = None, invalidation_bus: Optional[CacheInvalidationBus] = None):
         self.redis = redis_client
-        self.prefix = "clerk:user:"
-        self.default_ttl = 3600  # 1 hour
+        self.prefix = prefix
+        self.default_ttl = default_ttl  # 1 hour unless overridden
+
+        # Optional in-process L1 tier in front of Redis
+        self.local = local_cache
+        self.bus = invalidation_bus
+
+        # Per-key locks collapse concurrent misses inside this process
+        self._locks_guard = threading.Lock()
+        self._key_locks: Dict[str, list] = {}
+        self._async_key_locks: Dict[str, list] = {}
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "recomputes": 0, "lock_waits": 0}
 
     def set(self, key: str, value: Any, ttl: int = None) -> bool:
         """Set a value in the cache with optional TTL"""
@@ -21,7 +48,9 @@ class CacheService:
             if ttl is None:
                 ttl = self.default_ttl
                 
-            return self.redis.setex(full_key, ttl, serialized)
+            result = self.redis.setex(full_key, ttl, serialized)
+            self._set_local(full_key, json.loads(serialized), ttl, len(serialized))
+            return result
         except Exception as e:
             print(f"Error setting cache: {e}")
             return False
@@ -30,10 +59,18 @@ class CacheService:
         """Get a value from the cache"""
         full_key = f"{self.prefix}{key}"
         
+        if self.local is not None:
+            value = self.local.get(full_key)
+            if value is not None:
+                return value
+        
         try:
             data = self.redis.get(full_key)
             if data:
-                return json.loads(data)
+                value = json.loads(data)
+                if self.local is not None:
+                    self.local.set(full_key, value, size=len(data))
+                return value
             return None
         except Exception as e:
             print(f"Error getting from cache: {e}")
@@ -44,11 +81,210 @@ class CacheService:
         full_key = f"{self.prefix}{key}"
         
         try:
-            return bool(self.redis.delete(full_key))
+            deleted = bool(self.redis.delete(full_key))
+            self._drop_local(full_key)
+            return deleted
         except Exception as e:
             print(f"Error deleting from cache: {e}")
             return False
 
     def user_cache(self, clerk_id: str, user_data: Any) -> bool:
         """Cache user data by clerk ID"""
-        return self.set(clerk_id, user_data)
\ No newline at end of file
+        return self.set(clerk_id, user_data)
+
+    def invalidate_user_cache(self, clerk_id: str) -> bool:
+        """Drop cached user data for a clerk ID"""
+        return self.delete(clerk_id)
+
+    def get_version(self, tag: str) -> int:
+        """Get the current version number of a cache tag"""
+        version_key = f"{self.prefix}version:{tag}"
+        if self.local is not None:
+            version = self.local.get(version_key)
+            if version is not None:
+                return version
+        try:
+            version = self.redis.get(version_key)
+            version = int(version) if version else 0
+            if self.local is not None:
+                self.local.set(version_key, version)
+            return version
+        except Exception as e:
+            print(f"Error reading cache version: {e}")
+            return 0
+
+    def bump_version(self, tag: str) -> int:
+        """Invalidate every key built from a tag by moving the tag to a new version"""
+        version_key = f"{self.prefix}version:{tag}"
+        try:
+            version = int(self.redis.incr(version_key))
+            self._drop_local(version_key)
+            return version
+        except Exception as e:
+            print(f"Error bumping cache version: {e}")
+            return 0
+
+    def get_or_set(self, key: str, loader: Callable[[], Any], ttl: int = None, lock_timeout: float = 10.0) -> Any:
+        """
+        Read-through get: return the cached value, or compute it with `loader` and cache it.
+
+        Only one caller recomputes a missing key at a time. Threads in this process
+        wait on a local lock, other workers wait on a short-lived Redis lock and then
+        read the freshly cached value.
+        """
+        value = self.get(key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        with self._key_lock(key):
+            # Another thread may have filled the key while we were waiting
+            value = self.get(key)
+            if value is not None:
+                self._count("hits")
+                return value
+            self._count("misses")
+
+            lock_key = f"{self.prefix}lock:{key}"
+            token = uuid.uuid4().hex
+            acquired = self._acquire_lock(lock_key, token, lock_timeout)
+            if acquired is None:
+                # Redis is unavailable, so just compute without caching coordination
+                return loader()
+
+            if not acquired:
+                self._count("lock_waits")
+                deadline = time.monotonic() + lock_timeout
+                while time.monotonic() < deadline:
+                    time.sleep(0.05)
+                    value = self.get(key)
+                    if value is not None:
+                        return value
+
+            try:
+                self._count("recomputes")
+                value = loader()
+                self.set(key, value, ttl)
+                return value
+            finally:
+                if acquired:
+                    self._release_lock(lock_key, token)
+
+    async def aget_or_set(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: int = None, lock_timeout: float = 10.0) -> Any:
+        """
+        Async variant of get_or_set for coroutine loaders.
+
+        L1 hits are served inline; Redis calls run in a worker thread so they don't
+        block the event loop.
+        """
+        value = await self._aget(key)
+        if value is not None:
+            self._count("hits")
+            return value
+
+        async with self._async_key_lock(key):
+            value = await self._aget(key)
+            if value is not None:
+                self._count("hits")
+                return value
+            self._count("misses")
+
+            lock_key = f"{self.prefix}lock:{key}"
+            token = uuid.uuid4().hex
+            acquired = await asyncio.to_thread(self._acquire_lock, lock_key, token, lock_timeout)
+            if acquired is None:
+                return await loader()
+
+            if not acquired:
+                self._count("lock_waits")
+                deadline = time.monotonic() + lock_timeout
+                while time.monotonic() < deadline:
+                    await asyncio.sleep(0.05)
+                    value = await self._aget(key)
+                    if value is not None:
+                        return value
+
+            try:
+                self._count("recomputes")
+                value = await loader()
+                await asyncio.to_thread(self.set, key, value, ttl)
+                return value
+            finally:
+                if acquired:
+                    await asyncio.to_thread(self._release_lock, lock_key, token)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for this process"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else None
+        return stats
+
+    async def _aget(self, key: str) -> Optional[dict]:
+        if self.local is not None:
+            value = self.local.get(f"{self.prefix}{key}")
+            if value is not None:
+                return value
+        return await asyncio.to_thread(self.get, key)
+
+    def _acquire_lock(self, lock_key: str, token: str, lock_timeout: float) -> Optional[bool]:
+        # None means Redis could not be reached
+        try:
+            return bool(self.redis.set(lock_key, token, nx=True, px=int(lock_timeout * 1000)))
+        except Exception as e:
+            print(f"Error acquiring cache lock: {e}")
+            return None
+
+    def _release_lock(self, lock_key: str, token: str) -> None:
+        try:
+            self.redis.eval(RELEASE_LOCK_SCRIPT, 1, lock_key, token)
+        except Exception as e:
+            print(f"Error releasing cache lock: {e}")
+
+    def _set_local(self, full_key: str, value: Any, ttl: int, size: int) -> None:
+        if self.local is None:
+            return
+        self.local.set(full_key, value, ttl=ttl, size=size)
+        if self.bus is not None:
+            self.bus.publish([full_key])
+
+    def _drop_local(self, full_key: str) -> None:
+        if self.local is None:
+            return
+        self.local.delete(full_key)
+        if self.bus is not None:
+            self.bus.publish([full_key])
+
+    def _count(self, name: str) -> None:
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    @contextmanager
+    def _key_lock(self, key: str):
+        # Reference-counted so locks for keys nobody is waiting on get dropped
+        with self._locks_guard:
+            entry = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        try:
+            with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._key_locks.pop(key, None)
+
+    @asynccontextmanager
+    async def _async_key_lock(self, key: str):
+        with self._locks_guard:
+            entry = self._async_key_locks.setdefault(key, [asyncio.Lock(), 0])
+            entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            with self._locks_guard:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    self._async_key_locks.pop(key, None)
@@ -0,0 +1,252 @@
+import json
+import logging
+import random
+import smtplib
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+from redis import Redis
+
+from app.service.email_service import SmtpConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Outcome of one delivery attempt
+SENT, RETRY, FAILED = "sent", "retry", "failed"
+
+
+def classify(error: Exception) -> Tuple[str, bool]:
+    """
+    (outcome, connection still usable) for an exception raised by sendmail.
+
+    5xx replies are permanent: retrying them only gets the same answer. 4xx replies and
+    anything that broke the connection are worth another attempt later.
+    """
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in error.recipients.values()]
+        return (FAILED if codes and all(code >= 500 for code in codes) else RETRY), True
+    if isinstance(error, smtplib.SMTPResponseException):
+        # 421: the server is closing the connection
+        return (FAILED if error.smtp_code >= 500 else RETRY), error.smtp_code != 421
+    return RETRY, False
+
+
+class EmailOutbox:
+    """
+    Outbound email queue in Redis, drained by background workers.
+
+    `enqueue` is a single LPUSH, so requests never wait on SMTP. Each worker moves up to
+    `batch_size` messages onto its own processing list (LMOVE, so a crashed worker loses
+    nothing: its list is requeued once its heartbeat expires) and sends them over one pooled
+    connection. Failed messages are rescheduled in a sorted set by next attempt time with
+    exponential backoff; after `max_attempts`, or on a permanent SMTP error, they go to the
+    dead letter list. Delivery is at least once.
+
+    Dead letters keep the envelope and the error but not the message, which may carry a password
+    reset link; the list expires `dead_letter_ttl` seconds after the last failure.
+    """
+
+    def __init__(self, redis_client: Redis, pool: SmtpConnectionPool, prefix: str = "email:", workers: int = 1, batch_size: int = 20, max_attempts: int = 6, backoff_base: float = 30, backoff_max: float = 3600, dead_letter_limit: int = 10000, dead_letter_ttl: int = 7 * 86400, heartbeat_ttl: int = 30):
+        self.redis = redis_client
+        self.pool = pool
+        self.prefix = prefix
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.dead_letter_limit = dead_letter_limit
+        self.dead_letter_ttl = dead_letter_ttl
+        self.heartbeat_ttl = heartbeat_ttl
+
+        self.queue_key = f"{prefix}outbox"
+        self.retry_key = f"{prefix}retry"
+        self.dead_key = f"{prefix}dead"
+        self.node_id = uuid.uuid4().hex[:12]
+
+        self._threads: List[threading.Thread] = []
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {"enqueued": 0, "sent": 0, "retried": 0, "dead": 0, "batches": 0, "errors": 0}
+
+    def processing_key(self, worker_id: str) -> str:
+        return f"{self.prefix}processing:{worker_id}"
+
+    def heartbeat_key(self, worker_id: str) -> str:
+        return f"{self.prefix}worker:{worker_id}"
+
+    def enqueue(self, from_email: str, to_email: str, message: str) -> Optional[str]:
+        """Queue a built message; returns its id, or None if it could not be queued"""
+        message_id = uuid.uuid4().hex
+        entry = {"id": message_id, "from": from_email, "to": to_email, "message": message, "attempts": 0, "queued_at": time.time()}
+        try:
+            self.redis.lpush(self.queue_key, json.dumps(entry))
+        except Exception as e:
+            logger.error(f"Error queueing email to {to_email}: {e}")
+            return None
+        self._count("enqueued")
+        return message_id
+
+    def start(self) -> None:
+        """Start the workers (idempotent), after requeueing what dead workers left behind"""
+        if any(thread.is_alive() for thread in self._threads):
+            return
+        self._stopped.clear()
+        try:
+            self.recover()
+        except Exception as e:
+            logger.error(f"Error recovering email outbox: {e}")
+        self._threads = [
+            threading.Thread(target=self._run, args=(f"{self.node_id}-{n}",), name=f"email-outbox-{n}", daemon=True)
+            for n in range(self.workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def stop(self, timeout: float = 5) -> None:
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self.pool.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.llen(self.queue_key)
+            pipe.zcard(self.retry_key)
+            pipe.llen(self.dead_key)
+            stats["queued"], stats["scheduled"], stats["dead_letters"] = pipe.execute()
+        except Exception:
+            stats["queued"] = stats["scheduled"] = stats["dead_letters"] = None
+        stats["smtp_pool"] = self.pool.stats()
+        return stats
+
+    def recover(self) -> int:
+        """Requeue messages held by workers whose heartbeat has expired"""
+        requeued = 0
+        for key in self.redis.scan_iter(match=self.processing_key("*")):
+            worker_id = key.decode().rsplit(":", 1)[1]
+            if self.redis.exists(self.heartbeat_key(worker_id)):
+                continue
+            while self.redis.lmove(key, self.queue_key, "RIGHT", "LEFT") is not None:
+                requeued += 1
+        if requeued:
+            logger.warning(f"Requeued {requeued} emails from stopped outbox workers")
+        return requeued
+
+    def promote_due(self, now: Optional[float] = None) -> int:
+        """Move retries whose time has come back onto the queue"""
+        due = self.redis.zrangebyscore(self.retry_key, "-inf", now or time.time(), start=0, num=self.batch_size)
+        promoted = 0
+        for raw in due:
+            # Only the worker whose ZREM succeeds requeues it
+            if self.redis.zrem(self.retry_key, raw):
+                self.redis.lpush(self.queue_key, raw)
+                promoted += 1
+        return promoted
+
+    def drain(self, worker_id: Optional[str] = None, block: float = 0, now: Optional[float] = None) -> int:
+        """Claim and send one batch; returns the number of messages handled"""
+        worker_id = worker_id or f"{self.node_id}-0"
+        processing = self.processing_key(worker_id)
+        if block:
+            first = self.redis.blmove(self.queue_key, processing, block, "RIGHT", "LEFT")
+        else:
+            first = self.redis.lmove(self.queue_key, processing, "RIGHT", "LEFT")
+        if first is None:
+            return 0
+        batch = [first]
+        while len(batch) < self.batch_size:
+            raw = self.redis.lmove(self.queue_key, processing, "RIGHT", "LEFT")
+            if raw is None:
+                break
+            batch.append(raw)
+
+        results = self._send(batch)
+        self._settle(processing, results, now or time.time())
+        return len(batch)
+
+    def backoff(self, attempts: int) -> float:
+        """Seconds before attempt `attempts + 1`: doubling from backoff_base, jittered down by up to half"""
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * (0.5 + random.random() / 2)
+
+    def _send(self, batch: List[bytes]) -> List[Tuple[bytes, Dict[str, Any], str, Optional[str]]]:
+        """Send a batch over as few connections as possible: (raw, entry, outcome, error) per message"""
+        results = []
+        server = None
+        for raw in batch:
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                results.append((raw, None, FAILED, "unreadable entry"))
+                continue
+            try:
+                if server is None:
+                    server = self.pool.acquire()
+                server.sendmail(entry["from"], entry["to"], entry["message"])
+                results.append((raw, entry, SENT, None))
+            except Exception as e:
+                outcome, usable = classify(e)
+                if server is not None and not usable:
+                    self.pool.discard(server)
+                    server = None
+                results.append((raw, entry, outcome, str(e)))
+        if server is not None:
+            self.pool.release(server)
+        return results
+
+    def _settle(self, processing: str, results: List[Tuple[bytes, Dict[str, Any], str, Optional[str]]], now: float) -> None:
+        pipe = self.redis.pipeline(transaction=True)
+        counts = {"sent": 0, "retried": 0, "dead": 0}
+        for raw, entry, outcome, error in results:
+            pipe.lrem(processing, 1, raw)
+            if outcome == SENT:
+                counts["sent"] += 1
+                continue
+            if entry is None:
+                pipe.lpush(self.dead_key, json.dumps({"error": error}))
+                counts["dead"] += 1
+                continue
+            entry = {**entry, "attempts": entry["attempts"] + 1, "error": error}
+            if outcome == RETRY and entry["attempts"] < self.max_attempts:
+                pipe.zadd(self.retry_key, {json.dumps(entry): now + self.backoff(entry["attempts"])})
+                counts["retried"] += 1
+            else:
+                logger.error(f"Giving up on email to {entry['to']} after {entry['attempts']} attempts: {error}")
+                entry.pop("message")
+                pipe.lpush(self.dead_key, json.dumps(entry))
+                counts["dead"] += 1
+        if counts["dead"]:
+            pipe.ltrim(self.dead_key, 0, self.dead_letter_limit - 1)
+            pipe.expire(self.dead_key, self.dead_letter_ttl)
+        pipe.execute()
+        with self._lock:
+            self._stats["batches"] += 1
+            for name, count in counts.items():
+                self._stats[name] += count
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def _run(self, worker_id: str) -> None:
+        promoted_at = 0.0
+        while not self._stopped.is_set():
+            try:
+                self.redis.set(self.heartbeat_key(worker_id), 1, ex=self.heartbeat_ttl)
+                if time.monotonic() - promoted_at >= 1:
+                    self.promote_due()
+                    promoted_at = time.monotonic()
+                self.drain(worker_id, block=1)
+            except Exception as e:
+                self._count("errors")
+                logger.error(f"Email outbox worker error: {e}")
+                self._stopped.wait(1)
+        try:
+            self.redis.delete(self.heartbeat_key(worker_id))
+        except Exception:
+            pass
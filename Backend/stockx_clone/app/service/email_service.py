@@ -1,51 +1,202 @@
 import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import os
 import logging
-from typing import Optional
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from app.service.email_outbox import EmailOutbox
 
 logger = logging.getLogger(__name__)
 
+
+class SmtpConnectionPool:
+    """
+    Logged-in SMTP connections, kept open between messages.
+
+    Connecting, STARTTLS and AUTH cost several round trips, so a connection is reused until
+    the server drops it. One that sat idle longer than `idle_timeout` is checked with NOOP
+    before reuse. At most `size` idle connections are kept; `acquire` never waits and opens
+    a new one when none is idle.
+    """
+
+    def __init__(self, host: str, port: int, username: str = "", password: str = "", starttls: bool = True, size: int = 2, idle_timeout: float = 30, timeout: float = 30):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.size = size
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._idle: List[Tuple[smtplib.SMTP, float]] = []
+        self._stats = {"opened": 0, "reused": 0, "discarded": 0}
+
+    def acquire(self) -> smtplib.SMTP:
+        while True:
+            with self._lock:
+                if not self._idle:
+                    break
+                server, idle_since = self._idle.pop()
+            if time.monotonic() - idle_since < self.idle_timeout or self._alive(server):
+                self._stats["reused"] += 1
+                return server
+            self.discard(server)
+        return self._open()
+
+    def release(self, server: smtplib.SMTP) -> None:
+        """Hand back a connection that is still in a good state"""
+        with self._lock:
+            if len(self._idle) < self.size:
+                self._idle.append((server, time.monotonic()))
+                return
+        self._close(server)
+
+    def discard(self, server: smtplib.SMTP) -> None:
+        """Drop a connection after a connection-level error"""
+        self._stats["discarded"] += 1
+        self._close(server)
+
+    def close(self) -> None:
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for server, _ in idle:
+            self._close(server)
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, "idle": len(self._idle), "size": self.size}
+
+    def _open(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            self._close(server)
+            raise
+        self._stats["opened"] += 1
+        return server
+
+    @staticmethod
+    def _alive(server: smtplib.SMTP) -> bool:
+        try:
+            return server.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _close(server: smtplib.SMTP) -> None:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            server.close()
+
+
 class EmailService:
-    def __init__(self):
+    def __init__(self, outbox: Optional["EmailOutbox"] = None):
         self.smtp_server = os.getenv("SMTP_SERVER", "smtp.gmail.com")
         self.smtp_port = int(os.getenv("SMTP_PORT", "587"))
         self.smtp_username = os.getenv("SMTP_USERNAME", "")
         self.smtp_password = os.getenv("SMTP_PASSWORD", "")
+        self.smtp_starttls = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
         self.from_email = os.getenv("FROM_EMAIL", "noreply@example.com")
         self.app_name = os.getenv("APP_NAME", "StockX Clone")
 
-    def send_email(self, to_email: str, subject: str, body_html: str, body_text: Optional[str] = None) -> bool:
-        """Send an email"""
+        self.pool = SmtpConnectionPool(
+            self.smtp_server,
+            self.smtp_port,
+            self.smtp_username,
+            self.smtp_password,
+            starttls=self.smtp_starttls,
+            size=int(os.getenv("SMTP_POOL_SIZE", "2"))
+        )
+        # When set, emails are queued and sent by its worker instead of inside the request
+        self.outbox = outbox
+        # Sends emails the outbox couldn't take, off the request (and event loop) thread;
+        # at most fallback_limit wait, and they are lost if the process stops
+        self.fallback_limit = int(os.getenv("EMAIL_FALLBACK_MAX_PENDING", "100"))
+        self._fallback = ThreadPoolExecutor(max_workers=1, thread_name_prefix="email-fallback")
+        self._fallback_lock = threading.Lock()
+        self._fallback_pending = 0
+
+    def build_message(self, to_email: str, subject: str, body_html: str, body_text: Optional[str] = None) -> str:
+        """The full MIME message, ready for sendmail"""
         if not body_text:
             body_text = body_html  # Use HTML as fallback text if not provided
-        
+
+        message = MIMEMultipart("alternative")
+        message["Subject"] = subject
+        message["From"] = f"{self.app_name} <{self.from_email}>"
+        message["To"] = to_email
+
+        # Attach parts
+        message.attach(MIMEText(body_text, "plain"))
+        message.attach(MIMEText(body_html, "html"))
+        return message.as_string()
+
+    def send_email(self, to_email: str, subject: str, body_html: str, body_text: Optional[str] = None) -> bool:
+        """
+        Queue an email on the outbox; without one (or with Redis unavailable) it is handed to a
+        background thread instead. Never waits on SMTP. Returns False if the email was dropped.
+        """
         try:
-            # Create message
-            message = MIMEMultipart("alternative")
-            message["Subject"] = subject
-            message["From"] = f"{self.app_name} <{self.from_email}>"
-            message["To"] = to_email
-            
-            # Attach parts
-            part1 = MIMEText(body_text, "plain")
-            part2 = MIMEText(body_html, "html")
-            message.attach(part1)
-            message.attach(part2)
-            
-            # Send email
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()
-                server.login(self.smtp_username, self.smtp_password)
-                server.sendmail(self.from_email, to_email, message.as_string())
-            
-            logger.info(f"Email sent to {to_email}")
+            message = self.build_message(to_email, subject, body_html, body_text)
+        except Exception as e:
+            logger.error(f"Error building email: {str(e)}")
+            return False
+
+        if self.outbox is not None and self.outbox.enqueue(self.from_email, to_email, message):
             return True
-        
+        with self._fallback_lock:
+            if self._fallback_pending >= self.fallback_limit:
+                logger.error(f"Dropping email to {to_email}: {self._fallback_pending} emails already waiting to be sent")
+                return False
+            self._fallback_pending += 1
+        self._fallback.submit(self._deliver_fallback, to_email, message)
+        return True
+
+    def _deliver_fallback(self, to_email: str, message: str) -> None:
+        try:
+            self.deliver(to_email, message)
+        finally:
+            with self._fallback_lock:
+                self._fallback_pending -= 1
+
+    def shutdown(self) -> None:
+        """Send what the fallback thread still holds, then close pooled connections"""
+        self._fallback.shutdown(wait=True)
+        self.pool.close()
+
+    def deliver(self, to_email: str, message: str) -> bool:
+        """Send a built message now, over a pooled connection"""
+        try:
+            server = self.pool.acquire()
+        except Exception as e:
+            logger.error(f"Error sending email: {str(e)}")
+            return False
+        try:
+            server.sendmail(self.from_email, to_email, message)
+        except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+            # The server answered; the connection itself is still usable
+            self.pool.release(server)
+            logger.error(f"Error sending email: {str(e)}")
+            return False
         except Exception as e:
+            self.pool.discard(server)
             logger.error(f"Error sending email: {str(e)}")
             return False
+        self.pool.release(server)
+        logger.info(f"Email sent to {to_email}")
+        return True
     
     def send_password_reset(self, to_email: str, reset_link: str) -> bool:
         """Send a password reset email"""
@@ -0,0 +1,107 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Tuple
+from redis import Redis
+from app.service.pubsub import RedisChannelListener
+
+class LocalCache:
+    """
+    Bounded in-process LRU cache with per-key TTL.
+
+    Values are returned as stored (no copy), so callers must treat them as read-only.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 30):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[Any, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get a value, refreshing its LRU position"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats["misses"] += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return default
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, size: int = 1) -> None:
+        """Store a value; `size` is its approximate footprint in bytes"""
+        if size > self.max_bytes:
+            return
+        ttl = self.default_ttl if ttl is None else min(ttl, self.default_ttl)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self._stats["evictions"] += 1
+
+    def delete(self, key: str) -> None:
+        """Remove a key if present"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+                self._stats["invalidations"] += 1
+
+    def clear(self) -> None:
+        """Drop every entry"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return counters and current occupancy"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._bytes
+        return stats
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+class CacheInvalidationBus(RedisChannelListener):
+    """
+    Keeps LocalCache instances in different workers coherent through Redis pub/sub.
+
+    Every set/delete publishes the affected keys; each worker's listener thread drops
+    them from its local tier. Messages from this worker are ignored.
+    """
+
+    thread_name = "cache-invalidation"
+
+    def __init__(self, redis_client: Redis, local_cache: LocalCache, channel: str = "cache:invalidate"):
+        super().__init__(redis_client, channel)
+        self.local_cache = local_cache
+
+    def publish(self, keys: Iterable[str]) -> None:
+        """Tell other workers to drop these keys"""
+        super().publish({"keys": list(keys)})
+
+    def on_connect(self) -> None:
+        # Anything published while we were disconnected is lost, so start clean
+        self.local_cache.clear()
+
+    def handle(self, message: Dict[str, Any]) -> None:
+        for key in message.get("keys", []):
+            self.local_cache.delete(key)
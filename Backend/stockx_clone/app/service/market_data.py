@@ -0,0 +1,199 @@
+import asyncio
+import json
+from collections import Counter, defaultdict
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+from fastapi import WebSocket, WebSocketDisconnect
+from fastapi.encoders import jsonable_encoder
+from redis import Redis
+
+from app.service.pubsub import RedisChannelListener
+
+# Close codes: 1008 policy violation (too slow), 1013 try again later (worker full)
+SLOW_CONSUMER_CLOSE = 1008
+OVERLOADED_CLOSE = 1013
+
+UpdateKey = Tuple[str, int, Optional[int]]
+
+# Prices go out as strings, the way the REST endpoints serialize Decimal
+_ENCODERS = {Decimal: str}
+
+
+def sale_update(product_id: int, variant_id: Optional[int], price: Decimal, sold_at: datetime) -> Dict[str, Any]:
+    return jsonable_encoder({"type": "sale", "product_id": product_id, "variant_id": variant_id, "price": price, "sold_at": sold_at}, custom_encoder=_ENCODERS)
+
+
+def book_update(product_id: int, variant_id: int, lowest_ask: Optional[Decimal], highest_bid: Optional[Decimal]) -> Dict[str, Any]:
+    return jsonable_encoder({"type": "book", "product_id": product_id, "variant_id": variant_id, "lowest_ask": lowest_ask, "highest_bid": highest_bid}, custom_encoder=_ENCODERS)
+
+
+class MarketSubscriber:
+    """
+    One streaming connection.
+
+    Updates are not queued: the latest one per (type, product, variant) replaces any that is
+    still unsent, so a slow client gets fewer, fresher messages and its memory stays bounded
+    by what it subscribed to. Everything pending goes out as one JSON array frame.
+    """
+
+    def __init__(self, websocket: WebSocket, send_timeout: float):
+        self.websocket = websocket
+        self.send_timeout = send_timeout
+        self.products: Set[int] = set()
+        self._pending: Dict[UpdateKey, str] = {}
+        self._ready = asyncio.Event()
+
+    def offer(self, key: UpdateKey, frame: str) -> bool:
+        """Queue an encoded update; returns True if it replaced an unsent one"""
+        coalesced = key in self._pending
+        self._pending[key] = frame
+        self._ready.set()
+        return coalesced
+
+    async def send_updates(self) -> None:
+        """Send pending updates until cancelled; raises TimeoutError if the client stops reading"""
+        while True:
+            await self._ready.wait()
+            self._ready.clear()
+            if not self._pending:
+                continue
+            frames, self._pending = self._pending, {}
+            # The ASGI server only completes the send once its write buffer drains, so a client
+            # that stops reading blocks here while new updates coalesce in _pending
+            await asyncio.wait_for(self.websocket.send_text("[" + ",".join(frames.values()) + "]"), self.send_timeout)
+
+
+class MarketDataHub:
+    """
+    Streams last-sale and lowest-ask/highest-bid updates to this worker's WebSocket subscribers.
+
+    Updates arrive through `dispatch` (on the event loop) and are JSON-encoded once, then handed
+    to every subscriber of the product. A subscriber whose send stays blocked for `send_timeout`
+    seconds is disconnected.
+    """
+
+    def __init__(self, max_subscribers: int = 20000, max_products: int = 100, send_timeout: float = 10.0):
+        self.max_subscribers = max_subscribers
+        self.max_products = max_products
+        self.send_timeout = send_timeout
+
+        self._subscribers: Dict[int, Set[MarketSubscriber]] = defaultdict(set)
+        self._connections = 0
+        self._stats = Counter()
+
+    def dispatch(self, update: Dict[str, Any]) -> None:
+        product_id = update.get("product_id")
+        subscribers = self._subscribers.get(product_id)
+        self._stats["updates"] += 1
+        if not subscribers:
+            return
+        key = (update.get("type"), product_id, update.get("variant_id"))
+        frame = json.dumps(update, separators=(",", ":"))
+        for subscriber in subscribers:
+            if subscriber.offer(key, frame):
+                self._stats["coalesced"] += 1
+            self._stats["offered"] += 1
+
+    def subscribe(self, subscriber: MarketSubscriber, product_ids: Iterable[int]) -> None:
+        for product_id in product_ids:
+            if len(subscriber.products) >= self.max_products:
+                break
+            subscriber.products.add(product_id)
+            self._subscribers[product_id].add(subscriber)
+
+    def unsubscribe(self, subscriber: MarketSubscriber, product_ids: Iterable[int]) -> None:
+        for product_id in list(product_ids):
+            subscriber.products.discard(product_id)
+            subscribers = self._subscribers.get(product_id)
+            if subscribers is not None:
+                subscribers.discard(subscriber)
+                if not subscribers:
+                    del self._subscribers[product_id]
+
+    async def serve(self, websocket: WebSocket, product_ids: Iterable[int]) -> None:
+        """
+        Run one subscriber connection until the client goes away.
+
+        Clients may change their subscriptions by sending {"subscribe": [ids]} or
+        {"unsubscribe": [ids]}.
+        """
+        await websocket.accept()
+        if self._connections >= self.max_subscribers:
+            self._stats["rejected"] += 1
+            await websocket.close(code=OVERLOADED_CLOSE)
+            return
+
+        subscriber = MarketSubscriber(websocket, self.send_timeout)
+        self._connections += 1
+        self.subscribe(subscriber, product_ids)
+        sender = asyncio.create_task(subscriber.send_updates())
+        receiver = asyncio.create_task(self._receive(subscriber))
+        try:
+            done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if sender in done and isinstance(sender.exception(), asyncio.TimeoutError):
+                self._stats["slow_disconnects"] += 1
+                try:
+                    await asyncio.wait_for(websocket.close(code=SLOW_CONSUMER_CLOSE), 1.0)
+                except Exception:
+                    pass
+        finally:
+            sender.cancel()
+            receiver.cancel()
+            self.unsubscribe(subscriber, subscriber.products)
+            self._connections -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connections": self._connections,
+            "products": len(self._subscribers),
+            **self._stats,
+        }
+
+    async def _receive(self, subscriber: MarketSubscriber) -> None:
+        try:
+            while True:
+                try:
+                    message = json.loads(await subscriber.websocket.receive_text())
+                except ValueError:
+                    continue
+                if not isinstance(message, dict):
+                    continue
+                for action, apply in (("subscribe", self.subscribe), ("unsubscribe", self.unsubscribe)):
+                    ids = message.get(action)
+                    if isinstance(ids, list):
+                        apply(subscriber, [int(i) for i in ids if isinstance(i, int) and not isinstance(i, bool)])
+        except WebSocketDisconnect:
+            return
+
+
+class MarketDataSync(RedisChannelListener):
+    """
+    Fans market updates out to every worker's hub over one Redis channel.
+
+    Each worker receives every update and drops those no local client follows, so subscribing
+    never touches Redis. The listener thread hands updates to the event loop bound at startup.
+    """
+
+    thread_name = "market-data-sync"
+
+    def __init__(self, redis_client: Redis, hub: MarketDataHub, channel: str = "market:updates"):
+        super().__init__(redis_client, channel)
+        self.hub = hub
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+
+    def publish(self, update: Dict[str, Any]) -> None:
+        """Deliver to this worker's subscribers and broadcast to the others; safe from any thread"""
+        self._deliver(update)
+        super().publish(update)
+
+    def handle(self, message: Dict[str, Any]) -> None:
+        message.pop("origin", None)
+        self._deliver(message)
+
+    def _deliver(self, update: Dict[str, Any]) -> None:
+        if self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self.hub.dispatch, update)
@@ -0,0 +1,266 @@
+import heapq
+import itertools
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+ASK = "ask"
+BID = "bid"
+SIDES = (ASK, BID)
+
+
+def to_cents(price: Decimal) -> int:
+    """Heap key for a price; integer comparisons are several times cheaper than Decimal ones"""
+    return int(price * 100)
+
+
+@dataclass(eq=False)
+class Order:
+    """One resting or incoming order; asks and bids are for a single item each"""
+    side: str
+    order_id: int
+    variant_id: int
+    price: Decimal
+    owner_id: Optional[UUID] = None
+    expires_at: Optional[datetime] = None
+    sequence: int = 0  # time priority, assigned by the engine
+    active: bool = True
+    cents: int = field(init=False)
+
+    def __post_init__(self):
+        self.cents = to_cents(self.price)
+
+    def expired(self, now: datetime) -> bool:
+        return self.expires_at is not None and self.expires_at <= now
+
+
+@dataclass
+class Match:
+    """A trade between an incoming order and the best resting order on the other side"""
+    incoming: Order
+    resting: Order
+
+    @property
+    def price(self) -> Decimal:
+        # The resting order set the price the incoming one accepted
+        return self.resting.price
+
+    @property
+    def ask(self) -> Order:
+        return self.incoming if self.incoming.side == ASK else self.resting
+
+    @property
+    def bid(self) -> Order:
+        return self.incoming if self.incoming.side == BID else self.resting
+
+
+@dataclass
+class SubmitResult:
+    match: Optional[Match] = None
+    expired: List[Order] = field(default_factory=list)  # resting orders dropped as expired while matching
+
+
+class OrderBook:
+    """
+    Lowest-ask / highest-bid book for one variant with price-time priority.
+
+    Each side is a binary heap keyed by (price, sequence); bids negate the price so both are
+    min-heaps. Cancelled and expired orders are marked inactive and discarded when they
+    surface at the top, so add, cancel and match are all O(log n).
+    """
+
+    def __init__(self, variant_id: int):
+        self.variant_id = variant_id
+        self._heaps: Dict[str, List[Tuple[int, int, Order]]] = {ASK: [], BID: []}
+        self._levels: Dict[str, Counter] = {ASK: Counter(), BID: Counter()}  # live orders per price, for depth
+
+    def __len__(self) -> int:
+        return sum(sum(levels.values()) for levels in self._levels.values())
+
+    def add(self, order: Order) -> None:
+        key = order.cents if order.side == ASK else -order.cents
+        heapq.heappush(self._heaps[order.side], (key, order.sequence, order))
+        self._levels[order.side][order.price] += 1
+
+    def discard(self, order: Order) -> None:
+        """Take an order out of the book; its heap entry is dropped lazily"""
+        if order.active:
+            order.active = False
+            self._release(order)
+
+    def best(self, side: str, now: Optional[datetime] = None, expired: Optional[List[Order]] = None) -> Optional[Order]:
+        heap = self._heaps[side]
+        now = now or datetime.now(timezone.utc)
+        while heap:
+            order = heap[0][2]
+            if not order.active:
+                heapq.heappop(heap)
+            elif order.expired(now):
+                heapq.heappop(heap)
+                self.discard(order)
+                if expired is not None:
+                    expired.append(order)
+            else:
+                return order
+        return None
+
+    def match(self, incoming: Order, now: datetime, expired: List[Order]) -> Optional[Order]:
+        """
+        Pop the best resting order the incoming one crosses, or None.
+
+        Orders from the same owner are never matched with each other; they are set aside
+        while looking further down the book and pushed back afterwards.
+        """
+        opposite = BID if incoming.side == ASK else ASK
+        heap = self._heaps[opposite]
+        own: List[Tuple[int, int, Order]] = []
+        found = None
+        while True:
+            resting = self.best(opposite, now, expired)
+            if resting is None or not self._crosses(incoming, resting):
+                break
+            entry = heapq.heappop(heap)
+            if incoming.owner_id is not None and resting.owner_id == incoming.owner_id:
+                own.append(entry)
+                continue
+            resting.active = False
+            self._release(resting)
+            found = resting
+            break
+        for entry in own:
+            heapq.heappush(heap, entry)
+        return found
+
+    def orders(self) -> Iterable[Order]:
+        """Live orders on either side, in no particular order"""
+        for heap in self._heaps.values():
+            for _, _, order in heap:
+                if order.active:
+                    yield order
+
+    def depth(self, side: str, levels: int = 10) -> List[Tuple[Decimal, int]]:
+        """(price, order count) for the best `levels` price levels of one side"""
+        counts = self._levels[side]
+        pick = heapq.nsmallest if side == ASK else heapq.nlargest
+        return [(price, counts[price]) for price in pick(levels, counts)]
+
+    def _release(self, order: Order) -> None:
+        levels = self._levels[order.side]
+        levels[order.price] -= 1
+        if levels[order.price] <= 0:
+            del levels[order.price]
+
+    @staticmethod
+    def _crosses(incoming: Order, resting: Order) -> bool:
+        if incoming.side == BID:
+            return incoming.cents >= resting.cents
+        return incoming.cents <= resting.cents
+
+
+class OrderBookEngine:
+    """
+    In-memory matching engine: one OrderBook per variant plus an id index for cancels.
+
+    The engine only knows the orders placed through its own process. With several workers,
+    OrderService serializes placements per variant across them and calls `replace` to reload
+    a variant's book from the database whenever another worker has changed it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._books: Dict[int, OrderBook] = {}
+        self._orders: Dict[Tuple[str, int], Order] = {}
+        self._sequence = itertools.count(1)
+        self.submitted = 0
+        self.matched = 0
+
+    def book(self, variant_id: int) -> OrderBook:
+        book = self._books.get(variant_id)
+        if book is None:
+            book = self._books[variant_id] = OrderBook(variant_id)
+        return book
+
+    def load(self, orders: Iterable[Order]) -> None:
+        """Rest already-persisted orders without matching them; pass them in time priority order"""
+        with self._lock:
+            for order in orders:
+                self._rest(order)
+
+    def replace(self, variant_id: int, orders: Iterable[Order]) -> None:
+        """Swap in a variant's book as reloaded from the database; pass the orders in time priority order"""
+        with self._lock:
+            book = self._books.pop(variant_id, None)
+            if book is not None:
+                for order in book.orders():
+                    self._orders.pop((order.side, order.order_id), None)
+            self.book(variant_id)
+            for order in orders:
+                self._rest(order)
+
+    def submit(self, order: Order, now: Optional[datetime] = None) -> SubmitResult:
+        """Match an incoming order against the book, or rest it if nothing crosses"""
+        now = now or datetime.now(timezone.utc)
+        result = SubmitResult()
+        with self._lock:
+            self.submitted += 1
+            book = self.book(order.variant_id)
+            resting = book.match(order, now, result.expired)
+            for stale in result.expired:
+                self._orders.pop((stale.side, stale.order_id), None)
+            if resting is None:
+                self._rest(order)
+            else:
+                self._orders.pop((resting.side, resting.order_id), None)
+                order.active = False
+                result.match = Match(order, resting)
+                self.matched += 1
+        return result
+
+    def cancel(self, side: str, order_id: int) -> Optional[Order]:
+        with self._lock:
+            order = self._orders.pop((side, order_id), None)
+            if order is not None:
+                self.book(order.variant_id).discard(order)
+            return order
+
+    def restore(self, order: Order) -> None:
+        """Put a popped order back with its original time priority, e.g. after a failed write"""
+        with self._lock:
+            if (order.side, order.order_id) not in self._orders:
+                order.active = True
+                self._orders[(order.side, order.order_id)] = order
+                self.book(order.variant_id).add(order)
+
+    def top(self, variant_id: int, levels: int = 10) -> Dict[str, object]:
+        with self._lock:
+            book = self.book(variant_id)
+            expired: List[Order] = []
+            lowest_ask = book.best(ASK, expired=expired)
+            highest_bid = book.best(BID, expired=expired)
+            for stale in expired:
+                self._orders.pop((stale.side, stale.order_id), None)
+            return {
+                "lowest_ask": lowest_ask.price if lowest_ask else None,
+                "highest_bid": highest_bid.price if highest_bid else None,
+                "asks": book.depth(ASK, levels),
+                "bids": book.depth(BID, levels),
+            }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "books": len(self._books),
+                "resting_orders": len(self._orders),
+                "submitted": self.submitted,
+                "matched": self.matched,
+            }
+
+    def _rest(self, order: Order) -> None:
+        order.active = True
+        order.sequence = next(self._sequence)
+        self._orders[(order.side, order.order_id)] = order
+        self.book(order.variant_id).add(order)
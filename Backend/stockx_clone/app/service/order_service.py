@@ -0,0 +1,254 @@
+import asyncio
+import logging
+import weakref
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Dict, Iterable, List, Optional, Union
+from uuid import UUID
+from redis import Redis
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.models.orders import Ask, Bid, ProductVariant
+from app.models.sales import Sale
+from app.service.order_book import ASK, BID, Order, OrderBookEngine
+from app.service.sales_service import apply_sale
+
+logger = logging.getLogger(__name__)
+
+ORDER_MODELS = {ASK: Ask, BID: Bid}
+OWNER_COLUMNS = {ASK: "seller_id", BID: "buyer_id"}
+
+# First key of pg_advisory_xact_lock(namespace, variant_id), which serializes a variant's order writes across workers
+ORDER_BOOK_LOCK_NAMESPACE = 16016
+
+
+class VariantNotFound(LookupError):
+    """Raised when an order refers to a variant that does not exist"""
+
+
+class OrderNotFound(LookupError):
+    """Raised when an order to cancel does not exist, is not active or belongs to someone else"""
+
+
+@dataclass
+class Placement:
+    product_id: int
+    order: Union[Ask, Bid]
+    sale: Optional[Sale] = None
+
+
+class OrderService:
+    """
+    Places and cancels asks and bids: the engine decides matches in memory, Postgres records them.
+
+    Placements for one variant are serialized on an asyncio lock, so the book never hands out an
+    order whose row another placement has not committed yet. Every fill re-checks the resting row
+    with a conditional UPDATE, and if the transaction fails the book is put back the way it was.
+
+    With `redis_client`, several workers can take orders: writes to a variant also hold a Postgres
+    advisory lock and bump the variant's book version in Redis, and a worker whose copy is behind
+    that version reloads the variant's book from Postgres before matching, cancelling or reading
+    its top. Without it the service
+    must be the only one taking orders.
+    """
+
+    def __init__(self, engine: OrderBookEngine, redis_client: Optional[Redis] = None, prefix: str = "orders:book_version:"):
+        self.engine = engine
+        self.redis = redis_client
+        self.prefix = prefix
+        self._variant_products: Dict[int, int] = {}
+        # Held only while in use, so variants nobody trades don't keep a lock around
+        self._variant_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
+        self._book_versions: Dict[int, bytes] = {}  # variant -> version this worker's book reflects
+
+    async def place(self, db: AsyncSession, side: str, variant_id: int, owner_id: Optional[UUID], price: Decimal, expires_at: Optional[datetime] = None, **columns) -> Placement:
+        """Persist a new order, then fill it against the best crossing order or rest it on the book"""
+        product_id = await self.product_id(db, variant_id)
+        model = ORDER_MODELS[side]
+
+        async with self._variant_lock(variant_id):
+            await self._sync_book(db, variant_id)
+            now = datetime.now(timezone.utc)
+            row = model(variant_id=variant_id, price=price, expires_at=expires_at, status="active", created_at=now, **{OWNER_COLUMNS[side]: owner_id}, **columns)
+            db.add(row)
+            await db.flush()
+
+            order = Order(side, row.id, variant_id, price, owner_id, expires_at)
+            taken: List[Order] = []  # resting orders popped from the book, put back if the write fails
+            sale = None
+            try:
+                while True:
+                    result = self.engine.submit(order, now)
+                    await self._mark(db, result.expired, "expired")
+                    match = result.match
+                    if match is None:
+                        break
+                    taken.append(match.resting)
+                    if await self._claim(db, match.resting):
+                        row.status = "matched"
+                        sale = await apply_sale(
+                            db, product_id, match.price, now,
+                            variant_id=variant_id,
+                            ask_id=match.ask.order_id,
+                            bid_id=match.bid.order_id,
+                            seller_id=match.ask.owner_id,
+                            buyer_id=match.bid.owner_id,
+                        )
+                        break
+                    # Cancelled or filled elsewhere since it was booked; it stays out, try the next one
+                    taken.pop()
+                await self._bump_version(variant_id, own=True)
+                await db.commit()
+            except BaseException:
+                await db.rollback()
+                self.engine.cancel(side, order.order_id)
+                for resting in taken:
+                    self.engine.restore(resting)
+                raise
+
+        return Placement(product_id, row, sale)
+
+    async def cancel(self, db: AsyncSession, side: str, order_id: int, owner_id: Optional[UUID]) -> int:
+        """
+        Cancel one of the owner's active orders and return its variant id.
+
+        A concurrent fill either wins or sees the order cancelled.
+        """
+        model = ORDER_MODELS[side]
+        variant_id = (await db.execute(select(model.variant_id).where(model.id == order_id))).scalar_one_or_none()
+        if variant_id is None:
+            await db.rollback()
+            raise OrderNotFound(order_id)
+        async with self._variant_lock(variant_id):
+            # Catch up first, so the book published after the cancel is the current one
+            await self._sync_book(db, variant_id)
+            statement = update(model)\
+                .where(model.id == order_id, model.status == "active", getattr(model, OWNER_COLUMNS[side]) == owner_id)\
+                .values(status="cancelled")\
+                .returning(model.variant_id)\
+                .execution_options(synchronize_session=False)
+            if (await db.execute(statement)).scalar_one_or_none() is None:
+                await db.rollback()
+                raise OrderNotFound(order_id)
+            await self._bump_version(variant_id, own=True)
+            await db.commit()
+            self.engine.cancel(side, order_id)
+        return variant_id
+
+    async def top(self, db: AsyncSession, variant_id: int, levels: int = 10) -> Dict[str, object]:
+        """
+        The variant's best prices and levels, after reloading its book if another worker changed it.
+
+        The version check holds the advisory lock too: a writer bumps the version before it
+        commits, so reading it without the lock could pair the new version with the old rows.
+        """
+        async with self._variant_lock(variant_id):
+            try:
+                await self._sync_book(db, variant_id)
+                return self.engine.top(variant_id, levels)
+            finally:
+                await db.rollback()  # releases the advisory lock
+
+    async def product_id(self, db: AsyncSession, variant_id: int) -> int:
+        product_id = self._variant_products.get(variant_id)
+        if product_id is None:
+            product_id = (await db.execute(select(ProductVariant.product_id).where(ProductVariant.id == variant_id))).scalar_one_or_none()
+            if product_id is None:
+                raise VariantNotFound(variant_id)
+            self._variant_products[variant_id] = product_id
+        return product_id
+
+    def _variant_lock(self, variant_id: int) -> asyncio.Lock:
+        lock = self._variant_locks.get(variant_id)
+        if lock is None:
+            lock = self._variant_locks[variant_id] = asyncio.Lock()
+        return lock
+
+    async def _lock_variant(self, db: AsyncSession, variant_id: int) -> None:
+        """Serialize this transaction's writes to the variant with other workers'; released at commit"""
+        if self.redis is not None:
+            await db.execute(select(func.pg_advisory_xact_lock(ORDER_BOOK_LOCK_NAMESPACE, variant_id)))
+
+    async def _sync_book(self, db: AsyncSession, variant_id: int) -> None:
+        """Take the variant's lock and reload its book if another worker changed it since we last did"""
+        if self.redis is None:
+            return
+        await self._lock_variant(db, variant_id)
+        try:
+            version = await asyncio.to_thread(self.redis.get, self.prefix + str(variant_id))
+        except Exception as e:
+            logger.error(f"Error reading book version of variant {variant_id}, reloading it: {e}")
+            version = None
+        if version is not None and version == self._book_versions.get(variant_id):
+            return
+
+        now = datetime.now(timezone.utc)
+        orders = []
+        for side in ORDER_MODELS:
+            rows = await db.execute(resting_orders_statement(side, now).where(ORDER_MODELS[side].variant_id == variant_id))
+            orders.extend(Order(side, *row) for row in rows)
+        self.engine.replace(variant_id, orders)
+        if version is not None:
+            self._book_versions[variant_id] = version
+        else:
+            self._book_versions.pop(variant_id, None)
+
+    async def _bump_version(self, variant_id: int, own: bool) -> None:
+        """Tell other workers their copy of the variant's book is stale; call under the advisory lock"""
+        if self.redis is None:
+            return
+        try:
+            version = await asyncio.to_thread(self.redis.incr, self.prefix + str(variant_id))
+        except Exception as e:
+            logger.error(f"Error bumping book version of variant {variant_id}: {e}")
+            version = None
+        if own and version is not None:
+            self._book_versions[variant_id] = str(version).encode()
+        else:
+            self._book_versions.pop(variant_id, None)
+
+    @staticmethod
+    async def _claim(db: AsyncSession, order: Order) -> bool:
+        model = ORDER_MODELS[order.side]
+        statement = update(model)\
+            .where(model.id == order.order_id, model.status == "active")\
+            .values(status="matched")\
+            .returning(model.id)\
+            .execution_options(synchronize_session=False)
+        return (await db.execute(statement)).scalar_one_or_none() is not None
+
+    @staticmethod
+    async def _mark(db: AsyncSession, orders: Iterable[Order], status: str) -> None:
+        for side in (ASK, BID):
+            ids = [order.order_id for order in orders if order.side == side]
+            if ids:
+                model = ORDER_MODELS[side]
+                await db.execute(
+                    update(model)
+                    .where(model.id.in_(ids), model.status == "active")
+                    .values(status=status)
+                    .execution_options(synchronize_session=False)
+                )
+
+
+def resting_orders_statement(side: str, now: datetime):
+    """Active, unexpired orders of one side in time priority order, as Order fields"""
+    model = ORDER_MODELS[side]
+    owner = getattr(model, OWNER_COLUMNS[side])
+    return select(model.id, model.variant_id, model.price, owner, model.expires_at)\
+        .filter(model.status == "active", or_(model.expires_at.is_(None), model.expires_at > now))\
+        .order_by(model.created_at, model.id)
+
+
+def load_resting_orders(db: Session) -> List[Order]:
+    """Active, unexpired orders in time priority order, for rebuilding the books at startup"""
+    now = datetime.now(timezone.utc)
+    orders = []
+    for side in ORDER_MODELS:
+        rows = db.execute(resting_orders_statement(side, now).execution_options(yield_per=5000))
+        orders.extend(Order(side, *row) for row in rows)
+    return orders
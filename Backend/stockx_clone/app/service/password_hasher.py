@@ -0,0 +1,81 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+from app.utils.auth import get_password_hash, verify_password
+
+
+class HasherOverloaded(RuntimeError):
+    """Raised when too many password operations are already waiting; callers should answer 503"""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt on a small dedicated thread pool so it never blocks the event loop.
+
+    bcrypt releases the GIL while hashing, so `workers` threads give that many hashes in
+    parallel. At most `max_queue` operations may wait behind them; past that, new ones are
+    refused straight away, so a login storm costs the callers a quick 503 instead of piling
+    up work (and latency) for everybody.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 64):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hasher")
+
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._stats = {"completed": 0, "rejected": 0, "max_queued": 0, "wait_ms_total": 0.0, "run_ms_total": 0.0}
+
+    async def hash(self, password: str) -> str:
+        return await self._submit(get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password, password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(workers=self.workers, max_queue=self.max_queue, queued=self._queued, running=self._running)
+        completed = stats["completed"]
+        stats["avg_wait_ms"] = round(stats.pop("wait_ms_total") / completed, 2) if completed else None
+        stats["avg_run_ms"] = round(stats.pop("run_ms_total") / completed, 2) if completed else None
+        return stats
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _submit(self, fn: Callable[..., Any], *args: Any) -> Any:
+        with self._lock:
+            if self._queued >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise HasherOverloaded(f"{self._queued} password operations already queued")
+            self._queued += 1
+            self._stats["max_queued"] = max(self._stats["max_queued"], self._queued)
+        job = self._executor.submit(self._run, fn, args, time.perf_counter())
+        try:
+            return await asyncio.wrap_future(job)
+        except asyncio.CancelledError:
+            # The client went away; a job that hasn't started yet never will
+            if job.cancel():
+                with self._lock:
+                    self._queued -= 1
+            raise
+
+    def _run(self, fn: Callable[..., Any], args: tuple, submitted: float) -> Any:
+        started = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._stats["wait_ms_total"] += (started - submitted) * 1000
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._stats["completed"] += 1
+                self._stats["run_ms_total"] += (time.perf_counter() - started) * 1000
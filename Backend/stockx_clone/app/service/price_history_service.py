@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import List, Optional
+
+from sqlalchemy import case, event, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.price_history import PriceHistory
+from app.models.sales import Sale
+
+# Rollup granularities, finest first
+BUCKETS = ("hour", "day", "week")
+
+
+def bucket_start(moment: datetime, bucket: str) -> datetime:
+    """Start of the UTC bucket containing moment; weeks start on Monday, like date_trunc('week')"""
+    moment = moment.astimezone(timezone.utc) if moment.tzinfo else moment.replace(tzinfo=timezone.utc)
+    if bucket == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    day = moment.replace(hour=0, minute=0, second=0, microsecond=0)
+    if bucket == "day":
+        return day
+    if bucket == "week":
+        return day - timedelta(days=day.weekday())
+    raise ValueError(f"Unknown price history bucket '{bucket}'")
+
+
+def rollup_statement(product_id: int, price: Decimal, sold_at: datetime):
+    """INSERT ... ON CONFLICT folding one sale into its hour, day and week buckets"""
+    rows = [
+        {
+            "product_id": product_id,
+            "bucket": bucket,
+            "bucket_start": bucket_start(sold_at, bucket),
+            "open": price,
+            "high": price,
+            "low": price,
+            "close": price,
+            "volume": 1,
+            "turnover": price,
+            "first_sale_at": sold_at,
+            "last_sale_at": sold_at,
+        }
+        for bucket in BUCKETS
+    ]
+    statement = insert(PriceHistory).values(rows)
+    new, current = statement.excluded, PriceHistory.__table__.c
+    return statement.on_conflict_do_update(
+        index_elements=[PriceHistory.product_id, PriceHistory.bucket, PriceHistory.bucket_start],
+        set_={
+            # Sales can be recorded out of order, so open/close follow the sale times, not arrival order
+            "open": case((new.first_sale_at < current.first_sale_at, new.open), else_=current.open),
+            "close": case((new.last_sale_at >= current.last_sale_at, new.close), else_=current.close),
+            "first_sale_at": func.least(current.first_sale_at, new.first_sale_at),
+            "last_sale_at": func.greatest(current.last_sale_at, new.last_sale_at),
+            "high": func.greatest(current.high, new.high),
+            "low": func.least(current.low, new.low),
+            "volume": current.volume + new.volume,
+            "turnover": current.turnover + new.turnover,
+        }
+    )
+
+
+def record_sale(connection: Connection, product_id: int, price: Decimal, sold_at: datetime) -> None:
+    """Fold a completed sale into the rollups on the caller's connection (and transaction)"""
+    connection.execute(rollup_statement(product_id, price, sold_at))
+
+
+@event.listens_for(Sale, "before_insert")
+def _default_sale_date(mapper, connection, target):
+    # Pin the sale time in Python so the rollup buckets match the stored sale_date
+    if target.sale_date is None:
+        target.sale_date = datetime.now(timezone.utc)
+
+
+@event.listens_for(Sale, "after_insert")
+def _roll_up_sale(mapper, connection, target):
+    # Runs inside the flush, so the rollup commits or rolls back with the sale itself
+    if target.product_id is not None and (target.status or "completed") == "completed":
+        record_sale(connection, target.product_id, Decimal(str(target.sale_price)), target.sale_date)
+
+
+async def get_series(db: AsyncSession, product_id: int, bucket: str, start: Optional[datetime] = None, end: Optional[datetime] = None, limit: int = 365) -> List[PriceHistory]:
+    """The latest `limit` buckets in [start, end), oldest first; one range scan of the primary key"""
+    query = select(PriceHistory).filter(PriceHistory.product_id == product_id, PriceHistory.bucket == bucket)
+    if start is not None:
+        query = query.filter(PriceHistory.bucket_start >= bucket_start(start, bucket))
+    if end is not None:
+        query = query.filter(PriceHistory.bucket_start < end)
+    result = await db.execute(query.order_by(PriceHistory.bucket_start.desc()).limit(limit))
+    return list(reversed(result.scalars().all()))
@@ -0,0 +1,77 @@
+import asyncio
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy.orm import Session, joinedload
+
+from app.models.users import User
+from app.service.cache_service import CacheService
+
+
+class UserNotFound(LookupError):
+    """Raised by the loader so a missing user is never cached"""
+
+
+@dataclass(frozen=True)
+class AuthenticatedUser:
+    """What authorization needs about the current user, without the full users row"""
+    id: uuid.UUID
+    clerk_id: Optional[str]
+    is_active: bool
+    roles: Tuple[str, ...]
+
+    @property
+    def role_names(self) -> List[str]:
+        return list(self.roles)
+
+    @classmethod
+    def from_user(cls, user: User) -> "AuthenticatedUser":
+        return cls(user.id, user.clerk_id, bool(user.is_active), tuple(user.role_names))
+
+    @classmethod
+    def from_cache(cls, data: Dict[str, Any]) -> "AuthenticatedUser":
+        return cls(uuid.UUID(data["id"]), data["clerk_id"], data["is_active"], tuple(data["roles"]))
+
+    def to_cache(self) -> Dict[str, Any]:
+        return {"id": str(self.id), "clerk_id": self.clerk_id, "is_active": self.is_active, "roles": list(self.roles)}
+
+
+class PrincipalCache:
+    """
+    Id, active flag and roles per user, read through CacheService (Redis, plus its L1 tier
+    when enabled), so authenticated requests only query users on a miss.
+
+    Entries are keyed by users.id for custom tokens and by clerk_id for Clerk tokens; anything
+    that changes a user must call `invalidate` with both.
+    """
+
+    def __init__(self, cache: CacheService, lock_timeout: float = 2.0):
+        self.cache = cache
+        self.lock_timeout = lock_timeout  # a miss is one primary key lookup, so don't wait long on another worker's
+
+    async def get(self, db: Session, user_id: Optional[uuid.UUID] = None, clerk_id: Optional[str] = None) -> Optional[AuthenticatedUser]:
+        """The user for a users.id or a clerk_id, or None if there is no such user"""
+        key = f"user:{user_id}" if user_id is not None else f"clerk:{clerk_id}"
+
+        def query_user():
+            # One query: roles come in through the join instead of a lazy load per user
+            query = db.query(User).options(joinedload(User.roles))
+            user = query.filter(User.id == user_id).first() if user_id is not None else query.filter(User.clerk_id == clerk_id).first()
+            if user is None:
+                raise UserNotFound(key)
+            return AuthenticatedUser.from_user(user).to_cache()
+
+        async def load():
+            # The session is sync, so keep its round trip off the event loop
+            return await asyncio.to_thread(query_user)
+
+        try:
+            return AuthenticatedUser.from_cache(await self.cache.aget_or_set(key, load, lock_timeout=self.lock_timeout))
+        except UserNotFound:
+            return None
+
+    def invalidate(self, user_id: Optional[uuid.UUID] = None, clerk_id: Optional[str] = None) -> None:
+        if user_id is not None:
+            self.cache.delete(f"user:{user_id}")
+        if clerk_id:
+            self.cache.delete(f"clerk:{clerk_id}")
@@ -0,0 +1,82 @@
+import json
+import logging
+import threading
+import uuid
+from typing import Any, Dict, Optional
+from redis import Redis
+
+logger = logging.getLogger(__name__)
+
+
+class RedisChannelListener:
+    """
+    Base class for broadcasting events between workers over a Redis pub/sub channel.
+
+    Subclasses implement `handle` (and optionally `on_connect`). Each message carries
+    the publishing worker's id so a worker never re-applies its own events.
+    """
+
+    thread_name = "redis-listener"
+
+    def __init__(self, redis_client: Redis, channel: str):
+        self.redis = redis_client
+        self.channel = channel
+        self.node_id = uuid.uuid4().hex
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def publish(self, payload: Dict[str, Any]) -> None:
+        """Broadcast a JSON payload to the other workers"""
+        try:
+            message = json.dumps({"origin": self.node_id, **payload})
+            self.redis.publish(self.channel, message)
+        except Exception as e:
+            logger.error(f"Error publishing to {self.channel}: {e}")
+
+    def start(self) -> None:
+        """Start the listener thread (idempotent)"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._listen, name=self.thread_name, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+
+    def on_connect(self) -> None:
+        """Called after every (re)subscribe; messages sent while disconnected are lost"""
+
+    def handle(self, message: Dict[str, Any]) -> None:
+        raise NotImplementedError
+
+    def _listen(self) -> None:
+        while not self._stopped.is_set():
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.subscribe(self.channel)
+                self.on_connect()
+                while not self._stopped.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message:
+                        self._dispatch(message["data"])
+            except Exception as e:
+                logger.error(f"Listener on {self.channel} failed, reconnecting: {e}")
+                self._stopped.wait(1.0)
+            finally:
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+
+    def _dispatch(self, data: Any) -> None:
+        try:
+            message = json.loads(data)
+        except (TypeError, ValueError):
+            return
+        if message.get("origin") == self.node_id:
+            return
+        try:
+            self.handle(message)
+        except Exception as e:
+            logger.error(f"Error handling message on {self.channel}: {e}")
@@ -0,0 +1,238 @@
+import itertools
+import logging
+import threading
+import time
+import uuid
+from array import array
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+from redis import Redis
+from sqlalchemy import func, select
+from sqlalchemy.engine import Connection
+
+from app.models.product import Product
+from app.models.sales import Sale
+
+logger = logging.getLogger(__name__)
+
+# Segment dimensions, in key order; a dimension left out of a filter is the wildcard
+DIMENSIONS = ("category", "brand", "gender")
+WILDCARD = "*"
+
+RECS_TOP_N = 100  # candidates stored per segment and per user
+
+# Every combination of fixed/wildcard dimensions: (category, brand, gender), (category, brand, *), ...
+SEGMENT_PATTERNS: List[Tuple[str, ...]] = [
+    tuple(dimension for dimension, fixed in zip(DIMENSIONS, mask) if fixed)
+    for mask in itertools.product((True, False), repeat=len(DIMENSIONS))
+]
+
+Segment = Tuple[Optional[str], Optional[str], Optional[str]]
+
+
+def segment_key(category: Optional[str], brand: Optional[str], gender: Optional[str]) -> str:
+    return "|".join(WILDCARD if value is None else value for value in (category, brand, gender))
+
+
+def pack(product_ids: Iterable[int]) -> bytes:
+    """Candidate lists are stored as raw uint32 arrays: 4 bytes per product"""
+    return array("I", product_ids).tobytes()
+
+
+def unpack(data: Optional[bytes]) -> List[int]:
+    ids = array("I")
+    if data:
+        ids.frombytes(data)
+    return ids.tolist()
+
+
+def segment_rankings_statement(dimensions: Sequence[str], top_n: int, as_of: Optional[datetime] = None):
+    """
+    Top `top_n` products per value of `dimensions`, best first, ordered like recommended_statement:
+    most sales (unsold last), then largest discount to retail. With `as_of`, popularity is the number of completed
+    sales before that time instead of sales_count, so offline evaluation can't see the future.
+    """
+    columns = [getattr(Product, dimension) for dimension in dimensions]
+    popularity = Product.sales_count
+    query = select(Product.id, *columns)
+    if as_of is not None:
+        sold = select(Sale.product_id, func.count().label("sold"))\
+            .filter(Sale.status == "completed", Sale.sale_date < as_of)\
+            .group_by(Sale.product_id)\
+            .subquery()
+        popularity = func.coalesce(sold.c.sold, 0)
+        query = query.outerjoin(sold, sold.c.product_id == Product.id)
+
+    rank = func.row_number().over(
+        partition_by=columns or None,
+        order_by=[popularity.desc().nulls_last(), (Product.retail_price - Product.last_sale_price).desc(), Product.id]
+    ).label("rank")
+    ranked = query.add_columns(rank)\
+        .filter(Product.retail_price.isnot(None), Product.last_sale_price.isnot(None))\
+        .filter(*(column.isnot(None) for column in columns))\
+        .subquery()
+    return select(ranked)\
+        .filter(ranked.c.rank <= top_n)\
+        .order_by(*(ranked.c[dimension] for dimension in dimensions), ranked.c.rank)
+
+
+def segment_keys_for(segment: Segment) -> List[Tuple[str, int]]:
+    """(key, number of fixed dimensions) for every generalization of a product's segment"""
+    values = dict(zip(DIMENSIONS, segment))
+    keys = []
+    for pattern in SEGMENT_PATTERNS:
+        if any(values[dimension] is None for dimension in pattern):
+            continue
+        keys.append((segment_key(*(values[d] if d in pattern else None for d in DIMENSIONS)), len(pattern)))
+    return keys
+
+
+def build_user_candidates(purchases: Dict[UUID, List[Tuple[int, datetime]]], product_segments: Dict[int, Segment], segments: Dict[str, List[int]], now: datetime, top_n: int = RECS_TOP_N, half_life_days: float = 90, max_segments: int = 10) -> Dict[UUID, List[int]]:
+    """
+    Personal candidates from purchase history.
+
+    Each purchase adds recency-weighted affinity to the segments it belongs to (more specific
+    segments count more); the user's strongest segments' lists are then blended by reciprocal
+    rank. Products the user already bought are left out.
+    """
+    candidates = {}
+    for user_id, bought in purchases.items():
+        affinity: Counter = Counter()
+        for product_id, sold_at in bought:
+            segment = product_segments.get(product_id)
+            if segment is None:
+                continue
+            weight = 0.5 ** (max((now - sold_at).total_seconds(), 0) / 86400 / half_life_days)
+            for key, specificity in segment_keys_for(segment):
+                if specificity:
+                    affinity[key] += weight * specificity
+
+        owned = {product_id for product_id, _ in bought}
+        scores: Dict[int, float] = defaultdict(float)
+        for key, strength in affinity.most_common(max_segments):
+            for rank, product_id in enumerate(segments.get(key, ())):
+                if product_id not in owned:
+                    scores[product_id] += strength / (rank + 1)
+        if scores:
+            candidates[user_id] = [product_id for product_id, _ in sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:top_n]]
+    return candidates
+
+
+def compute_candidates(conn: Connection, now: datetime, top_n: int = RECS_TOP_N, history_days: int = 365, as_of: Optional[datetime] = None) -> Tuple[Dict[str, List[int]], Dict[UUID, List[int]]]:
+    """
+    Every segment list and every recent buyer's personal list. With `as_of`, only sales before
+    it are used (popularity and history), for offline evaluation against the sales after it.
+    """
+    segments: Dict[str, List[int]] = {}
+    for pattern in SEGMENT_PATTERNS:
+        for row in conn.execute(segment_rankings_statement(pattern, top_n, as_of)):
+            values = row._mapping
+            key = segment_key(*(values[d] if d in pattern else None for d in DIMENSIONS))
+            segments.setdefault(key, []).append(row.id)
+
+    until = as_of or now
+    history = select(Sale.buyer_id, Sale.product_id, Sale.sale_date)\
+        .filter(Sale.status == "completed", Sale.buyer_id.isnot(None), Sale.product_id.isnot(None))\
+        .filter(Sale.sale_date >= until - timedelta(days=history_days), Sale.sale_date < until)
+    purchases: Dict[UUID, List[Tuple[int, datetime]]] = defaultdict(list)
+    for buyer_id, product_id, sold_at in conn.execute(history):
+        purchases[buyer_id].append((product_id, sold_at))
+
+    product_ids = list({product_id for bought in purchases.values() for product_id, _ in bought})
+    product_segments: Dict[int, Segment] = {}
+    for start in range(0, len(product_ids), 10000):
+        chunk = product_ids[start:start + 10000]
+        for product_id, *segment in conn.execute(select(Product.id, *(getattr(Product, d) for d in DIMENSIONS)).filter(Product.id.in_(chunk))):
+            product_segments[product_id] = tuple(segment)
+
+    return segments, build_user_candidates(purchases, product_segments, segments, until, top_n)
+
+
+def merge_candidates(personal: Sequence[int], segment: Sequence[int], limit: int) -> List[int]:
+    """Interleave personal and segment candidates, personal first, without duplicates"""
+    merged, seen = [], set()
+    for pair in itertools.zip_longest(personal, segment):
+        for product_id in pair:
+            if product_id is not None and product_id not in seen:
+                seen.add(product_id)
+                merged.append(product_id)
+                if len(merged) == limit:
+                    return merged
+    return merged
+
+
+class RecommendationService:
+    """
+    Serves precomputed recommendation candidates from Redis.
+
+    A build (Scripts/build_recommendations.py) writes every segment and user list under a new
+    build id and then points `{prefix}current` at it, so readers switch atomically; old builds
+    expire, and so does the pointer, with the same TTL. Serving is one MGET.
+    """
+
+    def __init__(self, redis_client: Redis, prefix: str = "recs:", build_ttl: int = 7 * 86400, build_check_interval: float = 10):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.build_ttl = build_ttl
+        self.build_check_interval = build_check_interval
+
+        self._lock = threading.Lock()
+        self._build: Optional[str] = None
+        self._build_checked = 0.0
+
+    def current_build(self) -> Optional[str]:
+        """The live build id, re-read from Redis at most every build_check_interval seconds"""
+        with self._lock:
+            if time.monotonic() - self._build_checked < self.build_check_interval:
+                return self._build
+        build = self.redis.get(f"{self.prefix}current")
+        with self._lock:
+            self._build = build.decode() if build else None
+            self._build_checked = time.monotonic()
+            return self._build
+
+    def candidates(self, category: Optional[str], brand: Optional[str], gender: Optional[str], user_id: Optional[UUID] = None) -> Tuple[Optional[List[int]], List[int]]:
+        """
+        (segment candidates, personal candidates). Segment candidates are None when no build
+        is available, so the caller can fall back to querying.
+        """
+        try:
+            build = self.current_build()
+            if build is None:
+                return None, []
+            # The all-products segment is in every non-empty build: if it's gone, so is the build
+            # (an empty segment list is just a segment without products)
+            keys = [f"{self.prefix}{build}:segment:{segment_key(None, None, None)}", f"{self.prefix}{build}:segment:{segment_key(category, brand, gender)}"]
+            if user_id is not None:
+                keys.append(f"{self.prefix}{build}:user:{user_id}")
+            values = self.redis.mget(keys)
+        except Exception as e:
+            logger.error(f"Error reading recommendation candidates: {e}")
+            return None, []
+        if values[0] is None:
+            with self._lock:
+                self._build_checked = 0.0
+            return None, []
+        return unpack(values[1]), unpack(values[2]) if len(values) > 2 else []
+
+    def publish_build(self, segments: Dict[str, List[int]], users: Dict[UUID, List[int]], batch_size: int = 1000) -> str:
+        """Write a complete build and make it current"""
+        build = f"{int(time.time())}-{uuid.uuid4().hex[:8]}"
+        entries = itertools.chain(
+            ((f"{self.prefix}{build}:segment:{key}", ids) for key, ids in segments.items()),
+            ((f"{self.prefix}{build}:user:{user_id}", ids) for user_id, ids in users.items()),
+        )
+        while True:
+            batch = list(itertools.islice(entries, batch_size))
+            if not batch:
+                break
+            pipe = self.redis.pipeline(transaction=False)
+            for key, ids in batch:
+                pipe.set(key, pack(ids), ex=self.build_ttl)
+            pipe.execute()
+        self.redis.set(f"{self.prefix}current", build, ex=self.build_ttl)
+        with self._lock:
+            self._build_checked = 0.0
+        return build
@@ -0,0 +1,66 @@
+from datetime import datetime, timezone
+from decimal import Decimal
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy import case, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.product import Product
+from app.models.sales import Sale
+import app.service.price_history_service  # registers the Sale rollup hooks
+
+
+class ProductNotFound(LookupError):
+    """Raised when a sale refers to a product that does not exist"""
+
+
+def product_stats_update(product_id: int, price: Decimal, sold_at: datetime):
+    """
+    UPDATE folding one sale into the product's running aggregates.
+
+    O(1): count and total are incremented, the average is derived from them, and the
+    last sale only moves forward in time, so late-recorded sales don't overwrite it.
+    """
+    count = func.coalesce(Product.sales_count, 0) + 1
+    total = func.coalesce(Product.sales_total, 0) + price
+    is_latest = (Product.last_sale_date.is_(None)) | (Product.last_sale_date <= sold_at)
+    return update(Product)\
+        .where(Product.id == product_id)\
+        .values(
+            sales_count=count,
+            sales_total=total,
+            average_price=func.round(total / count, 2),
+            last_sale_price=case((is_latest, price), else_=Product.last_sale_price),
+            last_sale_date=case((is_latest, sold_at), else_=Product.last_sale_date),
+        )\
+        .returning(Product.id)\
+        .execution_options(synchronize_session=False)
+
+
+async def apply_sale(db: AsyncSession, product_id: int, sale_price: Decimal, sold_at: datetime, **columns) -> Sale:
+    """
+    Fold a sale into the product's statistics and add its row, without committing.
+
+    The UPDATE runs first, so concurrent sales of one product queue on its row lock instead of
+    racing on read-modify-write. Extra Sale columns (buyer_id, ask_id, ...) pass through.
+    """
+    updated = await db.execute(product_stats_update(product_id, sale_price, sold_at))
+    if updated.scalar_one_or_none() is None:
+        raise ProductNotFound(product_id)
+
+    sale = Sale(product_id=product_id, sale_price=sale_price, sale_date=sold_at, status="completed", **columns)
+    db.add(sale)
+    return sale
+
+
+async def record_sale(db: AsyncSession, product_id: int, sale_price: Decimal, buyer_id: Optional[UUID] = None, sold_at: Optional[datetime] = None) -> Sale:
+    """Record a completed sale and update the product's sale statistics in the same transaction"""
+    sold_at = sold_at or datetime.now(timezone.utc)
+    try:
+        sale = await apply_sale(db, product_id, sale_price, sold_at, buyer_id=buyer_id)
+    except ProductNotFound:
+        await db.rollback()
+        raise
+    await db.commit()
+    return sale
@@ -0,0 +1,273 @@
+import bisect
+import heapq
+import logging
+import math
+import threading
+from array import array
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+from redis import Redis
+from sqlalchemy.orm import Session
+
+from app.models.product import Product
+from app.schemas.product_schema import ProductResponse
+from app.service.pubsub import RedisChannelListener
+from app.utils.search import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Term frequency multipliers per field, mirroring the A/B/C weights of the Postgres search_vector
+FIELD_WEIGHTS = {"name": 3, "brand": 3, "model": 2, "description": 1}
+
+# Score multipliers for terms that only matched as a prefix or with a typo
+PREFIX_FACTOR = 0.8
+FUZZY_FACTOR = 0.5
+
+MAX_EXPANSIONS = 64  # vocabulary terms considered per prefix/fuzzy query token
+
+
+def _within_distance(a: str, b: str, max_distance: int) -> bool:
+    """Is the edit distance (with adjacent transpositions) between a and b at most max_distance?"""
+    if abs(len(a) - len(b)) > max_distance:
+        return False
+    before_previous = None
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        for j, char_b in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b))
+            if before_previous is not None and j > 1 and char_a == b[j - 2] and a[i - 2] == char_b:
+                current[j] = min(current[j], before_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return False
+        before_previous, previous = previous, current
+    return previous[-1] <= max_distance
+
+
+class ProductSearchIndex:
+    """
+    In-process inverted index over product name/brand/model/description with BM25 ranking.
+
+    Posting lists are parallel arrays of sorted product ids and weighted term frequencies.
+    Documents carry the serialized product so hits can be returned without a database query.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._vocabulary: List[str] = []  # sorted, for prefix and fuzzy lookups
+        self._doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self._doc_lengths: Dict[int, int] = {}
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def build(self, products: Iterable[Dict[str, Any]]) -> None:
+        """Replace the index contents with the given products"""
+        with self._lock:
+            self._postings.clear()
+            self._vocabulary = []
+            self._doc_terms.clear()
+            self._doc_lengths.clear()
+            self._docs.clear()
+            self._total_length = 0
+            for product in products:
+                self._add(product, keep_sorted=False)
+            self._vocabulary = sorted(self._postings)
+
+    def upsert(self, product: Dict[str, Any]) -> None:
+        """Add a product, replacing any previous version of it"""
+        with self._lock:
+            self._remove(product["id"])
+            self._add(product)
+
+    def remove(self, product_id: int) -> None:
+        """Remove a product if it is indexed"""
+        with self._lock:
+            self._remove(product_id)
+
+    def search(self, query: str, limit: int = 20, fuzzy: bool = True) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Return (products, total_hits) for a query.
+
+        Every query token must match. The last token also matches as a prefix, and
+        tokens with no exact match fall back to terms within a small edit distance.
+        """
+        tokens = tokenize(query)
+        if not tokens:
+            return [], 0
+
+        with self._lock:
+            if not self._docs:
+                return [], 0
+            average_length = self._total_length / len(self._docs)
+            scores: Optional[Dict[int, float]] = None
+
+            for position, token in enumerate(tokens):
+                is_last = position == len(tokens) - 1
+                token_scores: Dict[int, float] = {}
+                for term, factor in self._expand(token, prefix=is_last, fuzzy=fuzzy):
+                    self._score_term(term, factor, average_length, token_scores)
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {doc_id: score + token_scores[doc_id] for doc_id, score in scores.items() if doc_id in token_scores}
+                if not scores:
+                    return [], 0
+
+            top = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+            return [self._docs[doc_id] for doc_id, _ in top], len(scores)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "documents": len(self._docs),
+                "terms": len(self._postings),
+                "postings": sum(len(ids) for ids, _ in self._postings.values()),
+            }
+
+    def _expand(self, token: str, prefix: bool, fuzzy: bool) -> List[Tuple[str, float]]:
+        expansions = []
+        if token in self._postings:
+            expansions.append((token, 1.0))
+
+        if prefix:
+            start = bisect.bisect_left(self._vocabulary, token)
+            for term in self._vocabulary[start:start + MAX_EXPANSIONS + 1]:
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    expansions.append((term, PREFIX_FACTOR))
+
+        if fuzzy and not expansions and len(token) >= 4:
+            max_distance = 1 if len(token) < 8 else 2
+            # Assume the first character is right; this keeps the scan to one vocabulary slice
+            start = bisect.bisect_left(self._vocabulary, token[0])
+            end = bisect.bisect_left(self._vocabulary, chr(ord(token[0]) + 1))
+            for term in self._vocabulary[start:end]:
+                if _within_distance(token, term, max_distance):
+                    expansions.append((term, FUZZY_FACTOR))
+                    if len(expansions) >= MAX_EXPANSIONS:
+                        break
+        return expansions
+
+    def _score_term(self, term: str, factor: float, average_length: float, scores: Dict[int, float]) -> None:
+        doc_ids, frequencies = self._postings[term]
+        document_count = len(self._docs)
+        idf = math.log(1 + (document_count - len(doc_ids) + 0.5) / (len(doc_ids) + 0.5))
+        for doc_id, frequency in zip(doc_ids, frequencies):
+            length_norm = 1 - self.b + self.b * self._doc_lengths[doc_id] / average_length
+            score = factor * idf * frequency * (self.k1 + 1) / (frequency + self.k1 * length_norm)
+            # Several expansions of one token may hit the same doc; keep the best one
+            if score > scores.get(doc_id, 0.0):
+                scores[doc_id] = score
+
+    def _add(self, product: Dict[str, Any], keep_sorted: bool = True) -> None:
+        doc_id = int(product["id"])
+        frequencies: Counter = Counter()
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(product.get(field)):
+                frequencies[token] += weight
+
+        for term, frequency in frequencies.items():
+            postings = self._postings.get(term)
+            if postings is None:
+                postings = (array("I"), array("H"))
+                self._postings[term] = postings
+                if keep_sorted:
+                    bisect.insort(self._vocabulary, term)
+            doc_ids, term_frequencies = postings
+            position = bisect.bisect_left(doc_ids, doc_id)
+            doc_ids.insert(position, doc_id)
+            term_frequencies.insert(position, min(frequency, 65535))
+
+        length = sum(frequencies.values())
+        self._doc_terms[doc_id] = tuple(frequencies)
+        self._doc_lengths[doc_id] = length
+        self._docs[doc_id] = product
+        self._total_length += length
+
+    def _remove(self, product_id: int) -> None:
+        doc_id = int(product_id)
+        terms = self._doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            doc_ids, term_frequencies = self._postings[term]
+            position = bisect.bisect_left(doc_ids, doc_id)
+            if position < len(doc_ids) and doc_ids[position] == doc_id:
+                del doc_ids[position]
+                del term_frequencies[position]
+            if not doc_ids:
+                del self._postings[term]
+                del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        del self._docs[doc_id]
+
+
+class SearchIndexSync(RedisChannelListener):
+    """
+    Applies product changes to this worker's index and broadcasts them to the other workers.
+
+    `rebuild` holds back changes (local and broadcast) while the snapshot is loaded and
+    indexed, then replays them, so updates made during a build aren't wiped by it.
+    """
+
+    thread_name = "search-index-sync"
+
+    def __init__(self, redis_client: Redis, index: ProductSearchIndex, channel: str = "search:products"):
+        super().__init__(redis_client, channel)
+        self.index = index
+        self._subscribed = threading.Event()
+        self._pending_lock = threading.Lock()
+        self._pending: Optional[List[Dict[str, Any]]] = None  # a list while a rebuild runs
+
+    def rebuild(self, load: Callable[[], Iterable[Dict[str, Any]]], subscribe_timeout: float = 5) -> None:
+        """Build the index from `load()` without losing changes that arrive meanwhile"""
+        # Changes published before the subscription is up would be missed by both the snapshot and us
+        if not self._subscribed.wait(subscribe_timeout):
+            logger.warning(f"Building the search index before {self.channel} is subscribed")
+        with self._pending_lock:
+            self._pending = []
+        try:
+            self.index.build(load())
+        finally:
+            with self._pending_lock:
+                pending, self._pending = self._pending, None
+                for message in pending:
+                    self._apply(message)
+
+    def upsert(self, product: Dict[str, Any]) -> None:
+        self.handle({"op": "upsert", "product": product})
+        self.publish({"op": "upsert", "product": product})
+
+    def remove(self, product_id: int) -> None:
+        self.handle({"op": "remove", "id": product_id})
+        self.publish({"op": "remove", "id": product_id})
+
+    def on_connect(self) -> None:
+        self._subscribed.set()
+
+    def handle(self, message: Dict[str, Any]) -> None:
+        with self._pending_lock:
+            if self._pending is not None:
+                self._pending.append(message)
+                return
+        self._apply(message)
+
+    def _apply(self, message: Dict[str, Any]) -> None:
+        if message.get("op") == "upsert":
+            self.index.upsert(message["product"])
+        elif message.get("op") == "remove":
+            self.index.remove(message["id"])
+
+
+def load_products(db: Session) -> List[Dict[str, Any]]:
+    """Serialize every product the way the API returns it, for building the index"""
+    return [jsonable_encoder(ProductResponse.model_validate(p)) for p in db.query(Product).order_by(Product.id).yield_per(1000)]
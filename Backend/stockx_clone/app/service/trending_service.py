@@ -0,0 +1,176 @@
+import logging
+import math
+import queue
+import threading
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from redis import Redis
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from app.models.sales import Sale
+
+logger = logging.getLogger(__name__)
+
+# Decay time constants: a sale's weight drops by a factor of e every window
+TRENDING_WINDOWS = {"1h": 3600, "24h": 86400, "7d": 7 * 86400, "30d": 30 * 86400}
+DEFAULT_TRENDING_WINDOW = "7d"
+
+# Scores are stored relative to an epoch that moves forward every REBASE_AFTER windows, so
+# they stay below e**REBASE_AFTER; products whose score falls below PRUNE_BELOW are dropped
+REBASE_AFTER = 20
+PRUNE_BELOW = math.exp(-10)
+
+_PENDING_SALES = "trending_sales"
+
+Sold = Tuple[int, datetime]
+
+
+def epoch_period(window: str, moment: datetime) -> int:
+    return int(moment.timestamp() // (REBASE_AFTER * TRENDING_WINDOWS[window]))
+
+
+def as_utc(moment: datetime) -> datetime:
+    """Naive datetimes (e.g. a sale_date posted without an offset) are taken as UTC"""
+    return moment if moment.tzinfo is not None else moment.replace(tzinfo=timezone.utc)
+
+
+def sale_weight(window: str, sold_at: datetime, period: int) -> float:
+    """
+    Forward-decayed weight of one sale: exp((sold_at - epoch) / window).
+
+    Adding weights never needs the old scores to be decayed: at any moment every score
+    shares the factor exp(-(now - epoch) / window), so their order is already the
+    decayed order.
+    """
+    tau = TRENDING_WINDOWS[window]
+    return math.exp((sold_at.timestamp() - period * REBASE_AFTER * tau) / tau)
+
+
+class TrendingService:
+    """
+    Time-decayed trending scores per product in one Redis sorted set per window and epoch.
+
+    Committed sales are queued by the Session hooks below and applied by a background thread
+    with ZINCRBY, so ranking reads are a single ZREVRANGE. When a new epoch starts, the first
+    worker to notice carries the previous set over, rescaled, and prunes the faded tail.
+    """
+
+    def __init__(self, redis_client: Redis, prefix: str = "trending:", batch_size: int = 500):
+        self.redis = redis_client
+        self.prefix = prefix
+        self.batch_size = batch_size
+
+        self._queue: "queue.Queue[Sold]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._ready: Dict[str, int] = {}  # window -> epoch period already carried over
+        self._stats = {"recorded": 0, "errors": 0}
+
+    def key(self, window: str, period: int) -> str:
+        return f"{self.prefix}{window}:{period}"
+
+    def record(self, sales: Iterable[Sold], now: Optional[datetime] = None) -> None:
+        """Add sales to every window's scores; sales dated in the future count as sold now"""
+        now = now or datetime.now(timezone.utc)
+        # A far-future sale_date would overflow exp() and lose the whole batch
+        sales = [(product_id, min(as_utc(sold_at), now)) for product_id, sold_at in sales]
+        pipe = self.redis.pipeline(transaction=False)
+        for window in TRENDING_WINDOWS:
+            period = epoch_period(window, now)
+            self._ensure_period(window, period)
+            key = self.key(window, period)
+            for product_id, sold_at in sales:
+                pipe.zincrby(key, sale_weight(window, sold_at, period), product_id)
+        pipe.execute()
+        self._stats["recorded"] += len(sales)
+
+    def top(self, window: str, limit: int, now: Optional[datetime] = None) -> List[int]:
+        """Product ids by decayed score, highest first: O(log n + limit)"""
+        period = epoch_period(window, now or datetime.now(timezone.utc))
+        try:
+            self._ensure_period(window, period)
+            return [int(member) for member in self.redis.zrevrange(self.key(window, period), 0, limit - 1)]
+        except Exception as e:
+            logger.error(f"Error reading trending scores for {window}: {e}")
+            return []
+
+    def enqueue(self, sales: Iterable[Sold]) -> None:
+        for sale in sales:
+            self._queue.put(sale)
+
+    def start(self) -> None:
+        """Start the background recorder (idempotent) and route committed sales to it"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="trending-recorder", daemon=True)
+        self._thread.start()
+        if self not in _services:
+            _services.append(self)
+
+    def stop(self) -> None:
+        if self in _services:
+            _services.remove(self)
+        self._stopped.set()
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self._queue.qsize(), **self._stats}
+
+    def _ensure_period(self, window: str, period: int) -> None:
+        if self._ready.get(window) == period:
+            return
+        key, previous = self.key(window, period), self.key(window, period - 1)
+        ttl = 2 * REBASE_AFTER * TRENDING_WINDOWS[window]
+        # Exactly one worker wins the marker and folds the previous epoch into this one;
+        # including `key` itself keeps any increments that already landed there
+        if self.redis.set(f"{key}:ready", 1, nx=True, ex=ttl):
+            pipe = self.redis.pipeline(transaction=True)
+            pipe.zunionstore(key, {key: 1, previous: math.exp(-REBASE_AFTER)})
+            pipe.zremrangebyscore(key, "-inf", f"({PRUNE_BELOW}")
+            pipe.expire(key, ttl)
+            pipe.execute()
+        self._ready[window] = period
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            try:
+                batch = [self._queue.get(timeout=1.0)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.record(batch)
+            except Exception as e:
+                # Scores are best effort; rebuild_trending recomputes them from the sales table
+                self._stats["errors"] += 1
+                logger.error(f"Error recording {len(batch)} trending sales: {e}")
+
+
+_services: List[TrendingService] = []
+
+
+@event.listens_for(Sale, "after_insert")
+def _collect_sale(mapper, connection, target):
+    # Held on the session until commit, so rolled back sales never reach the scores
+    if target.product_id is not None and (target.status or "completed") == "completed":
+        session = object_session(target)
+        if session is not None:
+            session.info.setdefault(_PENDING_SALES, []).append((target.product_id, target.sale_date or datetime.now(timezone.utc)))
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_sales(session):
+    sales = session.info.pop(_PENDING_SALES, None)
+    if sales:
+        for service in _services:
+            service.enqueue(sales)
+
+
+@event.listens_for(Session, "after_rollback")
+def _drop_sales(session):
+    session.info.pop(_PENDING_SALES, None)
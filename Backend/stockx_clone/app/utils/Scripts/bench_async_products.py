@@ -0,0 +1,126 @@
+# Async vs sync product handler benchmark:
+#   - Starts two single-worker uvicorn servers that run the same product listing query,
+#     one with a sync `def` handler on SessionLocal, one with an `async def` handler on AsyncSessionLocal
+#   - Hammers each with the same number of concurrent clients and reports requests/sec and latency
+#
+# Run from Backend/stockx_clone against a seeded database:
+#   python -m app.utils.Scripts.bench_async_products --concurrency 500 --requests 20000
+#
+# Expected shape: the sync server plateaus around the threadpool size (40 by default),
+# the async server keeps scaling until the connection pool or Postgres saturates.
+
+import argparse
+import asyncio
+import multiprocessing
+import statistics
+import time
+
+import httpx
+import uvicorn
+from fastapi import Depends, FastAPI
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.database import get_async_db, get_db
+from app.models.product import Product
+
+LISTING_LIMIT = 20
+
+
+def build_sync_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/products")
+    def list_products(db: Session = Depends(get_db)):
+        rows = db.query(Product).order_by(Product.id).limit(LISTING_LIMIT).all()
+        return [row.id for row in rows]
+
+    return app
+
+
+def build_async_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/products")
+    async def list_products(db: AsyncSession = Depends(get_async_db)):
+        result = await db.execute(select(Product).order_by(Product.id).limit(LISTING_LIMIT))
+        return [row.id for row in result.scalars().all()]
+
+    return app
+
+
+def serve(kind: str, port: int):
+    app = build_sync_app() if kind == "sync" else build_async_app()
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+async def wait_until_up(url: str, timeout: float = 15.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start")
+
+
+async def run_load(url: str, concurrency: int, total_requests: int):
+    latencies = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(limits=limits, timeout=60.0) as client:
+        async def one():
+            nonlocal errors
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(url)
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total_requests)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "rps": total_requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "errors": errors,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare sync and async product handlers under load")
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--port", type=int, default=8101)
+    args = parser.parse_args()
+
+    for offset, kind in enumerate(["sync", "async"]):
+        port = args.port + offset
+        server = multiprocessing.Process(target=serve, args=(kind, port), daemon=True)
+        server.start()
+        try:
+            url = f"http://127.0.0.1:{port}/products"
+            asyncio.run(wait_until_up(url))
+            asyncio.run(run_load(url, min(50, args.concurrency), 500))  # warm up pools
+            result = asyncio.run(run_load(url, args.concurrency, args.requests))
+            print(f"{kind:>5}: {result['rps']:8.0f} req/s  p50 {result['p50_ms']:7.1f} ms  "
+                  f"p99 {result['p99_ms']:7.1f} ms  errors {result['errors']}")
+        finally:
+            server.terminate()
+            server.join()
+
+
+if __name__ == "__main__":
+    main()
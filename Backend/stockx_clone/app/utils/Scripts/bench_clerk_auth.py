@@ -0,0 +1,72 @@
+# Clerk auth dependency microbenchmark:
+#   - Signs an RS256 session token with a throwaway key and resolves it through
+#     get_clerk_user_id --requests times, the way every protected request does
+#   - "before": a full jwt.decode per request, inline, as the dependency used to do
+#   - "cache off": the verifier with CLERK_TOKEN_CACHE_SIZE=0 (decode per request)
+#   - "cache on": the verified-token cache, so only the first request checks the signature
+#
+# Needs the `cryptography` package (PyJWT's RSA backend). Run from Backend/stockx_clone:
+#   python -m app.utils.Scripts.bench_clerk_auth
+#   python -m app.utils.Scripts.bench_clerk_auth --requests 50000 --key-size 4096
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from starlette.requests import Request
+
+from app.middleware import auth
+from app.middleware.auth import ClerkTokenVerifier
+
+AUDIENCE = "fastapi-app"
+
+
+def make_request(token):
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+async def before(request, public_key):
+    token = request.headers["Authorization"][7:]
+    return jwt.decode(token, public_key, algorithms=["RS256"], audience=AUDIENCE, options={"verify_exp": True}).get("sub")
+
+
+async def run(label, resolve, requests):
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        assert await resolve() == "user_bench"
+        timings.append((time.perf_counter() - started) * 1_000_000)
+    timings.sort()
+    total = sum(timings) / 1_000_000
+    print(f"{label:<10} {requests / total:>10.0f} req/s   p50 {statistics.median(timings):>7.1f} us   p99 {timings[int(len(timings) * 0.99) - 1]:>7.1f} us")
+
+
+async def main_async(args):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=args.key_size)
+    public_key = private_key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+    token = jwt.encode({"sub": "user_bench", "aud": AUDIENCE, "exp": int(time.time()) + 3600}, private_key, algorithm="RS256")
+    print(f"RSA-{args.key_size}, {args.requests} requests with one session token")
+
+    # A fresh request each time, as the principal is also remembered per request
+    await run("before", lambda: before(make_request(token), public_key), args.requests)
+    auth.clerk_token_verifier = ClerkTokenVerifier(static_key=public_key, audience=AUDIENCE, cache_size=0)
+    await run("cache off", lambda: auth.get_clerk_user_id(make_request(token)), args.requests)
+    auth.clerk_token_verifier = ClerkTokenVerifier(static_key=public_key, audience=AUDIENCE)
+    await run("cache on", lambda: auth.get_clerk_user_id(make_request(token)), args.requests)
+    print(f"verifier stats: {auth.clerk_token_verifier.stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Clerk token verification with and without the cache")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--key-size", type=int, default=2048)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# Import parser benchmark:
+#   - Builds an in-memory catalog by cycling the items of the JSON files under app/utils/Data
+#     (each copy gets its own vendor id so product keys stay distinct)
+#   - Times the per-item path (detect_and_parse_json_item + ProductSchema + to_row) against the
+#     columnar registry path (detect once, parser.parse per batch + columns_to_rows)
+#   - Runs in a single process, so the numbers are items/sec per core
+#
+# Run from Backend/stockx_clone:
+#   python -m app.utils.Scripts.bench_import_parsers --items 200000 --batch-size 1000
+
+import argparse
+import copy
+import time
+from glob import glob
+
+from app.utils.import_formats import detect_parser
+from app.utils.Scripts.productsInjection import (
+    DATA_FILE_PATTERNS, ProductSchema, columns_to_rows, detect_and_parse_json_item, iter_json_items, to_row
+)
+
+
+def load_catalogs(total: int):
+    """Return {format name: items}, each list cycled up to about total / formats items"""
+    by_format = {}
+    for pattern in DATA_FILE_PATTERNS:
+        for path in glob(pattern, recursive=True):
+            for item in iter_json_items(path):
+                parser = detect_parser(item)
+                if parser is not None:
+                    by_format.setdefault(parser.name, []).append(item)
+
+    per_format = max(1, total // max(1, len(by_format)))
+    catalogs = {}
+    for name, items in by_format.items():
+        cycled = []
+        for index in range(per_format):
+            item = copy.copy(items[index % len(items)])
+            for key in ("objectId", "styleID"):
+                if key in item:
+                    item[key] = f"{item[key]}-{index}"
+            cycled.append(item)
+        catalogs[name] = cycled
+    return catalogs
+
+
+def per_item(items):
+    return [to_row(ProductSchema(**detect_and_parse_json_item(item))) for item in items]
+
+
+def columnar(items, batch_size: int):
+    parser = detect_parser(items[0])
+    rows = []
+    for start in range(0, len(items), batch_size):
+        rows.extend(columns_to_rows(parser.parse(items[start:start + batch_size])))
+    return rows
+
+
+def timed(label: str, run, count: int) -> float:
+    started = time.perf_counter()
+    rows = run()
+    elapsed = time.perf_counter() - started
+    print(f"{label:>26}: {count / elapsed:12,.0f} items/sec  ({len(rows)} rows in {elapsed:.2f}s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-item and columnar import parsing")
+    parser.add_argument("--items", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+
+    for name, items in load_catalogs(args.items).items():
+        print(f"{name} ({len(items)} items)")
+        baseline = timed("per-item + ProductSchema", lambda: per_item(items), len(items))
+        candidate = timed("columnar registry", lambda: columnar(items, args.batch_size), len(items))
+        print(f"{'speedup':>26}: {baseline / candidate:12.2f}x")
+
+
+if __name__ == "__main__":
+    main()
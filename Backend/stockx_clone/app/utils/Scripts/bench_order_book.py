@@ -0,0 +1,115 @@
+# Order book benchmark:
+#   - Engine only (default): submits a random stream of asks and bids around a drifting mid price
+#     across many variants and reports orders/sec, match rate and per-submit latency
+#   - --db: runs the same stream through OrderService, so every order is also written to Postgres
+#     (order row, fill claim, Sale and product stats) by --concurrency concurrent submitters.
+#     Creates a scratch product with --variants variants and deletes it afterwards.
+#
+# Run from Backend/stockx_clone:
+#   python -m app.utils.Scripts.bench_order_book --orders 200000 --variants 500
+#   python -m app.utils.Scripts.bench_order_book --db --orders 5000 --variants 50 --concurrency 16
+
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from app.service.order_book import ASK, BID, Order, OrderBookEngine
+
+
+def order_stream(count: int, variants: int, seed: int):
+    """(side, variant_id, price) tuples; prices random-walk per variant with a spread around the mid"""
+    rng = random.Random(seed)
+    mids = [20000] * variants  # cents
+    for _ in range(count):
+        variant = rng.randrange(variants)
+        mids[variant] = max(1000, mids[variant] + rng.randint(-50, 50))
+        side = ASK if rng.random() < 0.5 else BID
+        offset = rng.randint(-300, 1500)  # mostly non-crossing, some aggressive
+        cents = mids[variant] + offset if side == ASK else mids[variant] - offset
+        yield side, variant, Decimal(cents) / 100
+
+
+def report(label: str, timings, elapsed: float, matched: int):
+    timings.sort()
+    print(f"{label}: {len(timings)} orders in {elapsed:.2f}s = {len(timings) / elapsed:,.0f} orders/sec, {matched} fills")
+    print(f"  submit latency p50 {statistics.median(timings) * 1e6:.1f} us   p99 {timings[int(len(timings) * 0.99) - 1] * 1e6:.1f} us")
+
+
+def bench_engine(args):
+    engine = OrderBookEngine()
+    timings = []
+    started = time.perf_counter()
+    for order_id, (side, variant, price) in enumerate(order_stream(args.orders, args.variants, args.seed), 1):
+        order = Order(side, order_id, variant, price)
+        submitted = time.perf_counter()
+        engine.submit(order)
+        timings.append(time.perf_counter() - submitted)
+    elapsed = time.perf_counter() - started
+    report("engine", timings, elapsed, engine.matched)
+    print(f"  {engine.stats()}")
+
+
+async def bench_db(args):
+    from sqlalchemy import delete
+
+    from app.database import AsyncSessionLocal, async_engine
+    from app.models.orders import ProductVariant
+    from app.models.product import Product
+    from app.service.order_service import OrderService
+
+    async with AsyncSessionLocal() as db:
+        product = Product(name="Order book benchmark", brand="bench", category="sneakers")
+        db.add(product)
+        await db.flush()
+        variants = [ProductVariant(product_id=product.id, size=str(size)) for size in range(args.variants)]
+        db.add_all(variants)
+        await db.commit()
+        variant_ids = [variant.id for variant in variants]
+
+    service = OrderService(OrderBookEngine())
+    stream = list(order_stream(args.orders, args.variants, args.seed))
+    queue = asyncio.Queue()
+    for item in stream:
+        queue.put_nowait(item)
+    timings = []
+
+    async def submitter():
+        async with AsyncSessionLocal() as db:
+            while not queue.empty():
+                side, variant, price = queue.get_nowait()
+                submitted = time.perf_counter()
+                await service.place(db, side, variant_ids[variant], None, price)
+                timings.append(time.perf_counter() - submitted)
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(submitter() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+        report(f"engine + postgres ({args.concurrency} submitters)", timings, elapsed, service.engine.matched)
+    finally:
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(Product).where(Product.id == product.id))
+            await db.commit()
+        await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bid/ask matching throughput")
+    parser.add_argument("--orders", type=int, default=200_000)
+    parser.add_argument("--variants", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--db", action="store_true", help="Persist through OrderService against DATABASE_URL")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent submitters in --db mode")
+    args = parser.parse_args()
+
+    if args.db:
+        asyncio.run(bench_db(args))
+    else:
+        bench_engine(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# Password hashing concurrency benchmark:
+#   - Fires a burst of --logins concurrent password checks at one event loop, the way a
+#     login storm reaches a single worker, and meanwhile ticks a heartbeat every 10 ms
+#     standing in for the worker's other requests
+#   - "inline": bcrypt called straight from the coroutine, as the handlers used to
+#   - "pool": through PasswordHasher (--workers threads, --max-queue waiting), as they do now
+#   - Prints login throughput and latency, 503-style rejections, and event loop lag:
+#     how late the heartbeat ran, i.e. what every other request on the worker waited.
+#     Login latency counts from the start of the burst, since all the logins arrive together
+#
+# Run from Backend/stockx_clone:
+#   python -m app.utils.Scripts.bench_password_hashing
+#   python -m app.utils.Scripts.bench_password_hashing --logins 200 --workers 4 --max-queue 32 --rounds 12
+
+import argparse
+import asyncio
+import statistics
+import time
+
+from app.service.password_hasher import HasherOverloaded, PasswordHasher
+from app.utils.auth import pwd_context, verify_password
+
+
+def summary(values):
+    if not values:
+        return "no samples"
+    values = sorted(values)
+    return f"p50 {statistics.median(values):.1f} ms   p99 {values[int(len(values) * 0.99) - 1]:.1f} ms   max {values[-1]:.1f} ms"
+
+
+async def storm(label, check, logins):
+    lags = []
+    done = asyncio.Event()
+
+    async def heartbeat():
+        while not done.is_set():
+            expected = time.perf_counter() + 0.01
+            await asyncio.sleep(0.01)
+            lags.append(max(time.perf_counter() - expected, 0) * 1000)
+
+    latencies, rejected = [], 0
+
+    async def login():
+        nonlocal rejected
+        try:
+            assert await check()
+            latencies.append((time.perf_counter() - started) * 1000)
+        except HasherOverloaded:
+            rejected += 1
+
+    ticker = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0.05)
+    started = time.perf_counter()
+    await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    await ticker
+
+    print(f"\n{label}: {len(latencies)} logins in {elapsed:.2f}s ({len(latencies) / elapsed:.1f}/s), {rejected} rejected")
+    print(f"  login latency   {summary(latencies)}")
+    print(f"  event loop lag  {summary(lags)}")
+
+
+async def main_async(args):
+    hashed = pwd_context.handler("bcrypt").using(rounds=args.rounds).hash("correct horse battery staple")
+
+    async def inline():
+        return verify_password("correct horse battery staple", hashed)
+
+    hasher = PasswordHasher(workers=args.workers, max_queue=args.max_queue)
+    print(f"bcrypt rounds {args.rounds}, {args.logins} concurrent logins, pool of {args.workers} (queue {args.max_queue})")
+    await storm("inline", inline, args.logins)
+    await storm("pool", lambda: hasher.verify("correct horse battery staple", hashed), args.logins)
+    print(f"\nhasher stats: {hasher.stats()}")
+    hasher.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark bcrypt on the event loop vs the hasher pool")
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--max-queue", type=int, default=32)
+    parser.add_argument("--rounds", type=int, default=10, help="bcrypt cost of the stored hash (production default is 12)")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
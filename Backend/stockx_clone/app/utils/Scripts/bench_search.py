@@ -0,0 +1,105 @@
+# Product search benchmark:
+#   - Builds a synthetic catalog (1M rows by default) in a scratch schema `search_bench`,
+#     cloned from public.products so it has the same generated search_vector column and indexes
+#   - Times the old ILIKE query and the ranked full-text query for a mix of search terms
+#
+# Run from Backend/stockx_clone after `alembic upgrade head`:
+#   python -m app.utils.Scripts.bench_search --rows 1000000 --queries 200
+#   python -m app.utils.Scripts.bench_search --reuse   # skip reseeding
+#
+# Drop the scratch data with: DROP SCHEMA search_bench CASCADE;
+
+import argparse
+import random
+import statistics
+import time
+
+from sqlalchemy import text
+
+from app.database import create_db_engine
+from app.utils.search import SEARCH_COUNT_CAP, build_tsquery
+
+BRANDS = ["Nike", "Jordan", "adidas", "New Balance", "ASICS", "Yeezy", "Converse", "Vans", "Puma", "Reebok"]
+MODELS = ["Air Max", "Dunk Low", "Retro High", "Samba", "Gazelle", "990v6", "Gel-Kayano", "Foam Runner", "Chuck 70", "Suede"]
+COLORS = ["Black", "White", "University Blue", "Bred", "Panda", "Sail", "Olive", "Grey Fog", "Chicago", "Volt"]
+
+SEARCH_TERMS = ["jordan", "air max", "dunk low panda", "samba", "new bal", "gel", "chicago", "foam runner sail", "suede", "ye"]
+
+SEED_SQL = """
+INSERT INTO search_bench.products (name, brand, model, category, description, retail_price, last_sale_price, sales_count)
+SELECT
+    b.brands[1 + (g % 10)] || ' ' || b.models[1 + ((g / 10) % 10)] || ' ' || b.colors[1 + ((g / 100) % 10)] || ' ' || g,
+    b.brands[1 + (g % 10)],
+    b.models[1 + ((g / 10) % 10)],
+    'sneakers',
+    'Synthetic product ' || g || ' in ' || b.colors[1 + ((g / 7) % 10)] || ' colorway',
+    100 + (g % 150),
+    80 + (g % 400),
+    g % 500
+FROM generate_series(1, :rows) AS g,
+     (SELECT CAST(:brands AS text[]) AS brands, CAST(:models AS text[]) AS models, CAST(:colors AS text[]) AS colors) AS b
+"""
+
+ILIKE_SQL = """
+SELECT id FROM products
+WHERE name ILIKE :term OR brand ILIKE :term OR description ILIKE :term OR model ILIKE :term
+LIMIT 20
+"""
+
+FTS_SQL = """
+SELECT id FROM products
+WHERE search_vector @@ to_tsquery('simple', :q)
+ORDER BY ts_rank_cd(search_vector, to_tsquery('simple', :q)) DESC, id
+LIMIT 20
+"""
+
+FTS_COUNT_SQL = f"""
+SELECT count(*) FROM (
+    SELECT 1 FROM products WHERE search_vector @@ to_tsquery('simple', :q) LIMIT {SEARCH_COUNT_CAP}
+) AS hits
+"""
+
+
+def seed(conn, rows: int):
+    print(f"Seeding {rows} synthetic products into search_bench.products...")
+    started = time.perf_counter()
+    conn.execute(text("DROP SCHEMA IF EXISTS search_bench CASCADE"))
+    conn.execute(text("CREATE SCHEMA search_bench"))
+    conn.execute(text("CREATE TABLE search_bench.products (LIKE public.products INCLUDING ALL)"))
+    conn.execute(text(SEED_SQL), {"rows": rows, "brands": BRANDS, "models": MODELS, "colors": COLORS})
+    conn.execute(text("ANALYZE search_bench.products"))
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+
+def time_queries(conn, label: str, sql: str, terms, params_for):
+    timings = []
+    for term in terms:
+        started = time.perf_counter()
+        conn.execute(text(sql), params_for(term)).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    print(f"{label:>22}: p50 {statistics.median(timings):9.2f} ms   p99 {timings[int(len(timings) * 0.99) - 1]:9.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ILIKE search against the full-text index")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--reuse", action="store_true", help="Reuse an existing search_bench schema")
+    args = parser.parse_args()
+
+    terms = [random.choice(SEARCH_TERMS) for _ in range(args.queries)]
+    engine = create_db_engine(application_name="stockx-bench-search", statement_timeout_ms=0)
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not args.reuse:
+            seed(conn, args.rows)
+        conn.execute(text("SET search_path TO search_bench"))
+
+        time_queries(conn, "ILIKE (old)", ILIKE_SQL, terms, lambda term: {"term": f"%{term}%"})
+        time_queries(conn, "full-text ranked", FTS_SQL, terms, lambda term: {"q": build_tsquery(term)})
+        time_queries(conn, "full-text hit count", FTS_COUNT_SQL, terms, lambda term: {"q": build_tsquery(term)})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+# Recommendation candidate build:
+#   - Ranks the top --top-n products for every (category, brand, gender) segment, including the
+#     wildcard combinations the endpoint's optional filters produce
+#   - Builds a personal list for every user who bought something in the last --history-days,
+#     from the segments of their purchases, excluding what they already own
+#   - Publishes everything to Redis as one build and switches /recommended-for-you over to it
+#
+# Meant to run periodically (e.g. hourly from cron); until the first build the endpoint queries
+# Postgres directly. Run from Backend/stockx_clone:
+#   python -m app.utils.Scripts.build_recommendations
+#   python -m app.utils.Scripts.build_recommendations --top-n 200 --history-days 180
+
+import argparse
+import time
+from datetime import datetime, timezone
+
+from app.database import create_db_engine
+from app.dependencies import recommendation_service
+from app.service.recommendation_service import RECS_TOP_N, compute_candidates
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute recommendation candidates into Redis")
+    parser.add_argument("--top-n", type=int, default=RECS_TOP_N, help="Candidates kept per segment and per user")
+    parser.add_argument("--history-days", type=int, default=365, help="Purchase history used for personal lists")
+    args = parser.parse_args()
+
+    engine = create_db_engine(application_name="stockx-build-recommendations", statement_timeout_ms=0, pool_size=1, max_overflow=0)
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        segments, users = compute_candidates(conn, datetime.now(timezone.utc), args.top_n, args.history_days)
+    computed = time.perf_counter()
+    build = recommendation_service.publish_build(segments, users)
+    stored = sum(len(ids) for ids in segments.values()) + sum(len(ids) for ids in users.values())
+    print(f"Computed {len(segments)} segment and {len(users)} user lists in {computed - started:.1f}s")
+    print(f"Published build {build}: {stored} candidates, ~{stored * 4 / 1024 / 1024:.1f} MiB of ids, in {time.perf_counter() - computed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# Recommendation offline evaluation:
+#   - Builds candidates as of --holdout-days ago (popularity and purchase history from the sales
+#     before that moment only) and scores them against what each buyer actually bought after it
+#   - Ranking quality at each --k: hit rate, precision, recall and NDCG for the global popular
+#     list alone and for the personal list merged over it, the way the endpoint serves them
+#   - Serving latency: the Redis key lookup + merge, the lookup plus the product fetch by id,
+#     and the old per-request ranking query, as p50/p99 over random segments and users
+#
+# Writes its build under a separate prefix (recs-eval:) with a one hour TTL, so the live build
+# is untouched. Run from Backend/stockx_clone:
+#   python -m app.utils.Scripts.eval_recommendations
+#   python -m app.utils.Scripts.eval_recommendations --holdout-days 14 --k 10 20 50
+
+import argparse
+import math
+import random
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+
+from app.database import create_db_engine
+from app.dependencies import redis_client
+from app.models.sales import Sale
+from app.routers.products import products_by_ids_statement, recommended_statement
+from app.service.recommendation_service import (
+    RECS_TOP_N, RecommendationService, compute_candidates, merge_candidates, segment_key
+)
+
+
+def ranking_metrics(recommended, bought, k):
+    hits = [rank for rank, product_id in enumerate(recommended[:k]) if product_id in bought]
+    ideal = sum(1 / math.log2(rank + 2) for rank in range(min(len(bought), k)))
+    return {
+        "hit_rate": 1.0 if hits else 0.0,
+        "precision": len(hits) / k,
+        "recall": len(hits) / len(bought),
+        "ndcg": sum(1 / math.log2(rank + 2) for rank in hits) / ideal,
+    }
+
+
+def report_quality(segments, users, holdout, ks):
+    popular = segments.get(segment_key(None, None, None), [])
+    groups = {"all buyers": list(holdout), "with history": [user_id for user_id in holdout if user_id in users]}
+    for group, user_ids in groups.items():
+        print(f"\n{group}: {len(user_ids)} users")
+        if not user_ids:
+            continue
+        for k in ks:
+            for strategy in ("popular", "personal+popular"):
+                totals = defaultdict(float)
+                for user_id in user_ids:
+                    recommended = popular if strategy == "popular" else merge_candidates(users.get(user_id, []), popular, k)
+                    for name, value in ranking_metrics(recommended, holdout[user_id], k).items():
+                        totals[name] += value
+                print(f"  @{k:<3} {strategy:<17} " + "   ".join(f"{name} {total / len(user_ids):.4f}" for name, total in totals.items()))
+
+
+def percentiles(values, label):
+    values.sort()
+    print(f"{label}: p50 {statistics.median(values):.2f} ms   p99 {values[int(len(values) * 0.99) - 1]:.2f} ms   max {values[-1]:.2f} ms")
+
+
+def timed(fn):
+    started = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - started) * 1000
+
+
+def report_latency(conn, service, segments, users, requests, sql_requests, limit, seed):
+    rng = random.Random(seed)
+    segment_filters = [tuple(None if value == "*" else value for value in key.split("|")) for key in segments]
+    user_ids = list(users) or [None]
+    samples = [(rng.choice(segment_filters), rng.choice(user_ids)) for _ in range(requests)]
+
+    lookup_ms, served_ms = [], []
+    for filters, user_id in samples:
+        (segment_ids, personal_ids), elapsed = timed(lambda: service.candidates(*filters, user_id))
+        ranked = merge_candidates(personal_ids, segment_ids or [], limit)
+        lookup_ms.append(elapsed)
+        _, fetched = timed(lambda: conn.execute(products_by_ids_statement(ranked)).all() if ranked else [])
+        served_ms.append(elapsed + fetched)
+    print()
+    percentiles(lookup_ms, f"key lookup + merge ({requests} requests)")
+    percentiles(served_ms, "lookup + product fetch by id")
+
+    query_ms = [timed(lambda: conn.execute(recommended_statement(*filters, limit)).all())[1] for filters, _ in samples[:sql_requests]]
+    percentiles(query_ms, f"per-request ranking query ({len(query_ms)} requests)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate precomputed recommendations offline")
+    parser.add_argument("--holdout-days", type=int, default=30, help="Sales in this final period are the ground truth")
+    parser.add_argument("--history-days", type=int, default=365)
+    parser.add_argument("--top-n", type=int, default=RECS_TOP_N)
+    parser.add_argument("--k", type=int, nargs="+", default=[10, 20])
+    parser.add_argument("--requests", type=int, default=2000, help="Timed key lookups")
+    parser.add_argument("--sql-requests", type=int, default=200, help="Timed ranking queries")
+    parser.add_argument("--limit", type=int, default=20, help="Products per timed request")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    engine = create_db_engine(application_name="stockx-eval-recommendations", statement_timeout_ms=0, pool_size=1, max_overflow=0)
+    now = datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=args.holdout_days)
+    with engine.connect() as conn:
+        started = time.perf_counter()
+        segments, users = compute_candidates(conn, now, args.top_n, args.history_days, as_of=cutoff)
+        print(f"Built {len(segments)} segment and {len(users)} user lists as of {cutoff:%Y-%m-%d} in {time.perf_counter() - started:.1f}s")
+
+        holdout = defaultdict(set)
+        future = select(Sale.buyer_id, Sale.product_id)\
+            .filter(Sale.status == "completed", Sale.buyer_id.isnot(None), Sale.product_id.isnot(None), Sale.sale_date >= cutoff)
+        for buyer_id, product_id in conn.execute(future):
+            holdout[buyer_id].add(product_id)
+        report_quality(segments, users, holdout, args.k)
+
+        service = RecommendationService(redis_client, prefix="recs-eval:", build_ttl=3600, build_check_interval=60)
+        service.publish_build(segments, users)
+        report_latency(conn, service, segments, users, args.requests, args.sql_requests, args.limit, args.seed)
+
+
+if __name__ == "__main__":
+    main()
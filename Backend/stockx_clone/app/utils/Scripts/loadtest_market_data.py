@@ -0,0 +1,171 @@
+# Market data streaming load test:
+#   - Opens --subscribers WebSocket connections (10k by default) to /ws/market on one worker,
+#     each following --products-per-client random products, and keeps them idle for --hold seconds
+#   - Meanwhile publishes --rate sale updates/sec straight onto the Redis fan-out channel and
+#     measures publish-to-receive latency from the `sold_at` stamp in each update
+#   - Prints connect failures, frames received, latency percentiles and the worker's /metrics
+#
+# Needs the `websockets` client package and a worker started with one process, e.g.
+#   uvicorn app.main:app --workers 1 --port 8000
+# Run from Backend/stockx_clone:
+#   python -m app.utils.Scripts.loadtest_market_data --url ws://localhost:8000/ws/market --subscribers 10000
+#
+# --in-process skips the network and drives a MarketDataHub directly with in-memory sockets,
+# reporting the hub's per-subscriber memory and fan-out cost on its own.
+
+import argparse
+import asyncio
+import json
+import random
+import resource
+import statistics
+import time
+import tracemalloc
+import urllib.request
+from datetime import datetime, timezone
+from decimal import Decimal
+
+from app.service.market_data import MarketDataHub, MarketSubscriber, sale_update
+
+
+def percentiles(values, label):
+    if not values:
+        print(f"{label}: no samples")
+        return
+    values.sort()
+    print(f"{label}: p50 {statistics.median(values):.2f} ms   p99 {values[int(len(values) * 0.99) - 1]:.2f} ms   max {values[-1]:.2f} ms")
+
+
+def raise_fd_limit():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    return hard
+
+
+async def run_network(args):
+    import redis.asyncio as aioredis
+    import websockets
+
+    print(f"File descriptor limit: {raise_fd_limit()}")
+    rng = random.Random(args.seed)
+    latencies = []
+    frames = 0
+    failures = 0
+    connected = 0
+    stop = asyncio.Event()
+
+    async def subscriber():
+        nonlocal frames, failures, connected
+        products = ",".join(str(rng.randint(1, args.products)) for _ in range(args.products_per_client))
+        try:
+            async with websockets.connect(f"{args.url}?products={products}", open_timeout=60, ping_interval=None) as ws:
+                connected += 1
+                while not stop.is_set():
+                    try:
+                        frame = await asyncio.wait_for(ws.recv(), 1.0)
+                    except asyncio.TimeoutError:
+                        continue
+                    received = datetime.now(timezone.utc)
+                    frames += 1
+                    for update in json.loads(frame):
+                        sold_at = datetime.fromisoformat(update["sold_at"])
+                        latencies.append((received - sold_at).total_seconds() * 1000)
+        except Exception:
+            failures += 1
+
+    started = time.perf_counter()
+    tasks = []
+    for _ in range(args.subscribers):
+        tasks.append(asyncio.create_task(subscriber()))
+        if len(tasks) % 500 == 0:
+            await asyncio.sleep(0.05)  # don't overflow the listen backlog
+    while connected + failures < args.subscribers and time.perf_counter() - started < 120:
+        await asyncio.sleep(0.5)
+    print(f"Connected {connected}/{args.subscribers} in {time.perf_counter() - started:.1f}s ({failures} failures)")
+
+    redis = aioredis.from_url(args.redis_url)
+    deadline = time.perf_counter() + args.hold
+    published = 0
+    while time.perf_counter() < deadline:
+        update = sale_update(rng.randint(1, args.products), None, Decimal(rng.randint(100, 400)), datetime.now(timezone.utc))
+        await redis.publish(args.channel, json.dumps({"origin": "loadtest", **update}))
+        published += 1
+        await asyncio.sleep(1 / args.rate)
+    await asyncio.sleep(2)
+    stop.set()
+    await asyncio.gather(*tasks)
+    await redis.aclose()
+
+    print(f"Published {published} updates, received {frames} frames ({len(latencies)} updates)")
+    percentiles(latencies, "publish -> receive latency")
+    metrics_url = args.url.replace("ws://", "http://").replace("wss://", "https://").rsplit("/ws/", 1)[0] + "/metrics"
+    try:
+        with urllib.request.urlopen(metrics_url, timeout=5) as response:
+            print("Worker market_data metrics:", json.loads(response.read())["market_data"])
+    except Exception as e:
+        print(f"Could not read {metrics_url}: {e}")
+
+
+class IdleSocket:
+    """In-memory client that reads everything instantly"""
+
+    def __init__(self):
+        self.frames = 0
+
+    async def send_text(self, frame):
+        self.frames += 1
+
+
+async def run_in_process(args):
+    rng = random.Random(args.seed)
+    hub = MarketDataHub(max_subscribers=args.subscribers)
+
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    sockets = []
+    senders = []
+    for _ in range(args.subscribers):
+        socket = IdleSocket()
+        subscriber = MarketSubscriber(socket, hub.send_timeout)
+        hub.subscribe(subscriber, [rng.randint(1, args.products) for _ in range(args.products_per_client)])
+        sockets.append(socket)
+        senders.append(asyncio.create_task(subscriber.send_updates()))
+    await asyncio.sleep(0)
+    held = tracemalloc.get_traced_memory()[0] - baseline
+    tracemalloc.stop()
+    print(f"{args.subscribers} idle subscribers: {held / 1024 / 1024:.1f} MiB ({held / args.subscribers:.0f} B each, sender task included)")
+
+    dispatch_ms = []
+    for _ in range(args.updates):
+        update = sale_update(rng.randint(1, args.products), None, Decimal(rng.randint(100, 400)), datetime.now(timezone.utc))
+        started = time.perf_counter()
+        hub.dispatch(update)
+        dispatch_ms.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0)
+    await asyncio.sleep(0.1)
+    percentiles(dispatch_ms, f"dispatch to ~{args.subscribers * args.products_per_client // args.products} subscribers/product")
+    print(f"Frames sent: {sum(socket.frames for socket in sockets)}   hub stats: {hub.stats()}")
+    for sender in senders:
+        sender.cancel()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the market data WebSocket fan-out")
+    parser.add_argument("--url", default="ws://localhost:8000/ws/market")
+    parser.add_argument("--redis-url", default="redis://localhost:6379/0")
+    parser.add_argument("--channel", default="market:updates")
+    parser.add_argument("--subscribers", type=int, default=10_000)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--products-per-client", type=int, default=5)
+    parser.add_argument("--hold", type=float, default=60, help="Seconds to hold the connections open")
+    parser.add_argument("--rate", type=float, default=200, help="Updates published per second while holding")
+    parser.add_argument("--updates", type=int, default=10_000, help="Updates dispatched in --in-process mode")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--in-process", action="store_true", help="Drive a hub directly, without sockets")
+    args = parser.parse_args()
+
+    asyncio.run(run_in_process(args) if args.in_process else run_network(args))
+
+
+if __name__ == "__main__":
+    main()
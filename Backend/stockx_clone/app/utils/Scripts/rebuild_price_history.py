@@ -0,0 +1,59 @@
+# Price history rebuild:
+#   - Recomputes the price_history rollups (hour/day/week OHLC + volume) from the raw sales table
+#   - Only needed once after adding the table, or to repair the rollups; new sales keep them
+#     up to date through the Sale insert hook in app/service/price_history_service.py
+#
+# Run from Backend/stockx_clone:
+#   python -m app.utils.Scripts.rebuild_price_history
+#   python -m app.utils.Scripts.rebuild_price_history --product-id 42
+
+import argparse
+import time
+
+from sqlalchemy import text
+
+from app.database import create_db_engine
+from app.service.price_history_service import BUCKETS
+
+# date_trunc in UTC matches bucket_start(); ties on sale_date fall back to id, i.e. insert order
+REBUILD_SQL = """
+INSERT INTO price_history (product_id, bucket, bucket_start, open, high, low, close, volume, turnover, first_sale_at, last_sale_at)
+SELECT
+    product_id,
+    :bucket,
+    date_trunc(:bucket, sale_date AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+    (array_agg(sale_price ORDER BY sale_date, id))[1],
+    max(sale_price),
+    min(sale_price),
+    (array_agg(sale_price ORDER BY sale_date DESC, id DESC))[1],
+    count(*),
+    sum(sale_price),
+    min(sale_date),
+    max(sale_date)
+FROM sales
+WHERE status = 'completed' AND product_id IS NOT NULL AND sale_date IS NOT NULL {product_filter}
+GROUP BY 1, 3
+"""
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild price_history rollups from sales")
+    parser.add_argument("--product-id", type=int, help="Only rebuild this product")
+    args = parser.parse_args()
+
+    product_filter = "AND product_id = :product_id" if args.product_id else ""
+    params = {"product_id": args.product_id}
+    engine = create_db_engine(application_name="stockx-rebuild-price-history", statement_timeout_ms=0, pool_size=1, max_overflow=0)
+
+    started = time.perf_counter()
+    # One transaction, so charts never see a half-rebuilt series
+    with engine.begin() as conn:
+        conn.execute(text(f"DELETE FROM price_history WHERE true {product_filter}"), params)
+        for bucket in BUCKETS:
+            result = conn.execute(text(REBUILD_SQL.format(product_filter=product_filter)), {**params, "bucket": bucket})
+            print(f"{bucket:>5}: {result.rowcount} buckets")
+    print(f"Rebuilt in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
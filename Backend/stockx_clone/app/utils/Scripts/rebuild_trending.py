@@ -0,0 +1,74 @@
+# Trending score rebuild:
+#   - Recomputes every window's decayed trending scores from the completed sales in Postgres
+#     and swaps them into Redis (RENAME, so readers never see a half-built ranking)
+#   - Only needed to seed the scores or to repair them after Redis data loss; new sales keep
+#     them up to date through the recorder in app/service/trending_service.py.
+#     Sales committed while this runs may be counted twice or not at all.
+#
+# Run from Backend/stockx_clone:
+#   python -m app.utils.Scripts.rebuild_trending
+#   python -m app.utils.Scripts.rebuild_trending --window 24h
+
+import argparse
+import math
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+from app.database import create_db_engine
+from app.dependencies import trending_service
+from app.service.trending_service import PRUNE_BELOW, REBASE_AFTER, TRENDING_WINDOWS, epoch_period
+
+# Same weight as sale_weight(), future-dated sales counting as sold now like TrendingService.record;
+# sales older than the prune horizon can't reach PRUNE_BELOW
+SCORES_SQL = """
+SELECT product_id, sum(exp((extract(epoch FROM least(sale_date, to_timestamp(:now))) - :epoch) / :tau)) AS score
+FROM sales
+WHERE status = 'completed' AND product_id IS NOT NULL AND sale_date >= to_timestamp(:since)
+GROUP BY product_id
+"""
+
+
+def rebuild(conn, window: str, now: datetime) -> int:
+    tau = TRENDING_WINDOWS[window]
+    period = epoch_period(window, now)
+    since = now.timestamp() + math.log(PRUNE_BELOW) * tau
+    rows = conn.execute(text(SCORES_SQL), {"epoch": period * REBASE_AFTER * tau, "tau": tau, "since": since, "now": now.timestamp()}).all()
+
+    redis = trending_service.redis
+    key = trending_service.key(window, period)
+    staging = f"{key}:rebuild"
+    ttl = 2 * REBASE_AFTER * tau
+    redis.delete(staging)
+    for start in range(0, len(rows), 10000):
+        redis.zadd(staging, {str(product_id): float(score) for product_id, score in rows[start:start + 10000]})
+
+    pipe = redis.pipeline(transaction=True)
+    if rows:
+        pipe.rename(staging, key)
+        pipe.expire(key, ttl)
+    else:
+        pipe.delete(key)
+    # The rebuilt set already covers the previous epoch, so it must not be carried over again
+    pipe.set(f"{key}:ready", 1, ex=ttl)
+    pipe.execute()
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild trending scores in Redis from sales")
+    parser.add_argument("--window", choices=list(TRENDING_WINDOWS), help="Only rebuild this window")
+    args = parser.parse_args()
+
+    engine = create_db_engine(application_name="stockx-rebuild-trending", statement_timeout_ms=0, pool_size=1, max_overflow=0)
+    now = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        for window in [args.window] if args.window else TRENDING_WINDOWS:
+            print(f"{window:>4}: {rebuild(conn, window, now)} products")
+    print(f"Rebuilt in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
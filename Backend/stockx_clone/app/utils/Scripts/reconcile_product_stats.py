@@ -0,0 +1,123 @@
+# Product sale statistics reconciliation:
+#   - Recomputes sales_count, sales_total, average_price, last_sale_price and last_sale_date
+#     from the completed rows in `sales` and repairs products whose stored values drifted
+#   - The products id range is cut into chunks that a process pool works through in parallel;
+#     each chunk is one UPDATE ... FROM (aggregate) in its own short transaction, so live
+#     sale recording only ever waits on the rows of one chunk
+#   - Products with no sales rows keep their imported statistics unless --include-unsold is given
+#
+# Run from Backend/stockx_clone:
+#   python -m app.utils.Scripts.reconcile_product_stats --chunk-size 10000 --workers 4
+#   python -m app.utils.Scripts.reconcile_product_stats --dry-run
+
+import argparse
+import multiprocessing
+import time
+
+from sqlalchemy import text
+
+from app.database import create_db_engine
+
+STATS_SQL = """
+WITH totals AS (
+    SELECT product_id, count(*) AS sales_count, sum(sale_price) AS sales_total
+    FROM sales
+    WHERE status = 'completed' AND product_id BETWEEN :first_id AND :last_id
+    GROUP BY product_id
+),
+latest AS (
+    SELECT DISTINCT ON (product_id) product_id, sale_price, sale_date
+    FROM sales
+    WHERE status = 'completed' AND product_id BETWEEN :first_id AND :last_id
+    ORDER BY product_id, sale_date DESC, id DESC
+),
+expected AS (
+    SELECT p.id,
+           coalesce(t.sales_count, 0) AS sales_count,
+           coalesce(t.sales_total, 0) AS sales_total,
+           round(t.sales_total / t.sales_count, 2) AS average_price,
+           l.sale_price AS last_sale_price,
+           l.sale_date AS last_sale_date
+    FROM products p
+    LEFT JOIN totals t ON t.product_id = p.id
+    LEFT JOIN latest l ON l.product_id = p.id
+    WHERE p.id BETWEEN :first_id AND :last_id AND (:include_unsold OR t.product_id IS NOT NULL)
+)
+"""
+
+REPAIR_SQL = STATS_SQL + """
+UPDATE products p
+SET sales_count = e.sales_count,
+    sales_total = e.sales_total,
+    average_price = e.average_price,
+    last_sale_price = e.last_sale_price,
+    last_sale_date = e.last_sale_date
+FROM expected e
+WHERE p.id = e.id
+  AND (p.sales_count, p.sales_total, p.average_price, p.last_sale_price, p.last_sale_date)
+      IS DISTINCT FROM (e.sales_count, e.sales_total, e.average_price, e.last_sale_price, e.last_sale_date)
+"""
+
+COUNT_DRIFT_SQL = STATS_SQL + """
+SELECT count(*)
+FROM products p JOIN expected e ON p.id = e.id
+WHERE (p.sales_count, p.sales_total, p.average_price, p.last_sale_price, p.last_sale_date)
+      IS DISTINCT FROM (e.sales_count, e.sales_total, e.average_price, e.last_sale_price, e.last_sale_date)
+"""
+
+LOCK_SQL = "SELECT id FROM products WHERE id BETWEEN :first_id AND :last_id ORDER BY id FOR UPDATE"
+
+engine = None
+
+
+def init_worker():
+    global engine
+    engine = create_db_engine(application_name="stockx-reconcile-stats", statement_timeout_ms=0, pool_size=1, max_overflow=0)
+
+
+def reconcile_chunk(task):
+    """Repair (or, in a dry run, count) drifted products with ids in [first_id, last_id]"""
+    first_id, last_id, include_unsold, dry_run = task
+    params = {"first_id": first_id, "last_id": last_id, "include_unsold": include_unsold}
+    with engine.begin() as conn:
+        if dry_run:
+            return conn.execute(text(COUNT_DRIFT_SQL), params).scalar()
+        # Sales recording updates the product row before inserting the sale, so holding these
+        # row locks means the aggregate below sees every sale whose increment it replaces
+        conn.execute(text(LOCK_SQL), params)
+        return conn.execute(text(REPAIR_SQL), params).rowcount
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute denormalized product sale statistics from sales")
+    parser.add_argument("--chunk-size", type=int, default=10000, help="Product ids per chunk")
+    parser.add_argument("--workers", type=int, default=max(1, multiprocessing.cpu_count() - 1))
+    parser.add_argument("--include-unsold", action="store_true", help="Also reset products that have no sales rows")
+    parser.add_argument("--dry-run", action="store_true", help="Only count drifted products")
+    args = parser.parse_args()
+
+    init_worker()
+    with engine.connect() as conn:
+        low, high = conn.execute(text("SELECT min(id), max(id) FROM products")).one()
+    engine.dispose()
+    if low is None:
+        print("No products")
+        return
+
+    tasks = [
+        (first, min(first + args.chunk_size - 1, high), args.include_unsold, args.dry_run)
+        for first in range(low, high + 1, args.chunk_size)
+    ]
+    print(f"Reconciling products {low}..{high} in {len(tasks)} chunks with {args.workers} workers")
+
+    started = time.perf_counter()
+    drifted = 0
+    with multiprocessing.Pool(processes=args.workers, initializer=init_worker) as pool:
+        for count in pool.imap_unordered(reconcile_chunk, tasks):
+            drifted += count
+    verb = "would be repaired" if args.dry_run else "repaired"
+    print(f"{drifted} products {verb} in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+# Brand stats refresh:
+#   - Runs REFRESH MATERIALIZED VIEW CONCURRENTLY brand_stats once, for cron or after a bulk import
+#   - The API workers also refresh it every BRAND_STATS_REFRESH_SECONDS (set 0 to leave it to cron)
+#
+# Run from Backend/stockx_clone:
+#   python -m app.utils.Scripts.refresh_brand_stats
+
+import time
+
+from app.database import create_db_engine
+from app.service.brand_stats_service import refresh_brand_stats
+
+
+def main():
+    engine = create_db_engine(application_name="stockx-refresh-brand-stats", statement_timeout_ms=0, pool_size=1, max_overflow=0)
+    started = time.perf_counter()
+    if refresh_brand_stats(engine):
+        print(f"Refreshed brand_stats in {time.perf_counter() - started:.1f}s")
+    else:
+        print("Another refresh is running; skipped")
+
+
+if __name__ == "__main__":
+    main()
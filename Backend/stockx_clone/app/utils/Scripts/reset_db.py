@@ -1,31 +1,19 @@
 # reset_db.py
-import psycopg2
-import os
+import sys, os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../../")))
 
-# Connection parameters
-DB_USER = "stockx"
-DB_PASSWORD = "stockx123"
-DB_HOST = "localhost"
-DB_PORT = "5432"
-DB_NAME = "stockx"
-
-# SQLAlchemy connection string (for reference)
-DATABASE_URL = f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+from app.database import create_db_engine
+from app.models.brand_stats import BRAND_STATS_SQL
+from app.models.product import SEARCH_VECTOR_SQL
 
 def reset_database():
     """Reset the database and recreate all tables"""
     print("Connecting to database...")
     
-    # Direct connection for dropping tables - use keyword arguments instead of connection string
-    conn = psycopg2.connect(
-        user=DB_USER,
-        password=DB_PASSWORD,
-        host=DB_HOST,
-        port=DB_PORT,
-        database=DB_NAME
-    )
-    conn.autocommit = True
-    cursor = conn.cursor()
+    # Shared engine factory; DDL runs in autocommit mode without a statement timeout
+    engine = create_db_engine(application_name="stockx-reset-db", statement_timeout_ms=0, pool_size=1, max_overflow=0)
+    conn = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    cursor = conn.connection.cursor()
     
     # Drop tables if they exist
     print("Dropping existing tables...")
@@ -67,7 +55,7 @@ def reset_database():
     """)
     
     # Create products table
-    cursor.execute("""
+    cursor.execute(f"""
     CREATE TABLE products (
         id SERIAL PRIMARY KEY,
         name VARCHAR NOT NULL,
@@ -84,12 +72,35 @@ def reset_database():
         last_sale_date TIMESTAMP WITH TIME ZONE,
         average_price DECIMAL(10, 2),
         sales_count INTEGER DEFAULT 0,
+        sales_total DECIMAL(14, 2) DEFAULT 0,
+        product_key VARCHAR(255) CONSTRAINT uq_products_product_key UNIQUE,
+        content_hash VARCHAR(32),
         created_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
-        updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+        updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+        search_vector TSVECTOR GENERATED ALWAYS AS ({SEARCH_VECTOR_SQL}) STORED
     );
     """)
     
+    # Full text index behind /api/products/search
+    cursor.execute("CREATE INDEX ix_products_search_vector ON products USING gin (search_vector);")
+    
+    # Filter and sort indexes (migration 3c9e5b7d21f4)
+    cursor.execute("CREATE INDEX ix_products_sales_count_id ON products (sales_count DESC, id DESC) WHERE sales_count IS NOT NULL;")
+    cursor.execute("CREATE INDEX ix_products_created_at_id ON products (created_at DESC, id DESC);")
+    cursor.execute("CREATE INDEX ix_products_last_sale_price_id ON products (last_sale_price, id) WHERE last_sale_price IS NOT NULL;")
+    cursor.execute("CREATE INDEX ix_products_brand_id ON products (brand, id);")
+    cursor.execute("CREATE INDEX ix_products_category_gender_id ON products (category, gender, id);")
+    cursor.execute("CREATE INDEX ix_products_recommendation ON products (category, brand, gender, sales_count DESC) WHERE retail_price IS NOT NULL AND last_sale_price IS NOT NULL;")
+    
+    # Brand popularity view behind /popular-brands (dropped above with products), and each brand's best sellers
+    cursor.execute("CREATE INDEX ix_products_brand_sales_count ON products (brand, sales_count DESC NULLS LAST, id);")
+    cursor.execute(f"CREATE MATERIALIZED VIEW brand_stats AS {BRAND_STATS_SQL};")
+    cursor.execute("CREATE UNIQUE INDEX ux_brand_stats_brand ON brand_stats (brand);")
+    cursor.execute("CREATE INDEX ix_brand_stats_popularity ON brand_stats (total_sales DESC, brand);")
+    
+    cursor.close()
     conn.close()
+    engine.dispose()
     print("Database reset complete!")
 
 if __name__ == "__main__":
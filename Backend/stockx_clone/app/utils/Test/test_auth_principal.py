@@ -0,0 +1,70 @@
+# test_auth_principal.py
+
+#run this pytest with command -> pytest -v test_auth_principal.py
+import asyncio
+import time
+from datetime import timedelta
+import uuid
+import jwt
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from app.middleware import auth
+from app.middleware.auth import AppTokenVerifier, ClerkTokenVerifier, Principal, get_principal, require_principal
+from app.utils.auth import create_access_token, create_reset_token
+
+pytest.importorskip("cryptography")
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+@pytest.fixture
+def clerk_key(monkeypatch):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+    monkeypatch.setattr(auth, "clerk_token_verifier", ClerkTokenVerifier(static_key=pem, audience="fastapi-app"))
+    monkeypatch.setattr(auth, "app_token_verifier", AppTokenVerifier())
+    return key
+
+@pytest.fixture
+def client(clerk_key):
+    app = FastAPI()
+
+    @app.get("/whoami")
+    async def whoami(principal: Principal = Depends(require_principal), again: Principal = Depends(get_principal)):
+        assert again is principal
+        return {"provider": principal.provider, "subject": principal.subject}
+
+    return TestClient(app)
+
+def clerk_token(key, sub="user_clerk"):
+    return jwt.encode({"sub": sub, "aud": "fastapi-app", "exp": int(time.time()) + 60}, key, algorithm="RS256")
+
+def test_tokens_dispatch_on_their_algorithm(client, clerk_key):
+    user_id = uuid.uuid4()
+    custom = create_access_token({"sub": str(user_id)}, timedelta(minutes=5))
+    assert client.get("/whoami", headers={"Authorization": f"Bearer {custom}"}).json() == {"provider": "custom", "subject": str(user_id)}
+    assert client.get("/whoami", headers={"Authorization": f"Bearer {clerk_token(clerk_key)}"}).json() == {"provider": "clerk", "subject": "user_clerk"}
+    assert client.get("/whoami", cookies={"__session": clerk_token(clerk_key, "user_cookie")}).json() == {"provider": "clerk", "subject": "user_cookie"}
+    # One verification per token: the custom verifier never saw the Clerk tokens
+    assert auth.app_token_verifier.stats()["verified"] == 1
+    assert auth.clerk_token_verifier.stats()["verified"] == 2
+
+def test_invalid_and_reset_tokens_are_rejected(client, clerk_key):
+    reset = create_reset_token(uuid.uuid4())
+    for token in (reset, "not-a-jwt", "e30.e30.", clerk_token(rsa.generate_private_key(public_exponent=65537, key_size=2048))):
+        assert client.get("/whoami", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+    assert client.get("/whoami").status_code == 401
+
+def test_repeat_requests_hit_the_verified_token_cache(client):
+    custom = create_access_token({"sub": str(uuid.uuid4())}, timedelta(minutes=5))
+    for _ in range(3):
+        assert client.get("/whoami", headers={"Authorization": f"Bearer {custom}"}).status_code == 200
+    stats = auth.app_token_verifier.stats()
+    assert stats["verified"] == 1
+    assert stats["cache"]["hits"] == 2
+
+def test_clerk_user_id_ignores_custom_tokens(clerk_key):
+    from starlette.requests import Request
+    custom = create_access_token({"sub": str(uuid.uuid4())}, timedelta(minutes=5))
+    request = Request({"type": "http", "headers": [(b"authorization", f"Bearer {custom}".encode())]})
+    assert asyncio.run(auth.get_clerk_user_id(request)) is None
@@ -0,0 +1,48 @@
+# test_cache_service.py
+
+#run this pytest with command -> pytest -v test_cache_service.py
+import threading
+import time
+import pytest
+from app.service.cache_service import CacheService
+
+fakeredis = pytest.importorskip("fakeredis")
+
+@pytest.fixture
+def cache():
+    return CacheService(fakeredis.FakeRedis(), prefix="test:", default_ttl=60)
+
+def test_get_or_set_reads_through(cache):
+    calls = []
+    def loader():
+        calls.append(1)
+        return [{"id": 1}]
+
+    assert cache.get_or_set("trending:v0:limit=20", loader) == [{"id": 1}]
+    assert cache.get_or_set("trending:v0:limit=20", loader) == [{"id": 1}]
+    assert len(calls) == 1
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+
+def test_get_or_set_single_flight(cache):
+    calls = []
+    def slow_loader():
+        calls.append(1)
+        time.sleep(0.2)
+        return ["value"]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_set("hot", slow_loader))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [["value"]] * 8
+
+def test_bump_version_changes_tag(cache):
+    assert cache.get_version("products") == 0
+    cache.bump_version("products")
+    assert cache.get_version("products") == 1
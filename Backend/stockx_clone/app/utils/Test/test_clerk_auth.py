@@ -0,0 +1,85 @@
+# test_clerk_auth.py
+
+#run this pytest with command -> pytest -v test_clerk_auth.py
+import asyncio
+import json
+import time
+import jwt
+import pytest
+from starlette.requests import Request
+from app.middleware import auth
+from app.middleware.auth import ClerkTokenVerifier
+
+pytest.importorskip("cryptography")
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+AUDIENCE = "fastapi-app"
+
+def new_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+def public_pem(key):
+    return key.public_key().public_bytes(serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo).decode()
+
+def sign(key, kid=None, sub="user_1", ttl=3600):
+    return jwt.encode({"sub": sub, "aud": AUDIENCE, "exp": int(time.time()) + ttl}, key, algorithm="RS256", headers={"kid": kid} if kid else None)
+
+def jwks(*keys):
+    return {"keys": [{**json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key())), "kid": kid, "use": "sig", "alg": "RS256"} for kid, key in keys]}
+
+@pytest.fixture
+def key():
+    return new_key()
+
+@pytest.fixture
+def decodes(monkeypatch):
+    calls = []
+    decode = jwt.decode
+    monkeypatch.setattr(jwt, "decode", lambda *args, **kwargs: calls.append(1) or decode(*args, **kwargs))
+    return calls
+
+def test_repeat_tokens_skip_the_signature_check(key, decodes):
+    verifier = ClerkTokenVerifier(static_key=public_pem(key), audience=AUDIENCE)
+    token = sign(key)
+    assert verifier.verify(token)["sub"] == "user_1"
+    assert verifier.verify(token)["sub"] == "user_1"
+    assert verifier.cached_claims(token)["sub"] == "user_1"
+    assert len(decodes) == 1
+    assert verifier.stats()["cache"]["hits"] == 2
+
+def test_invalid_tokens_are_never_cached(key, decodes):
+    verifier = ClerkTokenVerifier(static_key=public_pem(key), audience=AUDIENCE)
+    forged = sign(new_key())
+    assert verifier.verify(forged) is None
+    assert verifier.verify(forged) is None
+    assert len(decodes) == 2
+    assert verifier.stats()["rejected"] == 2
+
+def test_cached_claims_expire_with_the_token(key, monkeypatch):
+    verifier = ClerkTokenVerifier(static_key=public_pem(key), audience=AUDIENCE, cache_ttl=300)
+    token = sign(key, ttl=30)
+    assert verifier.verify(token) is not None
+    now = time.time()
+    monkeypatch.setattr(auth.time, "time", lambda: now + 31)
+    assert verifier.cached_claims(token) is None
+
+def test_rotated_keys_are_fetched_from_jwks(key, monkeypatch):
+    verifier = ClerkTokenVerifier(jwks_url="https://clerk.example.com/.well-known/jwks.json", audience=AUDIENCE)
+    verifier.jwks_client.cooldown_duration = 0
+    published = {"keys": jwks(("k1", key))}
+    monkeypatch.setattr(verifier.jwks_client, "fetch_data", lambda: published["keys"])
+    assert verifier.verify(sign(key, kid="k1"))["sub"] == "user_1"
+
+    rotated = new_key()
+    published["keys"] = jwks(("k2", rotated))
+    assert verifier.verify(sign(rotated, kid="k2", sub="user_2"))["sub"] == "user_2"
+
+def test_dependency_reads_cookie_or_bearer_header(key, monkeypatch):
+    monkeypatch.setattr(auth, "clerk_token_verifier", ClerkTokenVerifier(static_key=public_pem(key), audience=AUDIENCE))
+    token = sign(key)
+    bearer = Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+    cookie = Request({"type": "http", "headers": [(b"cookie", f"__session={token}".encode())]})
+    assert asyncio.run(auth.get_clerk_user_id(bearer)) == "user_1"
+    assert asyncio.run(auth.get_clerk_user_id(cookie)) == "user_1"
+    assert asyncio.run(auth.get_clerk_user_id(Request({"type": "http", "headers": []}))) is None
@@ -0,0 +1,152 @@
+# test_email_outbox.py
+
+#run this pytest with command -> pytest -v test_email_outbox.py
+import json
+import socket
+import time
+import pytest
+from app.service.email_outbox import EmailOutbox
+from app.service.email_service import EmailService, SmtpConnectionPool
+
+aiosmtpd_controller = pytest.importorskip("aiosmtpd.controller")
+
+class RecordingHandler:
+    """Local SMTP stand-in: keeps every delivered message and the connection it came on"""
+
+    def __init__(self):
+        self.delivered = []
+        self.replies = {}  # recipient -> reply codes to give before accepting
+
+    async def handle_DATA(self, server, session, envelope):
+        for rcpt in envelope.rcpt_tos:
+            pending = self.replies.get(rcpt)
+            if pending:
+                return pending.pop(0)
+        self.delivered.append((id(session), envelope.rcpt_tos[0], envelope.content))
+        return "250 OK"
+
+@pytest.fixture
+def smtp():
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    handler = RecordingHandler()
+    controller = aiosmtpd_controller.Controller(handler, hostname="127.0.0.1", port=port)
+    controller.start()
+    yield handler, port
+    controller.stop()
+
+@pytest.fixture
+def outbox(smtp):
+    fakeredis = pytest.importorskip("fakeredis")
+    _, port = smtp
+    pool = SmtpConnectionPool("127.0.0.1", port, starttls=False, size=1)
+    outbox = EmailOutbox(fakeredis.FakeRedis(), pool, batch_size=10, max_attempts=3, backoff_base=10)
+    yield outbox
+    pool.close()
+
+def queue(outbox, *recipients):
+    for to in recipients:
+        outbox.enqueue("noreply@example.com", to, f"Subject: hi\r\n\r\nhello {to}\r\n")
+
+def test_send_email_only_queues(smtp, outbox, monkeypatch):
+    handler, port = smtp
+    monkeypatch.setenv("SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(port))
+    service = EmailService(outbox=outbox)
+
+    assert service.send_welcome_email("new@example.com", "New User")
+    assert handler.delivered == [] and outbox.stats()["queued"] == 1
+
+    assert outbox.drain() == 1
+    assert [to for _, to, _ in handler.delivered] == ["new@example.com"]
+    assert b"Welcome to" in handler.delivered[0][2]
+
+def test_send_email_never_waits_on_smtp_when_redis_is_down(smtp, outbox, monkeypatch):
+    handler, port = smtp
+    monkeypatch.setenv("SMTP_SERVER", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(port))
+    monkeypatch.setenv("SMTP_STARTTLS", "false")
+    service = EmailService(outbox=outbox)
+    outbox.redis.lpush = None  # any failure talking to Redis
+
+    assert service.send_password_reset("reset@example.com", "https://example.com/reset?token=x")
+    service.shutdown()  # waits for the background send
+    assert [to for _, to, _ in handler.delivered] == ["reset@example.com"]
+
+def test_batches_share_a_pooled_connection(smtp, outbox):
+    handler, _ = smtp
+    queue(outbox, "a@example.com", "b@example.com", "c@example.com")
+    assert outbox.drain() == 3
+    queue(outbox, "d@example.com")
+    assert outbox.drain() == 1
+
+    # Oldest first, all over the one connection the pool kept open
+    assert [to for _, to, _ in handler.delivered] == ["a@example.com", "b@example.com", "c@example.com", "d@example.com"]
+    assert len({session for session, _, _ in handler.delivered}) == 1
+    assert outbox.pool.stats()["opened"] == 1
+    stats = outbox.stats()
+    assert stats["sent"] == 4 and stats["queued"] == 0 and outbox.redis.llen(outbox.processing_key(f"{outbox.node_id}-0")) == 0
+
+def test_transient_failures_are_retried_with_backoff(smtp, outbox):
+    handler, _ = smtp
+    handler.replies["slow@example.com"] = ["451 Try again later"]
+    queue(outbox, "slow@example.com", "ok@example.com")
+
+    now = time.time()
+    assert outbox.drain(now=now) == 2
+    assert [to for _, to, _ in handler.delivered] == ["ok@example.com"]
+    [(raw, due)] = outbox.redis.zrange(outbox.retry_key, 0, -1, withscores=True)
+    assert json.loads(raw)["attempts"] == 1
+    assert now + 5 <= due <= now + 10
+
+    # Not due yet, then due
+    assert outbox.promote_due(now) == 0
+    assert outbox.promote_due(due) == 1
+    assert outbox.drain() == 1
+    assert [to for _, to, _ in handler.delivered] == ["ok@example.com", "slow@example.com"]
+    assert outbox.stats()["retried"] == 1
+
+def test_permanent_failures_and_exhausted_retries_are_dead_lettered(smtp, outbox):
+    handler, _ = smtp
+    handler.replies["gone@example.com"] = ["550 No such user"]
+    handler.replies["flaky@example.com"] = ["451 Later"] * 3
+    queue(outbox, "gone@example.com", "flaky@example.com")
+
+    outbox.drain()
+    for _ in range(outbox.max_attempts - 1):
+        assert outbox.promote_due(float("inf")) == 1
+        outbox.drain()
+
+    entries = [json.loads(raw) for raw in outbox.redis.lrange(outbox.dead_key, 0, -1)]
+    assert sorted((entry["to"], entry["attempts"]) for entry in entries) == [("flaky@example.com", 3), ("gone@example.com", 1)]
+    # Bodies (reset links) are not kept, and the list expires
+    assert all("message" not in entry and entry["error"] for entry in entries)
+    assert 0 < outbox.redis.ttl(outbox.dead_key) <= outbox.dead_letter_ttl
+    assert handler.delivered == [] and outbox.redis.zcard(outbox.retry_key) == 0
+
+def test_unreachable_server_keeps_messages(outbox):
+    outbox.pool.port = 1  # nothing listens there
+    queue(outbox, "a@example.com")
+    assert outbox.drain() == 1
+    assert outbox.redis.zcard(outbox.retry_key) == 1 and outbox.stats()["sent"] == 0
+
+def test_stopped_workers_messages_are_requeued(smtp, outbox):
+    handler, _ = smtp
+    queue(outbox, "a@example.com")
+    # A worker claimed the message and died before sending it
+    outbox.redis.lmove(outbox.queue_key, outbox.processing_key("dead-0"), "RIGHT", "LEFT")
+    outbox.redis.set(outbox.heartbeat_key("live-0"), 1)
+    outbox.redis.lpush(outbox.processing_key("live-0"), b"in flight")
+
+    assert outbox.recover() == 1
+    assert outbox.redis.llen(outbox.processing_key("live-0")) == 1
+
+    outbox.start()
+    try:
+        deadline = time.time() + 5
+        while not handler.delivered and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        outbox.stop()
+    assert [to for _, to, _ in handler.delivered] == ["a@example.com"]
@@ -0,0 +1,53 @@
+# test_import_formats.py
+
+#run this pytest with command -> pytest -v test_import_formats.py
+from decimal import Decimal
+from glob import glob
+import pytest
+from app.utils import import_formats
+from app.utils.import_formats import FormatParser, PRODUCT_COLUMNS, detect_parser, register_parser
+from app.utils.Scripts.productsInjection import columns_to_rows, iter_parsed_products, iter_row_batches, to_row
+
+@pytest.mark.parametrize("path", glob("./app/utils/Data/**/*.json", recursive=True))
+def test_columnar_rows_match_per_item_path(path):
+    expected = [to_row(product) for product in iter_parsed_products(path)]
+    assert [row for batch in iter_row_batches(path, 7) for row in batch] == expected
+
+def test_format_detected_by_first_item():
+    assert detect_parser({"shoeName": "990v6"}).name == "sneaker-list"
+    assert detect_parser({"objectId": "x", "title": "Tee"}).name == "market-catalog"
+    assert detect_parser({"sku": 1}) is None
+
+def test_invalid_values_drop_only_their_row():
+    parser = detect_parser({"shoeName": "x"})
+    columns = parser.parse([
+        {"shoeName": "Good", "retailPrice": "120.5", "releaseDate": "2024-03-01"},
+        {"shoeName": "Bad price", "retailPrice": "abc"},
+        {"shoeName": "Bad date", "releaseDate": "soon"},
+    ])
+    assert columns["name"] == ["Good", "Bad date"]
+    assert columns["retail_price"] == [Decimal("120.5"), None]
+    assert columns["last_sale_date"][1] is None
+
+def test_plugins_take_precedence(monkeypatch):
+    monkeypatch.setattr(import_formats, "_parsers", list(import_formats._parsers))
+
+    @register_parser
+    class CsvishParser(FormatParser):
+        name = "plugin"
+
+        def detect(self, item):
+            return "sku" in item
+
+        def extract(self, items):
+            columns = {column: [None] * len(items) for column in PRODUCT_COLUMNS}
+            columns["name"] = [item["title"] for item in items]
+            columns["product_key"] = [f"plugin:{item['sku']}" for item in items]
+            columns["sales_count"] = [item.get("sold", "0") for item in items]
+            return columns
+
+    parser = detect_parser({"sku": 1, "title": "x"})
+    assert parser.name == "plugin"
+    rows = columns_to_rows(parser.parse([{"sku": 7, "title": "Cap", "sold": "12"}]))
+    assert rows[0][PRODUCT_COLUMNS.index("sales_count")] == 12
+    assert rows[0][PRODUCT_COLUMNS.index("product_key")] == "plugin:7"
@@ -0,0 +1,59 @@
+# test_local_cache.py
+
+#run this pytest with command -> pytest -v test_local_cache.py
+import time
+import pytest
+from app.service.cache_service import CacheService
+from app.service.local_cache import CacheInvalidationBus, LocalCache
+
+def test_lru_eviction_by_entries():
+    cache = LocalCache(max_entries=2, default_ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+def test_eviction_by_bytes():
+    cache = LocalCache(max_entries=100, max_bytes=10, default_ttl=60)
+    cache.set("a", "x", size=6)
+    cache.set("b", "y", size=6)
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 6
+
+def test_ttl_expiry():
+    cache = LocalCache(default_ttl=60)
+    cache.set("a", 1, ttl=0.05)
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+def test_l1_serves_repeat_reads_and_invalidates_peers():
+    fakeredis = pytest.importorskip("fakeredis")
+    server = fakeredis.FakeServer()
+    redis_a = fakeredis.FakeRedis(server=server)
+    redis_b = fakeredis.FakeRedis(server=server)
+
+    local_a, local_b = LocalCache(), LocalCache()
+    bus_a = CacheInvalidationBus(redis_a, local_a)
+    bus_b = CacheInvalidationBus(redis_b, local_b)
+    bus_b.start()
+    time.sleep(0.2)  # let the listener subscribe
+
+    cache_a = CacheService(redis_a, prefix="t:", local_cache=local_a, invalidation_bus=bus_a)
+    cache_b = CacheService(redis_b, prefix="t:", local_cache=local_b, invalidation_bus=bus_b)
+    try:
+        cache_a.set("user", {"name": "old"})
+        assert cache_b.get("user") == {"name": "old"}
+        assert local_b.get("t:user") == {"name": "old"}
+
+        cache_a.set("user", {"name": "new"})
+        deadline = time.monotonic() + 2
+        while local_b.get("t:user") is not None and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert cache_b.get("user") == {"name": "new"}
+    finally:
+        bus_b.stop()
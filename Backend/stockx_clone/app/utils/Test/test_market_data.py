@@ -0,0 +1,102 @@
+# test_market_data.py
+
+#run this pytest with command -> pytest -v test_market_data.py
+import asyncio
+import json
+import time
+from decimal import Decimal
+from fastapi import FastAPI, WebSocket
+from fastapi.testclient import TestClient
+from app.service.market_data import MarketDataHub, MarketSubscriber, book_update
+
+class StalledSocket:
+    """A client that stops reading: sends block until `release` is set"""
+    def __init__(self):
+        self.release = asyncio.Event()
+        self.frames = []
+
+    async def send_text(self, frame):
+        await self.release.wait()
+        self.frames.append(json.loads(frame))
+
+def test_updates_coalesce_while_the_client_is_not_reading():
+    async def scenario():
+        hub = MarketDataHub()
+        socket = StalledSocket()
+        subscriber = MarketSubscriber(socket, send_timeout=5)
+        hub.subscribe(subscriber, [1])
+        sender = asyncio.create_task(subscriber.send_updates())
+
+        hub.dispatch(book_update(1, 7, Decimal("200"), None))
+        await asyncio.sleep(0)  # the first frame is now stuck in send
+        for price in range(201, 251):
+            hub.dispatch(book_update(1, 7, Decimal(price), None))
+        hub.dispatch(book_update(1, 8, Decimal("300"), None))
+        hub.dispatch(book_update(2, 7, Decimal("1"), None))  # not subscribed
+
+        socket.release.set()
+        await asyncio.sleep(0.01)
+        sender.cancel()
+        return hub, socket.frames
+
+    hub, frames = asyncio.run(scenario())
+    assert [[(u["variant_id"], u["lowest_ask"]) for u in frame] for frame in frames] == [
+        [(7, "200")],
+        [(7, "250"), (8, "300")],
+    ]
+    assert hub.stats()["coalesced"] == 49
+
+def test_stalled_client_times_out():
+    async def scenario():
+        subscriber = MarketSubscriber(StalledSocket(), send_timeout=0.05)
+        subscriber.offer(("book", 1, 7), "{}")
+        await subscriber.send_updates()
+
+    try:
+        asyncio.run(scenario())
+    except asyncio.TimeoutError:
+        return
+    raise AssertionError("send_updates should time out")
+
+def eventually(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "condition not reached"
+        time.sleep(0.005)
+
+def make_app(hub):
+    app = FastAPI()
+
+    @app.websocket("/ws")
+    async def stream(websocket: WebSocket, products: str = ""):
+        await hub.serve(websocket, [int(p) for p in products.split(",") if p])
+
+    @app.post("/update/{product_id}/{price}")
+    async def update(product_id: int, price: int):
+        hub.dispatch(book_update(product_id, 1, Decimal(price), None))
+
+    return app
+
+def test_websocket_subscribe_and_unsubscribe():
+    hub = MarketDataHub()
+    client = TestClient(make_app(hub))
+    with client.websocket_connect("/ws?products=1") as ws:
+        client.post("/update/1/100")
+        assert ws.receive_json()[0]["lowest_ask"] == "100"
+
+        ws.send_json({"subscribe": [2], "unsubscribe": [1]})
+        ws.send_text("not json")  # ignored
+        ws.send_json({"subscribe": []})
+        eventually(lambda: list(hub._subscribers) == [2])
+        client.post("/update/1/101")
+        client.post("/update/2/102")
+        assert ws.receive_json() == [book_update(2, 1, Decimal(102), None)]
+        assert hub.stats()["connections"] == 1
+    # Disconnect cleans up the subscriptions
+    eventually(lambda: hub.stats()["connections"] == 0)
+    assert hub.stats()["products"] == 0
+
+def test_full_worker_rejects_new_subscribers():
+    client = TestClient(make_app(MarketDataHub(max_subscribers=0)))
+    with client.websocket_connect("/ws?products=1") as ws:
+        assert ws.receive()["code"] == 1013
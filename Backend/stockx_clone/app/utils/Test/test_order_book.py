@@ -0,0 +1,145 @@
+# test_order_book.py
+
+#run this pytest with command -> pytest -v test_order_book.py
+import asyncio
+import gc
+import uuid
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import pytest
+from pydantic import ValidationError
+from app.schemas.order_schema import BidCreate
+from app.service.order_book import ASK, BID, Order, OrderBookEngine
+from app.service.order_service import OrderService
+
+NOW = datetime(2026, 3, 1, tzinfo=timezone.utc)
+SELLER = uuid.uuid4()
+BUYER = uuid.uuid4()
+
+def ask(order_id, price, owner=SELLER, **kwargs):
+    return Order(ASK, order_id, 1, Decimal(price), owner, **kwargs)
+
+def bid(order_id, price, owner=BUYER, **kwargs):
+    return Order(BID, order_id, 1, Decimal(price), owner, **kwargs)
+
+@pytest.fixture
+def engine():
+    return OrderBookEngine()
+
+def test_non_crossing_orders_rest(engine):
+    assert engine.submit(ask(1, "200"), NOW).match is None
+    assert engine.submit(bid(1, "180"), NOW).match is None
+    top = engine.top(1)
+    assert top["lowest_ask"] == Decimal("200") and top["highest_bid"] == Decimal("180")
+
+def test_bid_fills_lowest_ask_at_ask_price(engine):
+    engine.load([ask(1, "210"), ask(2, "195"), ask(3, "205")])
+    match = engine.submit(bid(9, "220"), NOW).match
+    assert match.ask.order_id == 2 and match.bid.order_id == 9
+    assert match.price == Decimal("195")
+    assert engine.top(1)["lowest_ask"] == Decimal("205")
+
+def test_ask_fills_highest_bid_at_bid_price(engine):
+    engine.load([bid(1, "150"), bid(2, "170")])
+    match = engine.submit(ask(9, "160"), NOW).match
+    assert match.resting.order_id == 2 and match.price == Decimal("170")
+
+def test_time_priority_within_a_price(engine):
+    engine.load([ask(1, "200"), ask(2, "200")])
+    assert engine.submit(bid(9, "200"), NOW).match.resting.order_id == 1
+    assert engine.submit(bid(10, "200"), NOW).match.resting.order_id == 2
+
+def test_cancelled_orders_are_skipped(engine):
+    engine.load([ask(1, "190"), ask(2, "200")])
+    assert engine.cancel(ASK, 1).order_id == 1
+    assert engine.cancel(ASK, 1) is None
+    assert engine.submit(bid(9, "250"), NOW).match.resting.order_id == 2
+    assert engine.stats()["resting_orders"] == 0
+
+def test_expired_orders_are_dropped_and_reported(engine):
+    engine.load([ask(1, "190", expires_at=NOW - timedelta(minutes=1)), ask(2, "200")])
+    result = engine.submit(bid(9, "250"), NOW)
+    assert [order.order_id for order in result.expired] == [1]
+    assert result.match.resting.order_id == 2
+
+def test_no_self_matching(engine):
+    engine.load([ask(1, "190", owner=BUYER), ask(2, "200")])
+    assert engine.submit(bid(9, "250"), NOW).match.resting.order_id == 2
+    # The buyer's own ask is still on the book
+    assert engine.top(1)["lowest_ask"] == Decimal("190")
+
+def test_restore_keeps_time_priority(engine):
+    engine.load([ask(1, "200"), ask(2, "200")])
+    match = engine.submit(bid(9, "200"), NOW).match
+    engine.restore(match.resting)
+    assert engine.submit(bid(10, "200"), NOW).match.resting.order_id == 1
+
+def test_depth_aggregates_price_levels(engine):
+    engine.load([ask(1, "200"), ask(2, "200"), ask(3, "210"), bid(4, "150"), bid(5, "160")])
+    engine.cancel(ASK, 3)
+    top = engine.top(1, levels=5)
+    assert top["asks"] == [(Decimal("200"), 2)]
+    assert top["bids"] == [(Decimal("160"), 1), (Decimal("150"), 1)]
+
+def test_replace_swaps_in_a_reloaded_book(engine):
+    # Ask 1 was filled and ask 3 placed through another worker
+    engine.load([ask(1, "190"), ask(2, "200"), Order(ASK, 7, 2, Decimal("50"), SELLER)])
+    engine.replace(1, [ask(2, "200"), ask(3, "195")])
+    assert engine.cancel(ASK, 1) is None
+    assert engine.submit(bid(9, "250"), NOW).match.resting.order_id == 3
+    assert engine.top(2)["lowest_ask"] == Decimal("50")
+    assert engine.stats()["resting_orders"] == 2
+
+def test_variant_locks_are_dropped_when_unused():
+    service = OrderService(OrderBookEngine())
+    lock = service._variant_lock(1)
+    assert service._variant_lock(1) is lock
+    del lock
+    gc.collect()
+    assert len(service._variant_locks) == 0
+
+class SyncSession:
+    """Just enough of AsyncSession over a sync SQLite session for the book reload"""
+
+    def __init__(self, session):
+        self.session = session
+
+    async def execute(self, statement):
+        return self.session.execute(statement)
+
+    async def rollback(self):
+        self.session.rollback()
+
+def test_top_reloads_a_book_another_worker_changed():
+    fakeredis = pytest.importorskip("fakeredis")
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm import Session
+    from app.models.orders import Ask, Bid
+
+    db_engine = create_engine("sqlite://")
+    event.listen(db_engine, "connect", lambda conn, record: conn.create_function("pg_advisory_xact_lock", 2, lambda namespace, key: None))
+    Ask.__table__.create(db_engine)
+    Bid.__table__.create(db_engine)
+    with Session(db_engine) as session:
+        session.add_all([Ask(id=1, variant_id=1, price=Decimal("190"), status="active"), Bid(id=1, variant_id=1, price=Decimal("150"), status="active")])
+        session.commit()
+        db = SyncSession(session)
+        redis = fakeredis.FakeRedis()
+        service = OrderService(OrderBookEngine(), redis)
+        service.engine.load([ask(1, "190")])
+
+        # No version yet: reloaded every time
+        assert asyncio.run(service.top(db, 1))["highest_bid"] == Decimal("150")
+
+        # Another worker cancelled the ask and bumped the version
+        asyncio.run(service._bump_version(1, own=True))
+        session.query(Ask).update({"status": "cancelled"})
+        session.commit()
+        assert asyncio.run(service.top(db, 1))["lowest_ask"] == Decimal("190")  # still current
+        redis.incr(service.prefix + "1")
+        assert asyncio.run(service.top(db, 1))["lowest_ask"] is None
+    db_engine.dispose()
+
+def test_bid_must_not_be_expired():
+    with pytest.raises(ValidationError):
+        BidCreate(variant_id=1, price="100", expires_at=datetime(2000, 1, 1, tzinfo=timezone.utc))
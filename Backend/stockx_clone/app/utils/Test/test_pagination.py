@@ -0,0 +1,47 @@
+# test_pagination.py
+
+#run this pytest with command -> pytest -v test_pagination.py
+import pytest
+from datetime import datetime, timezone
+from decimal import Decimal
+from app.models.product import Product
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_clauses
+
+def make_product(**kwargs):
+    defaults = {
+        "id": 42,
+        "name": "Test Product",
+        "sales_count": 17,
+        "created_at": datetime(2025, 5, 1, 12, 30, tzinfo=timezone.utc),
+        "last_sale_price": Decimal("189.50"),
+    }
+    defaults.update(kwargs)
+    return Product(**defaults)
+
+@pytest.mark.parametrize("sort, expected", [
+    ("id", [42]),
+    ("trending", [17, 42]),
+    ("new_arrivals", [datetime(2025, 5, 1, 12, 30, tzinfo=timezone.utc), 42]),
+    ("price", [Decimal("189.50"), 42]),
+    ("price_desc", [Decimal("189.50"), 42]),
+])
+def test_cursor_round_trip(sort, expected):
+    cursor = encode_cursor(sort, make_product())
+    assert decode_cursor(sort, cursor) == expected
+
+def test_empty_cursor_is_first_page():
+    assert decode_cursor("id", "") is None
+
+def test_cursor_rejects_other_sort():
+    cursor = encode_cursor("trending", make_product())
+    with pytest.raises(InvalidCursor):
+        decode_cursor("price", cursor)
+
+def test_cursor_rejects_garbage():
+    with pytest.raises(InvalidCursor):
+        decode_cursor("id", "not-a-cursor")
+
+def test_keyset_clauses_first_page_has_no_key_predicate():
+    filters, order_by = keyset_clauses("trending", None)
+    assert len(filters) == 1  # only the NOT NULL filter
+    assert len(order_by) == 2
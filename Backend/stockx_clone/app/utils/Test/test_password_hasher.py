@@ -0,0 +1,44 @@
+# test_password_hasher.py
+
+#run this pytest with command -> pytest -v test_password_hasher.py
+import asyncio
+import threading
+import pytest
+from app.service.password_hasher import HasherOverloaded, PasswordHasher
+
+@pytest.fixture
+def hasher():
+    hasher = PasswordHasher(workers=1, max_queue=2)
+    yield hasher
+    hasher.shutdown()
+
+def test_hash_and_verify_run_on_the_pool(hasher):
+    async def roundtrip():
+        hashed = await hasher.hash("hunter2")
+        return await hasher.verify("hunter2", hashed), await hasher.verify("hunter3", hashed)
+    assert asyncio.run(roundtrip()) == (True, False)
+    stats = hasher.stats()
+    assert stats["completed"] == 3 and stats["queued"] == 0 and stats["running"] == 0
+
+def test_full_queue_is_refused_and_cancelled_jobs_leave_it(hasher):
+    release = threading.Event()
+
+    async def storm():
+        # One job blocks the only worker, two more fill the queue
+        jobs = [asyncio.ensure_future(hasher._submit(release.wait)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        with pytest.raises(HasherOverloaded):
+            await hasher._submit(release.wait)
+        assert hasher.stats()["queued"] == 2
+
+        jobs[2].cancel()
+        await asyncio.sleep(0)
+        assert hasher.stats()["queued"] == 1
+        release.set()
+        return await asyncio.gather(*jobs[:2])
+
+    assert asyncio.run(storm()) == [True, True]
+    stats = hasher.stats()
+    assert stats["rejected"] == 1
+    assert stats["completed"] == 2
+    assert stats["max_queued"] == 2
@@ -0,0 +1,33 @@
+# test_pool_metrics.py
+
+#run this pytest with command -> pytest -v test_pool_metrics.py
+import sqlite3
+import pytest
+from sqlalchemy import exc
+from app.utils.pool_metrics import InstrumentedQueuePool
+
+def make_pool(**kwargs):
+    return InstrumentedQueuePool(lambda: sqlite3.connect(":memory:", check_same_thread=False), **kwargs)
+
+def test_counts_checkouts_and_overflow():
+    pool = make_pool(pool_size=1, max_overflow=1)
+    first = pool.connect()
+    second = pool.connect()  # beyond pool_size, so this is an overflow connection
+
+    stats = pool.stats()
+    assert stats["checked_out"] == 2
+    assert stats["checkouts"] == 2
+    assert stats["overflow_events"] == 1
+
+    first.close()
+    second.close()
+    assert pool.stats()["checked_out"] == 0
+
+def test_counts_timeouts():
+    pool = make_pool(pool_size=1, max_overflow=0, timeout=0.05)
+    held = pool.connect()
+    with pytest.raises(exc.TimeoutError):
+        pool.connect()
+    assert pool.stats()["timeouts"] == 1
+    assert pool.stats()["wait_ms_max"] >= 50
+    held.close()
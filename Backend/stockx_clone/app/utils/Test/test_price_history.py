@@ -0,0 +1,33 @@
+# test_price_history.py
+
+#run this pytest with command -> pytest -v test_price_history.py
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import pytest
+from sqlalchemy.dialects import postgresql
+from app.schemas.price_history_schema import PricePoint
+from app.service.price_history_service import bucket_start, rollup_statement
+
+def test_buckets_are_utc_aligned():
+    # 2026-10-17 is a Saturday; 23:30 at UTC-5 is already Sunday 04:30 UTC
+    moment = datetime(2026, 10, 17, 23, 30, tzinfo=timezone(timedelta(hours=-5)))
+    assert bucket_start(moment, "hour") == datetime(2026, 10, 18, 4, tzinfo=timezone.utc)
+    assert bucket_start(moment, "day") == datetime(2026, 10, 18, tzinfo=timezone.utc)
+    assert bucket_start(moment, "week") == datetime(2026, 10, 12, tzinfo=timezone.utc)
+
+def test_unknown_bucket():
+    with pytest.raises(ValueError):
+        bucket_start(datetime.now(timezone.utc), "month")
+
+def test_rollup_upserts_every_bucket_in_one_statement():
+    statement = rollup_statement(7, Decimal("210.00"), datetime(2026, 1, 1, 12, tzinfo=timezone.utc))
+    compiled = statement.compile(dialect=postgresql.dialect())
+    sql = str(compiled)
+    assert "ON CONFLICT (product_id, bucket, bucket_start) DO UPDATE" in sql
+    assert "greatest(price_history.high, excluded.high)" in sql
+    assert sorted(value for key, value in compiled.params.items() if key.startswith("bucket_m")) == ["day", "hour", "week"]
+
+def test_average_price_from_turnover():
+    point = PricePoint(bucket_start=datetime.now(timezone.utc), open=1, high=3, low=1, close=2, volume=3, turnover=Decimal("6.50"))
+    assert point.average_price == Decimal("2.17")
+    assert point.model_dump()["average_price"] == Decimal("2.17")
@@ -0,0 +1,93 @@
+# test_principal_cache.py
+
+#run this pytest with command -> pytest -v test_principal_cache.py
+import asyncio
+import uuid
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
+from app.models.users import User, UserRole
+from app.service.cache_service import CacheService
+from app.service.local_cache import LocalCache
+from app.service.principal_cache import AuthenticatedUser, PrincipalCache
+
+@pytest.fixture
+def db():
+    # The two auth tables are plain enough for SQLite; one shared connection, as misses load on a worker thread
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    User.__table__.create(engine)
+    UserRole.__table__.create(engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    with Session(engine) as session:
+        session.info["statements"] = statements
+        yield session
+    engine.dispose()
+
+@pytest.fixture
+def principals():
+    fakeredis = pytest.importorskip("fakeredis")
+    # fakeredis can't run the lock release script without Lua, so don't wait on stale locks
+    return PrincipalCache(CacheService(fakeredis.FakeRedis(), prefix="auth:principal:", local_cache=LocalCache()), lock_timeout=0.05)
+
+def add_user(db, **columns):
+    user_id = uuid.uuid4()
+    db.add(User(id=user_id, email=f"{user_id.hex}@example.com", is_active=True, **columns))
+    db.add(UserRole(user_id=user_id, role="FREE_USER"))
+    db.commit()
+    db.expunge_all()
+    db.info["statements"].clear()
+    return user_id
+
+def test_miss_loads_user_and_roles_in_one_query(db, principals):
+    user_id = add_user(db, clerk_id="user_clerk")
+    user = asyncio.run(principals.get(db, user_id=user_id))
+    assert user == AuthenticatedUser(user_id, "user_clerk", True, ("FREE_USER",))
+    assert len(db.info["statements"]) == 1
+
+    # Hits never touch the database
+    assert asyncio.run(principals.get(db, user_id=user_id)) == user
+    assert len(db.info["statements"]) == 1
+    assert asyncio.run(principals.get(db, clerk_id="user_clerk")) == user
+    assert len(db.info["statements"]) == 2
+
+def test_invalidate_drops_both_keys(db, principals):
+    user_id = add_user(db, clerk_id="user_clerk")
+    asyncio.run(principals.get(db, user_id=user_id))
+    asyncio.run(principals.get(db, clerk_id="user_clerk"))
+
+    db.query(User).filter(User.id == user_id).update({"is_active": False})
+    db.commit()
+    assert asyncio.run(principals.get(db, user_id=user_id)).is_active
+    principals.invalidate(user_id, "user_clerk")
+    assert not asyncio.run(principals.get(db, user_id=user_id)).is_active
+    assert not asyncio.run(principals.get(db, clerk_id="user_clerk")).is_active
+
+def test_missing_users_are_not_cached(db, principals):
+    assert asyncio.run(principals.get(db, clerk_id="user_new")) is None
+    # The row arriving later (e.g. from the user.created webhook) is seen right away
+    add_user(db, clerk_id="user_new")
+    assert asyncio.run(principals.get(db, clerk_id="user_new")) is not None
+
+def test_writes_need_an_active_user(db, principals):
+    from fastapi import HTTPException
+    from app.middleware.auth import Principal
+    from app.routers.custom_auth import require_active_principal
+
+    def check(principal):
+        return asyncio.run(require_active_principal(principal, db, principals))
+
+    active = Principal("custom", str(add_user(db)), {})
+    assert check(active) is active
+    # Clerk sessions still need no users row
+    assert check(Principal("clerk", "user_unsynced", {})).subject == "user_unsynced"
+
+    # Deleted and deactivated users lose write access while their tokens are still valid
+    deactivated = add_user(db, clerk_id="user_gone")
+    db.query(User).filter(User.id == deactivated).update({"is_active": False})
+    db.commit()
+    for principal in (Principal("custom", str(uuid.uuid4()), {}), Principal("custom", str(deactivated), {}), Principal("clerk", "user_gone", {})):
+        with pytest.raises(HTTPException) as error:
+            check(principal)
+        assert error.value.status_code == 401
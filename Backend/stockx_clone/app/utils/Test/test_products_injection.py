@@ -0,0 +1,172 @@
+# test_products_injection.py
+
+#run this pytest with command -> pytest -v test_products_injection.py
+import csv
+import json
+import os
+import queue
+import tracemalloc
+from datetime import datetime, timezone
+from decimal import Decimal
+import pytest
+from sqlalchemy import Column, MetaData, Table, create_engine, text
+from app.models.product import Product
+from app.service.sales_service import product_stats_update
+from app.utils.Scripts.productsInjection import (
+    COPY_COLUMNS, COPY_NULL, INSERT_COLUMNS, INSERT_VALUES, SALE_STAT_COLUMNS, UPSERT_SQL, ProductSchema, content_hash,
+    detect_and_parse_json_item, init_worker, iter_batches, iter_json_items, iter_parsed_products, iter_tasks,
+    keep_previous_entries, process_range, rows_to_csv, select_changed_files, to_row
+)
+
+def sneaker(i):
+    return {"shoeName": f"Sneaker {i}", "brand": "New Balance", "retailPrice": 120, "description": "x" * 200}
+
+def test_rows_follow_copy_columns():
+    row = to_row(ProductSchema(name="Samba OG", brand="adidas", retail_price="100"))
+    assert len(row) == len(COPY_COLUMNS)
+    assert row[COPY_COLUMNS.index("brand")] == "adidas"
+    assert row[COPY_COLUMNS.index("retail_price")] == Decimal("100")
+
+def test_csv_keeps_nulls_and_empty_strings_apart():
+    buffer = rows_to_csv([("Dunk, \"Panda\"", None, ""), ("Gazelle", 3, "x")])
+    lines = buffer.getvalue().splitlines()
+    assert lines[0] == f'"Dunk, ""Panda""",{COPY_NULL},'
+    assert list(csv.reader(lines))[1] == ["Gazelle", "3", "x"]
+
+def test_batches_are_bounded():
+    products = [ProductSchema(name=f"Product {i}") for i in range(5)]
+    assert [len(batch) for batch in iter_batches(products, 2)] == [2, 2, 1]
+
+def test_ndjson_is_read_line_by_line(tmp_path):
+    path = tmp_path / "dump.ndjson"
+    path.write_text("\n".join(json.dumps(sneaker(i)) for i in range(3)) + "\n\n")
+    assert [p.name for p in iter_parsed_products(str(path))] == ["Sneaker 0", "Sneaker 1", "Sneaker 2"]
+
+def test_streams_nested_results(tmp_path):
+    pytest.importorskip("ijson")
+    path = tmp_path / "dump.json"
+    path.write_text(json.dumps({"meta": {}, "data": {"results": [{"objectId": "a", "title": "Tee", "brand": "adidas"}, None]}}))
+    products = list(iter_parsed_products(str(path)))
+    assert [(p.name, p.brand) for p in products] == [("Tee", "adidas")]
+
+def test_memory_does_not_grow_with_file_size(tmp_path):
+    pytest.importorskip("ijson")
+    path = tmp_path / "big.json"
+    path.write_text(json.dumps([sneaker(i) for i in range(20000)]))
+
+    tracemalloc.start()
+    count = sum(1 for _ in iter_parsed_products(str(path)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count == 20000
+    assert peak < path.stat().st_size / 10
+
+def test_product_keys_prefer_vendor_ids():
+    assert ProductSchema(**detect_and_parse_json_item({"objectId": "abc", "title": "Tee"})).product_key == "stockx:abc"
+    assert ProductSchema(**detect_and_parse_json_item({**sneaker(1), "styleID": "M990GL6"})).product_key == "style:M990GL6"
+    assert ProductSchema(name="  Samba   OG ", brand="adidas").product_key == "name:adidas|samba og"
+
+def test_content_hash_ignores_decimal_scale_and_tracks_changes():
+    base = ProductSchema(name="Samba OG", retail_price="100", product_key="k")
+    assert content_hash(base) == content_hash(ProductSchema(name="Samba OG", retail_price="100.00", product_key="k"))
+    assert content_hash(base) != content_hash(ProductSchema(name="Samba OG", retail_price="110", product_key="k"))
+    assert to_row(base)[-1] == content_hash(base)
+
+def test_manifest_skips_unchanged_files(tmp_path):
+    path = tmp_path / "a.json"
+    path.write_text("[]")
+    changed, manifest = select_changed_files([str(path)], {})
+    assert changed == [str(path)]
+
+    assert select_changed_files([str(path)], manifest)[0] == []
+
+    # Touched but identical content: hashed, still skipped
+    os.utime(path, (1, 1))
+    changed, touched = select_changed_files([str(path)], manifest)
+    assert changed == [] and touched[str(path)]["mtime"] == 1
+
+    path.write_text("[{}]")
+    assert select_changed_files([str(path)], touched)[0] == [str(path)]
+
+def tricky(i):
+    # Brackets, quotes and escapes inside strings must not confuse the range scan
+    return {"shoeName": f'Sneaker {i} [{{"x": "\\"]}}', "brand": "NB", "tags": [i, {"n": None}]}
+
+def items_from_tasks(tasks):
+    return [item for path, start, end in tasks for item in iter_json_items(path, start, end)]
+
+@pytest.mark.parametrize("layout", ["list", "nested", "ndjson"])
+def test_split_ranges_cover_every_item_once(tmp_path, layout):
+    items = [tricky(i) for i in range(50)]
+    if layout == "ndjson":
+        path = tmp_path / "dump.ndjson"
+        path.write_text("\n".join(json.dumps(item) for item in items))
+    else:
+        path = tmp_path / "dump.json"
+        content = items if layout == "list" else {"data": {"results": items, "total": 50}, "meta": [1]}
+        path.write_text(json.dumps(content, indent=1))
+
+    tasks = list(iter_tasks([str(path)], range_bytes=500))
+    assert len(tasks) > 5
+    assert sorted(items_from_tasks(tasks), key=lambda item: item["tags"][0]) == items
+
+def test_small_files_are_one_task(tmp_path):
+    path = tmp_path / "small.json"
+    path.write_text(json.dumps([sneaker(1)]))
+    assert list(iter_tasks([str(path)], range_bytes=1 << 20)) == [(str(path), 0, None)]
+
+def test_imported_sale_stats_seed_the_running_average():
+    # The insert half of UPSERT_SQL on SQLite (products without its Postgres-only search column)
+    engine = create_engine("sqlite://")
+    metadata = MetaData()
+    Table("products", metadata, *(Column(column.name, column.type, primary_key=column.primary_key) for column in Product.__table__.columns if column.name != "search_vector"))
+    Table("import_products", metadata, *(Column(name, Product.__table__.c[name].type) for name in COPY_COLUMNS))
+    metadata.create_all(engine)
+
+    product = ProductSchema(name="Samba OG", brand="adidas", average_price="100", sales_count=4, product_key="k")
+    with engine.begin() as conn:
+        conn.execute(Table("import_products", metadata).insert().values(dict(zip(COPY_COLUMNS, to_row(product)))))
+        conn.execute(text(f"INSERT INTO products ({', '.join(INSERT_COLUMNS)}) SELECT {', '.join(INSERT_VALUES)} FROM import_products"))
+        product_id = conn.execute(text("SELECT id FROM products")).scalar_one()
+
+        conn.execute(product_stats_update(product_id, Decimal("150"), datetime(2026, 3, 1, tzinfo=timezone.utc)))
+        count, average = conn.execute(text("SELECT sales_count, average_price FROM products")).one()
+    assert (count, Decimal(str(average))) == (5, Decimal("110"))
+
+def test_reimport_leaves_sale_stats_alone():
+    updates = UPSERT_SQL.split("DO UPDATE SET", 1)[1].split("WHERE", 1)[0]
+    assert "name = EXCLUDED.name" in updates
+    assert not any(f"{column} =" in updates for column in SALE_STAT_COLUMNS + ("sales_total",))
+
+def test_truncated_file_is_reported_and_kept_out_of_the_manifest(tmp_path):
+    path = tmp_path / "dump.ndjson"
+    path.write_text(json.dumps(sneaker(1)) + "\n" + json.dumps(sneaker(2))[:20])
+    batches = queue.Queue()
+    init_worker(batches)
+
+    process_range((str(path), 0, None))
+    messages = [batches.get_nowait() for _ in range(batches.qsize())]
+    assert messages[-1][0] == "done" and messages[-1][1] == str(path) and messages[-1][3]
+
+    previous = {"mtime": 1, "size": 2, "sha256": "old"}
+    _, entries = select_changed_files([str(path)], {})
+    assert keep_previous_entries(dict(entries), {str(path): previous}, [str(path)]) == {str(path): previous}
+    assert keep_previous_entries(dict(entries), {}, [str(path)]) == {}
+
+def test_ranges_are_yielded_while_scanning(tmp_path):
+    path = tmp_path / "dump.json"
+    path.write_text(json.dumps([tricky(i) for i in range(50)]))
+    tasks = iter_tasks([str(path)], range_bytes=500)
+    # The first range is available before the scan has seen the rest of the file
+    first = next(tasks)
+    assert first[0] == str(path) and first[2] < path.stat().st_size / 2
+
+def test_truncated_json_keeps_its_tail_as_a_failing_range(tmp_path):
+    path = tmp_path / "dump.json"
+    content = json.dumps([tricky(i) for i in range(50)])
+    path.write_text(content[:len(content) * 3 // 4])
+    tasks = list(iter_tasks([str(path)], range_bytes=500))
+    assert tasks[-1][2] == path.stat().st_size
+    with pytest.raises(Exception):
+        list(iter_json_items(*tasks[-1]))
@@ -0,0 +1,119 @@
+# test_query_plans.py
+
+#run this pytest with command -> pytest -v test_query_plans.py
+#
+# EXPLAINs every product listing query against a seeded scratch copy of the products
+# table (schema `plan_check`, built from the model so it carries the model's indexes)
+# and fails if any of them would sequentially scan it. Needs a reachable Postgres at
+# DATABASE_URL; skipped otherwise.
+import pytest
+from sqlalchemy import exc, text
+
+from app.database import create_db_engine
+from app.models.brand_stats import BRAND_STATS_SQL
+from app.models.product import Product
+from app.service.recommendation_service import segment_rankings_statement
+from app.routers.products import (
+    filtered_products_statement,
+    new_arrivals_statement,
+    popular_brands_statement,
+    products_by_ids_statement,
+    recommended_statement,
+    three_day_shipping_statement,
+    trending_statement,
+)
+from app.utils.pagination import decode_cursor, keyset_clauses
+
+SEED_ROWS = 200_000
+
+SEED_SQL = """
+INSERT INTO plan_check.products (id, name, brand, model, gender, category, retail_price, last_sale_price, sales_count, created_at)
+SELECT
+    g,
+    'Product ' || g,
+    (ARRAY['Nike', 'Jordan', 'adidas', 'New Balance', 'ASICS', 'Yeezy', 'Converse', 'Vans', 'Puma', 'Reebok'])[1 + g % 10],
+    'Model ' || (g % 50),
+    (ARRAY['men', 'women', 'unisex'])[1 + g % 3],
+    (ARRAY['sneakers', 'apparel', 'accessories', 'collectibles', 'electronics'])[1 + g % 5],
+    CASE WHEN g % 7 = 0 THEN NULL ELSE 100 + g % 150 END,
+    CASE WHEN g % 11 = 0 THEN NULL ELSE 50 + (g * 7919) % 1000 END,
+    CASE WHEN g % 13 = 0 THEN NULL ELSE (g * 104729) % 5000 END,
+    now() - (g % 100000) * interval '1 minute'
+FROM generate_series(1, :rows) AS g
+"""
+
+def keyset(sort, cursor="", **filters):
+    filters_, order_by = keyset_clauses(sort, decode_cursor(sort, cursor))
+    return filtered_products_statement(**filters).filter(*filters_).order_by(*order_by).limit(101)
+
+QUERIES = {
+    "trending": trending_statement(20),
+    "trending_by_ids": products_by_ids_statement([7, 42, 1001, 99999, 150000]),
+    "popular_brands": popular_brands_statement(20),
+    "popular_brands_per_brand": popular_brands_statement(20, per_brand=3),
+    "new_arrivals": new_arrivals_statement(20),
+    "recommended": recommended_statement("sneakers", "Nike", "men", 20),
+    "three_day_shipping": three_day_shipping_statement(20),
+    "products_by_brand": filtered_products_statement(brand="Jordan").order_by(Product.id).offset(0).limit(100),
+    "products_by_category_gender": filtered_products_statement(category="apparel", gender="women").order_by(Product.id).limit(100),
+    "products_by_price_range": filtered_products_statement(min_price=100, max_price=102).order_by(Product.id).limit(100),
+    "keyset_trending": keyset("trending"),
+    "keyset_new_arrivals": keyset("new_arrivals"),
+    "keyset_price": keyset("price", min_price=200),
+    "keyset_price_desc": keyset("price_desc"),
+    "keyset_brand_by_id": keyset("id", brand="Vans"),
+}
+
+@pytest.fixture(scope="module")
+def conn():
+    engine = create_db_engine(application_name="stockx-plan-check", statement_timeout_ms=0, pool_size=1, max_overflow=0)
+    try:
+        connection = engine.connect().execution_options(isolation_level="AUTOCOMMIT")
+    except exc.OperationalError:
+        pytest.skip("Postgres is not reachable at DATABASE_URL")
+
+    connection.execute(text("DROP SCHEMA IF EXISTS plan_check CASCADE"))
+    connection.execute(text("CREATE SCHEMA plan_check"))
+    Product.__table__.create(connection.execution_options(schema_translate_map={None: "plan_check"}))
+    connection.execute(text(SEED_SQL), {"rows": SEED_ROWS})
+    connection.execute(text("ANALYZE plan_check.products"))
+    connection.execute(text("SET search_path TO plan_check"))
+    connection.execute(text(f"CREATE MATERIALIZED VIEW brand_stats AS {BRAND_STATS_SQL}"))
+    connection.execute(text("CREATE UNIQUE INDEX ON brand_stats (brand)"))
+    try:
+        yield connection
+    finally:
+        connection.execute(text("DROP SCHEMA plan_check CASCADE"))
+        connection.close()
+        engine.dispose()
+
+def plan_nodes(node):
+    yield node
+    for child in node.get("Plans", []):
+        yield from plan_nodes(child)
+
+@pytest.mark.parametrize("name", list(QUERIES))
+def test_no_seq_scan_on_products(conn, name):
+    compiled = QUERIES[name].compile(dialect=conn.dialect)
+    plan = conn.exec_driver_sql("EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params).scalar()
+    seq_scans = [
+        node for node in plan_nodes(plan[0]["Plan"])
+        if "Seq Scan" in node["Node Type"] and node.get("Relation Name") == "products"
+    ]
+    assert not seq_scans, f"{name} sequentially scans products:\n{plan}"
+
+def test_brand_stats_view_aggregates_per_brand(conn):
+    rows = conn.execute(text("SELECT brand, product_count, total_sales FROM brand_stats ORDER BY brand")).all()
+    assert len(rows) == 10
+    assert sum(row.product_count for row in rows) == SEED_ROWS
+    expected = conn.execute(text("SELECT coalesce(sum(sales_count), 0) FROM products WHERE brand = 'Nike'")).scalar()
+    assert dict((row.brand, row.total_sales) for row in rows)["Nike"] == expected
+
+def test_segment_rankings_keep_top_n_per_segment(conn):
+    rows = conn.execute(segment_rankings_statement(("category", "brand", "gender"), 5)).all()
+    per_segment = {}
+    for row in rows:
+        per_segment.setdefault((row.category, row.brand, row.gender), []).append(row.rank)
+    # Every category/brand/gender combination occurs in the seed data
+    assert len(per_segment) == 5 * 10 * 3
+    assert all(ranks == [1, 2, 3, 4, 5] for ranks in per_segment.values())
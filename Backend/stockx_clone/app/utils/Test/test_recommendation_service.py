@@ -0,0 +1,88 @@
+# test_recommendation_service.py
+
+#run this pytest with command -> pytest -v test_recommendation_service.py
+import uuid
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.service.recommendation_service import (
+    SEGMENT_PATTERNS, RecommendationService, build_user_candidates, merge_candidates, pack, segment_key, segment_keys_for, unpack
+)
+
+NOW = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+
+@pytest.fixture
+def recommender():
+    fakeredis = pytest.importorskip("fakeredis")
+    return RecommendationService(fakeredis.FakeRedis(), build_check_interval=0)
+
+def test_lists_pack_to_four_bytes_per_product():
+    ids = [1, 70000, 4_000_000_000]
+    assert len(pack(ids)) == 12
+    assert unpack(pack(ids)) == ids
+    assert unpack(None) == []
+
+def test_every_filter_combination_has_a_segment():
+    assert len(SEGMENT_PATTERNS) == 8
+    keys = [key for key, _ in segment_keys_for(("sneakers", "Nike", "men"))]
+    assert len(set(keys)) == 8
+    assert segment_key("sneakers", None, "men") in keys
+    assert segment_key(None, None, None) in keys
+    # Products missing a dimension only appear where it is a wildcard
+    assert [key for key, _ in segment_keys_for(("sneakers", None, "men"))] == ["sneakers|*|men", "sneakers|*|*", "*|*|men", "*|*|*"]
+
+def test_user_candidates_follow_recent_purchases_and_skip_owned():
+    user = uuid.uuid4()
+    segments = {
+        segment_key("sneakers", "Nike", "men"): [1, 2, 3],
+        segment_key("sneakers", "Nike", None): [1, 2, 3],
+        segment_key("sneakers", None, "men"): [1, 2, 3, 7],
+        segment_key(None, "Nike", "men"): [1, 2, 3],
+        segment_key("sneakers", None, None): [1, 2, 3, 7],
+        segment_key(None, "Nike", None): [1, 2, 3],
+        segment_key(None, None, "men"): [1, 2, 3, 7, 8],
+        segment_key("apparel", "Supreme", "men"): [8, 9],
+        segment_key("apparel", "Supreme", None): [8, 9],
+        segment_key("apparel", None, "men"): [8, 9],
+        segment_key(None, "Supreme", "men"): [8, 9],
+        segment_key("apparel", None, None): [8, 9],
+        segment_key(None, "Supreme", None): [8, 9],
+    }
+    product_segments = {1: ("sneakers", "Nike", "men"), 8: ("apparel", "Supreme", "men")}
+    purchases = {user: [(1, NOW - timedelta(days=2)), (8, NOW - timedelta(days=400))]}
+
+    candidates = build_user_candidates(purchases, product_segments, segments, NOW)[user]
+    assert 1 not in candidates and 8 not in candidates
+    # The recent Nike purchase outweighs the year-old Supreme one
+    assert candidates[:2] == [2, 3]
+    assert candidates.index(9) > candidates.index(3)
+
+def test_merge_interleaves_without_duplicates():
+    assert merge_candidates([5, 1], [1, 2, 3], 10) == [5, 1, 2, 3]
+    assert merge_candidates([], [1, 2, 3], 2) == [1, 2]
+    assert merge_candidates([4, 5, 6], [1, 2], 4) == [4, 1, 5, 2]
+
+def test_candidates_come_from_the_current_build(recommender):
+    user = uuid.uuid4()
+    assert recommender.candidates(None, None, None, user) == (None, [])
+
+    recommender.publish_build({segment_key(None, None, None): [1, 2], segment_key("sneakers", None, None): [2]}, {user: [9]})
+    assert recommender.candidates(None, None, None, user) == ([1, 2], [9])
+    assert recommender.candidates("sneakers", None, None) == ([2], [])
+    # A segment with no products is an empty list, not a miss
+    assert recommender.candidates("apparel", None, None, uuid.uuid4()) == ([], [])
+
+    recommender.publish_build({segment_key(None, None, None): [3]}, {})
+    assert recommender.candidates(None, None, None, user) == ([3], [])
+
+def test_expired_build_falls_back_to_querying(recommender):
+    build = recommender.publish_build({segment_key(None, None, None): [1], segment_key("sneakers", None, None): [1]}, {})
+    assert recommender.redis.ttl(f"{recommender.prefix}current") > 0
+    # The build's keys expired but this worker still holds the build id
+    for key in recommender.redis.keys(f"{recommender.prefix}{build}:*"):
+        recommender.redis.delete(key)
+    assert recommender.candidates("sneakers", None, None) == (None, [])
+
+def test_redis_errors_fall_back_to_querying(recommender):
+    recommender.publish_build({segment_key(None, None, None): [1]}, {})
+    recommender.redis.mget = None  # any failure talking to Redis
+    assert recommender.candidates(None, None, None) == (None, [])
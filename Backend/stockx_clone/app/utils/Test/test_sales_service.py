@@ -0,0 +1,36 @@
+# test_sales_service.py
+
+#run this pytest with command -> pytest -v test_sales_service.py
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+import pytest
+from pydantic import ValidationError
+from sqlalchemy.dialects import postgresql
+from app.schemas.sales_schema import SaleRecord
+from app.service.sales_service import product_stats_update
+
+def test_stats_update_is_a_single_row_increment():
+    statement = product_stats_update(5, Decimal("180.00"), datetime(2026, 3, 1, tzinfo=timezone.utc))
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert sql.startswith("UPDATE products SET")
+    assert "sales_count=(coalesce(products.sales_count" in sql
+    assert "sales_total=(coalesce(products.sales_total" in sql
+    assert "WHERE products.id = " in sql and "RETURNING products.id" in sql
+    assert "FROM sales" not in sql
+
+def test_last_sale_only_moves_forward():
+    statement = product_stats_update(5, Decimal("180.00"), datetime(2026, 3, 1, tzinfo=timezone.utc))
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+    assert "last_sale_price=CASE WHEN (products.last_sale_date IS NULL OR products.last_sale_date <= " in sql
+
+def test_sale_price_must_be_positive():
+    with pytest.raises(ValidationError):
+        SaleRecord(product_id=1, sale_price="0")
+    assert SaleRecord(product_id=1, sale_price="99.5").sale_price == Decimal("99.5")
+
+def test_sale_date_must_not_be_in_the_future():
+    with pytest.raises(ValidationError):
+        SaleRecord(product_id=1, sale_price="99.5", sale_date=datetime.now(timezone.utc) + timedelta(days=1))
+    # Naive dates are read as UTC
+    past = SaleRecord(product_id=1, sale_price="99.5", sale_date=datetime(2026, 3, 1))
+    assert past.sale_date == datetime(2026, 3, 1, tzinfo=timezone.utc)
@@ -0,0 +1,17 @@
+# test_search.py
+
+#run this pytest with command -> pytest -v test_search.py
+from app.utils.search import build_tsquery, format_hit_count
+
+def test_last_token_is_prefix():
+    assert build_tsquery("Air Jordan re") == "air & jordan & re:*"
+
+def test_punctuation_cannot_inject_operators():
+    assert build_tsquery("nike | !adidas & (yeezy)") == "nike & adidas & yeezy:*"
+
+def test_empty_query():
+    assert build_tsquery(" -- ") is None
+
+def test_hit_count_cap():
+    assert format_hit_count(42) == "42"
+    assert format_hit_count(10000) == "10000+"
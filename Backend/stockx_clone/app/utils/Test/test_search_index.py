@@ -0,0 +1,62 @@
+# test_search_index.py
+
+#run this pytest with command -> pytest -v test_search_index.py
+import pytest
+from app.service.search_index import ProductSearchIndex, SearchIndexSync
+
+PRODUCTS = [
+    {"id": 1, "name": "Jordan 1 Retro High Chicago", "brand": "Jordan", "model": "Air Jordan 1", "description": "Classic colorway"},
+    {"id": 2, "name": "Nike Dunk Low Panda", "brand": "Nike", "model": "Dunk Low", "description": "Black and white"},
+    {"id": 3, "name": "adidas Samba OG", "brand": "adidas", "model": "Samba", "description": "Terrace classic"},
+    {"id": 4, "name": "Nike Air Max 1", "brand": "Nike", "model": "Air Max", "description": "Visible air unit"},
+]
+
+@pytest.fixture
+def index():
+    index = ProductSearchIndex()
+    index.build(PRODUCTS)
+    return index
+
+def ids(results):
+    return [product["id"] for product in results[0]]
+
+def test_all_terms_must_match(index):
+    assert ids(index.search("nike dunk")) == [2]
+
+def test_ranks_name_above_description(index):
+    assert ids(index.search("classic"))[0] in (1, 3)
+    assert ids(index.search("air"))[:2] == [4, 1]
+
+def test_prefix_on_last_token(index):
+    assert ids(index.search("sam")) == [3]
+    assert index.search("nike d")[1] == 1
+
+def test_fuzzy_match(index):
+    assert ids(index.search("pnada", fuzzy=True)) == [2]
+    assert ids(index.search("pnada", fuzzy=False)) == []
+
+def test_incremental_updates(index):
+    index.upsert({"id": 3, "name": "adidas Gazelle", "brand": "adidas", "model": "Gazelle", "description": None})
+    assert ids(index.search("samba")) == []
+    assert ids(index.search("gazelle")) == [3]
+
+    index.remove(2)
+    assert ids(index.search("panda")) == []
+    assert index.stats()["documents"] == 3
+
+def test_changes_during_a_rebuild_are_replayed():
+    fakeredis = pytest.importorskip("fakeredis")
+    sync = SearchIndexSync(fakeredis.FakeRedis(), ProductSearchIndex())
+
+    def snapshot():
+        # A peer renames product 3 and this worker deletes product 2 while the query runs
+        sync.handle({"op": "upsert", "product": {"id": 3, "name": "adidas Gazelle", "brand": "adidas"}})
+        sync.remove(2)
+        return PRODUCTS
+
+    sync.rebuild(snapshot, subscribe_timeout=0)
+    assert ids(sync.index.search("gazelle")) == [3]
+    assert ids(sync.index.search("panda")) == []
+
+    sync.handle({"op": "remove", "id": 1})
+    assert sync.index.stats()["documents"] == 2
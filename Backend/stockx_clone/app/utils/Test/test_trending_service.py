@@ -0,0 +1,64 @@
+# test_trending_service.py
+
+#run this pytest with command -> pytest -v test_trending_service.py
+import math
+from datetime import datetime, timedelta, timezone
+import pytest
+from app.service.trending_service import REBASE_AFTER, TRENDING_WINDOWS, TrendingService, epoch_period, sale_weight
+
+NOW = datetime(2026, 3, 1, 12, tzinfo=timezone.utc)
+
+@pytest.fixture
+def trending():
+    fakeredis = pytest.importorskip("fakeredis")
+    return TrendingService(fakeredis.FakeRedis())
+
+def test_recent_sales_outrank_old_bestsellers(trending):
+    old_bestseller = [(1, NOW - timedelta(days=20))] * 50
+    recent = [(2, NOW - timedelta(hours=1))] * 5
+    trending.record(old_bestseller + recent, NOW)
+    assert trending.top("7d", 10, NOW) == [2, 1]
+    # A 30 day window still remembers the bestseller's volume
+    assert trending.top("30d", 10, NOW) == [1, 2]
+
+def test_weight_decays_by_e_per_window():
+    period = epoch_period("24h", NOW)
+    ratio = sale_weight("24h", NOW, period) / sale_weight("24h", NOW - timedelta(days=1), period)
+    assert ratio == pytest.approx(math.e)
+
+def test_new_epoch_carries_scores_over(trending):
+    window = "1h"
+    span = timedelta(seconds=REBASE_AFTER * TRENDING_WINDOWS[window])
+    first = datetime.fromtimestamp(epoch_period(window, NOW) * span.total_seconds(), timezone.utc) + span - timedelta(minutes=30)
+    trending.record([(1, first)] * 3 + [(2, first - timedelta(hours=12))] * 3, first)
+
+    later = first + timedelta(hours=1)
+    assert epoch_period(window, later) == epoch_period(window, first) + 1
+    trending.record([(3, later)], later)
+    # 3 sales of product 1 an hour ago (3/e ~ 1.1) vs one sale of product 3 just now
+    assert trending.top(window, 10, later) == [1, 3]
+    # Product 2's sales have faded past the prune threshold
+    scores = dict(trending.redis.zrange(trending.key(window, epoch_period(window, later)), 0, -1, withscores=True))
+    assert b"2" not in scores
+    assert scores[b"1"] == pytest.approx(3 * math.exp(-1) * sale_weight(window, later, epoch_period(window, later)))
+
+def test_future_sales_count_as_sold_now(trending):
+    # 40 days ahead would overflow exp() in the 1h window
+    trending.record([(1, NOW + timedelta(days=40)), (2, NOW.replace(tzinfo=None))], NOW)
+    assert set(trending.top("1h", 10, NOW)) == {1, 2}
+    key = trending.key("1h", epoch_period("1h", NOW))
+    assert trending.redis.zscore(key, 1) == pytest.approx(trending.redis.zscore(key, 2))
+
+def test_read_errors_fall_back_to_empty():
+    class Down:
+        def set(self, *args, **kwargs):
+            raise ConnectionError("redis down")
+
+    assert TrendingService(Down()).top("7d", 10, NOW) == []
+
+def test_short_rankings_are_topped_up_from_bestsellers():
+    from app.routers.products import backfill
+    ranked = [{"id": 7}, {"id": 3}]
+    bestsellers = [{"id": 3}, {"id": 1}, {"id": 2}, {"id": 9}]
+    assert [p["id"] for p in backfill(ranked, bestsellers, 4)] == [7, 3, 1, 2]
+    assert [p["id"] for p in backfill([], bestsellers, 2)] == [3, 1]
@@ -0,0 +1,254 @@
+import importlib
+import re
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+# Column order of the products rows the importer writes (matches ProductSchema in productsInjection)
+PRODUCT_COLUMNS = (
+    "name", "brand", "model", "gender", "condition", "category", "listing_type", "thumbnail_url",
+    "description", "retail_price", "last_sale_price", "last_sale_date", "average_price", "sales_count",
+    "product_key",
+)
+STRING_COLUMNS = ("brand", "model", "gender", "condition", "category", "listing_type", "thumbnail_url", "description")
+DECIMAL_COLUMNS = ("retail_price", "last_sale_price", "average_price")
+
+Columns = Dict[str, List[Any]]
+
+# Marks a value that fails validation; rows containing one are dropped
+INVALID = object()
+
+
+def name_product_key(name: Optional[str], brand: Optional[str]) -> str:
+    """Fallback product key for items without a vendor id: normalized brand + name"""
+    normalize = lambda value: re.sub(r"\s+", " ", (value or "").strip().lower())
+    return f"name:{normalize(brand)}|{normalize(name)}"
+
+
+def _parse_datetime(value: str) -> Optional[datetime]:
+    try:
+        # Handle ISO format strings with timezone
+        if 'Z' in value:
+            return datetime.fromisoformat(value.replace('Z', '+00:00'))
+        # Handle date-only strings (like release dates)
+        if len(value.split('-')) == 3 and 'T' not in value:
+            return datetime.strptime(value, '%Y-%m-%d')
+        return datetime.fromisoformat(value)
+    except (ValueError, TypeError):
+        return None
+
+
+def _memoized(convert: Callable[[Any], Any]) -> Callable[[List[Any]], List[Any]]:
+    """Apply convert to a column once per distinct value; vendor dumps repeat prices and dates a lot"""
+    def coerce(values: List[Any]) -> List[Any]:
+        seen: Dict[Any, Any] = {None: None}
+        out = []
+        for value in values:
+            # Keyed by type too, so 1, 1.0 and True don't share an entry
+            key = value if value is None else (value.__class__, value)
+            try:
+                out.append(seen[key])
+            except KeyError:
+                seen[key] = converted = convert(value)
+                out.append(converted)
+            except TypeError:  # unhashable (list/dict) values
+                out.append(convert(value))
+        return out
+    return coerce
+
+
+def _to_decimal(value: Any) -> Any:
+    if isinstance(value, bool):
+        return INVALID
+    try:
+        return Decimal(str(value))
+    except (ValueError, TypeError):
+        return None
+    except InvalidOperation:
+        return INVALID
+
+
+def _to_datetime(value: Any) -> Any:
+    if isinstance(value, str):
+        return _parse_datetime(value)
+    return value if isinstance(value, datetime) else INVALID
+
+
+def _to_int(value: Any) -> Any:
+    if isinstance(value, int):
+        return value
+    if isinstance(value, (float, Decimal)):
+        try:
+            return int(value) if value == int(value) else INVALID
+        except (ValueError, OverflowError, ArithmeticError):
+            return INVALID
+    if isinstance(value, str):
+        try:
+            return int(value.strip())
+        except ValueError:
+            return INVALID
+    return INVALID
+
+
+def _to_str(value: Any) -> Any:
+    return value if isinstance(value, str) else INVALID
+
+
+coerce_decimals = _memoized(_to_decimal)
+coerce_datetimes = _memoized(_to_datetime)
+coerce_ints = _memoized(_to_int)
+coerce_strings = _memoized(_to_str)
+
+
+def coerce_columns(raw: Columns) -> Columns:
+    """
+    Validate and convert raw extracted columns the way ProductSchema does, one column at a time.
+
+    Rows with a value that ProductSchema would reject are dropped; missing product keys
+    fall back to name_product_key.
+    """
+    columns = {"name": coerce_strings(raw["name"]), "last_sale_date": coerce_datetimes(raw["last_sale_date"])}
+    for column in STRING_COLUMNS:
+        columns[column] = coerce_strings(raw[column])
+    for column in DECIMAL_COLUMNS:
+        columns[column] = coerce_decimals(raw[column])
+    columns["sales_count"] = coerce_ints(raw["sales_count"])
+    # name is required
+    columns["name"] = [INVALID if name is None else name for name in columns["name"]]
+    columns["product_key"] = [
+        key or (INVALID if INVALID in (name, brand) else name_product_key(name, brand))
+        for key, name, brand in zip(raw["product_key"], columns["name"], columns["brand"])
+    ]
+
+    valid = [
+        index for index, row in enumerate(zip(*(columns[column] for column in PRODUCT_COLUMNS)))
+        if INVALID not in row
+    ]
+    if len(valid) == len(columns["name"]):
+        return columns
+    return {column: [values[index] for index in valid] for column, values in columns.items()}
+
+
+class FormatParser:
+    """
+    A vendor catalog format. Subclasses say whether an item belongs to them and pull each
+    products column out of a whole batch of items; coercion is shared.
+    """
+
+    name: str = "base"
+
+    def detect(self, item: Dict[str, Any]) -> bool:
+        raise NotImplementedError
+
+    def extract(self, items: List[Dict[str, Any]]) -> Columns:
+        """Raw column values for PRODUCT_COLUMNS, one list per column in item order"""
+        raise NotImplementedError
+
+    def parse(self, items: List[Dict[str, Any]]) -> Columns:
+        return coerce_columns(self.extract(items))
+
+
+_parsers: List[FormatParser] = []
+
+
+def register_parser(parser_class):
+    """Class decorator adding a format to the registry; later registrations are tried first"""
+    _parsers.insert(0, parser_class())
+    return parser_class
+
+
+def registered_parsers() -> List[FormatParser]:
+    return list(_parsers)
+
+
+def detect_parser(item: Any) -> Optional[FormatParser]:
+    """Pick the parser for a file from its first item"""
+    if not isinstance(item, dict):
+        return None
+    for parser in _parsers:
+        if parser.detect(item):
+            return parser
+    return None
+
+
+def load_plugins(modules: Iterable[str]) -> None:
+    """Import plugin modules; each registers its parsers with @register_parser on import"""
+    for module in modules:
+        module = module.strip()
+        if module:
+            importlib.import_module(module)
+
+
+@register_parser
+class SneakerListParser(FormatParser):
+    """Flat sneaker listings keyed by shoeName (New Balance style dumps)"""
+
+    name = "sneaker-list"
+
+    def detect(self, item):
+        return "shoeName" in item
+
+    def extract(self, items):
+        resell = [item.get('lowestResellPrice') for item in items]
+        count = len(items)
+        return {
+            "product_key": [f"style:{item['styleID']}" if item.get('styleID') else None for item in items],
+            "name": [item.get('shoeName') or "Unknown Sneaker" for item in items],
+            "brand": [item.get('brand') for item in items],
+            "model": [item.get('make') or item.get('silhoutte') for item in items],
+            "gender": [None] * count,
+            "condition": ["New"] * count,
+            "category": ["sneakers"] * count,
+            "listing_type": ["STANDARD"] * count,
+            "thumbnail_url": [item.get('thumbnail') for item in items],
+            "description": [item.get('description') for item in items],
+            "retail_price": [item.get('retailPrice') for item in items],
+            "last_sale_price": [prices.get('stockX') if isinstance(prices, dict) else None for prices in resell],
+            "last_sale_date": [item.get('releaseDate') for item in items],
+            "average_price": [None] * count,
+            "sales_count": [0] * count,
+        }
+
+
+@register_parser
+class MarketCatalogParser(FormatParser):
+    """Catalog search results with nested market statistics (Adidas apparel style dumps)"""
+
+    name = "market-catalog"
+
+    def detect(self, item):
+        return "objectId" in item or "title" in item
+
+    @staticmethod
+    def _retail_price(item: Dict[str, Any]) -> Any:
+        traits = item.get('productTraits')
+        if not traits or not isinstance(traits, list):
+            return None
+        value = None
+        for trait in traits:
+            if trait['name'] == 'Retail Price':
+                value = trait['value']  # last one wins, as in parse_adidas_json
+        return value or None
+
+    def extract(self, items):
+        markets = [item.get('market', {}) for item in items]
+        sales = [market.get('salesInformation', {}) for market in markets]
+        annual = [market.get('statistics', {}).get('annual', {}) for market in markets]
+        media = [item.get('media', {}) for item in items]
+        return {
+            "product_key": [f"stockx:{item['objectId']}" if item.get('objectId') else None for item in items],
+            "name": [item.get('name') or item.get('title') or "Unknown Product" for item in items],
+            "brand": [item.get('brand') for item in items],
+            "model": [item.get('model') for item in items],
+            "gender": [item.get('gender') for item in items],
+            "condition": [item.get('condition') for item in items],
+            "category": [item.get('productCategory') for item in items],
+            "listing_type": [item.get('listingType') for item in items],
+            "thumbnail_url": [(m.get('thumbUrl') or m.get('smallImageUrl')) if isinstance(m, dict) else None for m in media],
+            "description": [item.get('description') for item in items],
+            "retail_price": [self._retail_price(item) for item in items],
+            "last_sale_price": [info.get('lastSale') for info in sales],
+            "last_sale_date": [info.get('lastSaleDate') for info in sales],
+            "average_price": [stats.get('averagePrice') for stats in annual],
+            "sales_count": [stats.get('salesCount') for stats in annual],
+        }
@@ -0,0 +1,97 @@
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, List, Optional, Tuple
+
+from sqlalchemy import tuple_
+
+from app.models.product import Product
+
+# Keyset orderings supported by GET /api/products/.
+# Each entry is (sort column, descending, value type). Product.id is always
+# appended as a tie-breaker in the same direction so the key is unique.
+SORT_KEYS = {
+    "id": (None, False, int),
+    "trending": (Product.sales_count, True, int),
+    "new_arrivals": (Product.created_at, True, datetime),
+    "price": (Product.last_sale_price, False, Decimal),
+    "price_desc": (Product.last_sale_price, True, Decimal),
+}
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor cannot be decoded or does not match the requested sort"""
+
+
+def _dump_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value
+
+
+def _load_value(value: Any, value_type: type) -> Any:
+    if value_type is datetime:
+        return datetime.fromisoformat(value)
+    if value_type is Decimal:
+        return Decimal(value)
+    return value_type(value)
+
+
+def encode_cursor(sort: str, product: Product) -> str:
+    """Encode the sort key of the last product on a page into an opaque cursor"""
+    column, _, _ = SORT_KEYS[sort]
+    key = [product.id] if column is None else [_dump_value(getattr(product, column.key)), product.id]
+    payload = json.dumps({"s": sort, "k": key}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(sort: str, cursor: str) -> Optional[List[Any]]:
+    """Decode a cursor back into the sort key values; an empty cursor means the first page"""
+    if not cursor:
+        return None
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        key = payload["k"]
+        if payload["s"] != sort:
+            raise InvalidCursor(f"Cursor was issued for sort '{payload['s']}', not '{sort}'")
+    except InvalidCursor:
+        raise
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
+    column, _, value_type = SORT_KEYS[sort]
+    try:
+        if column is None:
+            return [int(key[0])]
+        return [_load_value(key[0], value_type), int(key[1])]
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+
+
+def keyset_clauses(sort: str, key: Optional[List[Any]]) -> Tuple[List[Any], List[Any]]:
+    """
+    Build the WHERE and ORDER BY clauses for a keyset page.
+
+    Returns (filters, order_by). Rows with a NULL sort value are excluded for the
+    non-id orderings, matching the behaviour of the dedicated listing endpoints.
+    """
+    column, descending, _ = SORT_KEYS[sort]
+    filters = []
+
+    if column is None:
+        if key is not None:
+            filters.append(Product.id > key[0])
+        return filters, [Product.id.asc()]
+
+    filters.append(column.isnot(None))
+    if key is not None:
+        row_key = tuple_(column, Product.id)
+        filters.append(row_key < tuple_(*key) if descending else row_key > tuple_(*key))
+
+    if descending:
+        return filters, [column.desc(), Product.id.desc()]
+    return filters, [column.asc(), Product.id.asc()]
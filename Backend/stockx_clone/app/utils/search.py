@@ -0,0 +1,33 @@
+import re
+from typing import List, Optional
+
+# Upper bound on how many matches are counted for the total-hit estimate
+SEARCH_COUNT_CAP = 10000
+
+_TOKEN_RE = re.compile(r"[^\W_]+", re.UNICODE)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase word tokens (shared by Postgres and in-memory search)"""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(text.lower())
+
+
+def build_tsquery(text: str) -> Optional[str]:
+    """
+    Turn free text into a to_tsquery() expression.
+
+    Every token must match; the last one is a prefix match so typeahead works
+    while the user is still typing. Returns None if the text has no searchable tokens.
+    """
+    tokens = tokenize(text)
+    if not tokens:
+        return None
+    terms = tokens[:-1] + [f"{tokens[-1]}:*"]
+    return " & ".join(terms)
+
+
+def format_hit_count(count: int, cap: int = SEARCH_COUNT_CAP) -> str:
+    """Render the total-hit header, e.g. '42' or '10000+' once the cap is reached"""
+    return f"{cap}+" if count >= cap else str(count)